@@ -0,0 +1,45 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def swing_flags(values, left, right, mode):
+    """Flag bars equal to the max (or min) of the window ``left`` bars before to
+    ``right`` bars after them. Bars without a full window are never flagged."""
+    n = len(values)
+    flags = np.zeros(n, dtype=bool)
+    width = left + right + 1
+    if n < width:
+        return flags
+    windows = sliding_window_view(values, width)
+    extreme = windows.max(axis=1) if mode == 'max' else windows.min(axis=1)
+    flags[left:n - right] = values[left:n - right] == extreme
+    return flags
+
+
+class AnalysisContext:
+    """Features shared by the detectors of one analysis pass.
+
+    ``TradingEngine`` builds one per ``analyze_market`` call and hands it to the
+    SMC analyzer, the pattern detector and the market structure step, so swing
+    points and order blocks are computed once instead of once per consumer.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.highs = df['high'].to_numpy(dtype=float)
+        self.lows = df['low'].to_numpy(dtype=float)
+        self.order_blocks = None
+        self._swings = {}
+
+    def swing_highs(self, left=5, right=5):
+        return self._swing_index('max', left, right)
+
+    def swing_lows(self, left=5, right=5):
+        return self._swing_index('min', left, right)
+
+    def _swing_index(self, mode, left, right):
+        key = (mode, left, right)
+        if key not in self._swings:
+            values = self.highs if mode == 'max' else self.lows
+            self._swings[key] = np.flatnonzero(swing_flags(values, left, right, mode))
+        return self._swings[key]
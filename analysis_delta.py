@@ -0,0 +1,134 @@
+from collections import OrderedDict
+
+from serialization import dumps
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ENCODINGS = ('json', 'msgpack') if msgpack is not None else ('json',)
+
+
+def diff(old, new, path=()):
+    """Operations turning dict ``old`` into dict ``new``.
+
+    Nested dicts are compared key by key; any other changed value (lists
+    included) is replaced whole. ``['s', path, value]`` sets the value at
+    ``path`` (a list of keys), ``['d', path]`` deletes it.
+    """
+    ops = []
+    for key, value in new.items():
+        at = path + (key,)
+        if key not in old:
+            ops.append(['s', list(at), value])
+            continue
+        before = old[key]
+        if isinstance(value, dict) and isinstance(before, dict):
+            ops.extend(diff(before, value, at))
+        elif before != value:
+            ops.append(['s', list(at), value])
+    for key in old:
+        if key not in new:
+            ops.append(['d', list(path + (key,))])
+    return ops
+
+
+def encode(message, encoding='json'):
+    if encoding == 'msgpack' and msgpack is not None:
+        return msgpack.packb(message, default=str)
+    return dumps(message)
+
+
+class DeltaChannel:
+    """Versioned analysis documents for the subscribers of one symbol/timeframe.
+
+    Every ``publish`` bumps the version. A subscriber whose last acknowledged
+    version is still in the recent history gets only the operations from that
+    version to the new one; anyone else, and everyone every ``snapshot_every``
+    versions, gets the full document. Messages are encoded once per distinct
+    (base version, encoding) and the same payload is sent to every subscriber
+    in that group.
+    """
+
+    def __init__(self, symbol, timeframe, history=8, snapshot_every=10):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.history = history
+        self.snapshot_every = snapshot_every
+        self.version = 0
+        self._documents = OrderedDict()
+        self._acked = {}
+        self._encodings = {}
+        self.snapshots = 0
+        self.deltas = 0
+        self.bytes = 0
+
+    @property
+    def sids(self):
+        return list(self._acked)
+
+    def __len__(self):
+        return len(self._acked)
+
+    def join(self, sid, encoding='json'):
+        self._acked[sid] = None
+        self._encodings[sid] = encoding if encoding in ENCODINGS else 'json'
+        return self._encodings[sid]
+
+    def leave(self, sid):
+        self._acked.pop(sid, None)
+        self._encodings.pop(sid, None)
+
+    def ack(self, sid, version):
+        if sid in self._acked and version in self._documents:
+            acked = self._acked[sid]
+            if acked is None or version > acked:
+                self._acked[sid] = version
+
+    def resync(self, sid):
+        self._acked[sid] = None
+
+    def publish(self, document):
+        """Store ``document`` as the next version; returns ``(event, payload, sids)`` sends."""
+        self.version += 1
+        self._documents[self.version] = document
+        while len(self._documents) > self.history:
+            self._documents.popitem(last=False)
+
+        snapshot_due = self.version % self.snapshot_every == 1
+        groups = {}
+        for sid, base in self._acked.items():
+            if snapshot_due or base not in self._documents:
+                base = None
+            groups.setdefault((base, self._encodings[sid]), []).append(sid)
+
+        return [(*self._message(base, encoding), sids) for (base, encoding), sids in groups.items()]
+
+    def snapshot(self, sid):
+        """``(event, payload)`` carrying the current document, or None before the first publish."""
+        if not self.version:
+            return None
+        return self._message(None, self._encodings.get(sid, 'json'))
+
+    def _message(self, base, encoding):
+        header = {'symbol': self.symbol, 'timeframe': self.timeframe, 'version': self.version}
+        current = self._documents[self.version]
+        if base is None:
+            event, message = 'analysis_snapshot', dict(header, analysis=current)
+            self.snapshots += 1
+        else:
+            event, message = 'analysis_delta', dict(header, base=base, ops=diff(self._documents[base], current))
+            self.deltas += 1
+        payload = encode(message, encoding)
+        self.bytes += len(payload)
+        return event, payload
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'subscribers': len(self._acked),
+            'snapshots': self.snapshots,
+            'deltas': self.deltas,
+            'bytes': self.bytes,
+        }
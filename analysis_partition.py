@@ -0,0 +1,79 @@
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import AnalysisPartition
+from serialization import dumps, loads
+
+
+class PartitionLeases:
+    """Shares analysis scheduling between server processes through the database.
+
+    Every (symbol, timeframe) has a row in ``analysis_partitions``. A process
+    that finds a candle has closed takes the pair's lease (a conditional
+    ``UPDATE``, or the first ``INSERT``), and only the lease holder computes the
+    analysis and stores it in the row. Every process reads stored results newer
+    than its own and delivers them to its own subscribers, so each candle close
+    is analysed once however many processes serve the pair. A lease lasts
+    ``lease_seconds``; a crashed holder's pairs pass to another process after
+    that. Works on a plain SQLAlchemy engine, like ``OHLCVStore``.
+    """
+
+    def __init__(self, engine, worker_id=None, lease_seconds=60.0):
+        self.engine = engine
+        self.table = AnalysisPartition.__table__
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.acquired = 0
+        self.published = 0
+
+    def acquire(self, symbol, timeframe):
+        """Take or renew the lease on a pair; False while another process holds it."""
+        t = self.table
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.lease_seconds)
+        with self.engine.begin() as conn:
+            renewed = conn.execute(
+                update(t)
+                .where(t.c.symbol == symbol, t.c.timeframe == timeframe,
+                       or_(t.c.owner == self.worker_id, t.c.lease_expires < now))
+                .values(owner=self.worker_id, lease_expires=expires)
+            ).rowcount
+        if not renewed:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(t).values(symbol=symbol, timeframe=timeframe,
+                                                  owner=self.worker_id, lease_expires=expires))
+            except IntegrityError:
+                return False
+        self.acquired += 1
+        return True
+
+    def publish(self, symbol, timeframe, closed, market, analysis):
+        t = self.table
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(t)
+                .where(t.c.symbol == symbol, t.c.timeframe == timeframe, t.c.owner == self.worker_id)
+                .values(closed=closed, payload=dumps({'market': market, 'analysis': analysis}))
+            )
+        self.published += 1
+
+    def latest(self, symbol, timeframe, after=None):
+        """``(closed, market, analysis)`` last stored for the pair, or None if nothing newer than ``after``."""
+        t = self.table
+        where = [t.c.symbol == symbol, t.c.timeframe == timeframe, t.c.closed.isnot(None)]
+        if after is not None:
+            where.append(t.c.closed > after)
+        with self.engine.connect() as conn:
+            row = conn.execute(select(t.c.closed, t.c.payload).where(*where)).first()
+        if row is None:
+            return None
+        payload = loads(row.payload)
+        return row.closed, payload['market'], payload['analysis']
+
+    def stats(self):
+        return {'worker_id': self.worker_id, 'acquired': self.acquired, 'published': self.published}
@@ -0,0 +1,194 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analysis_delta import DeltaChannel
+from candles import TIMEFRAME_MINUTES, candle_open_time
+
+
+class AnalysisScheduler:
+    """Pushes analysis to Socket.IO rooms instead of answering per-client requests.
+
+    Each connection subscribes to one (symbol, timeframe) and joins its room. A
+    background task wakes every ``interval`` seconds and, for each pair that has
+    subscribers, checks whether a new candle has closed; if so it loads the
+    candles, runs the analysis once and emits ``market_update`` to the whole
+    room. The analysis goes out through the pair's ``DeltaChannel`` as
+    versioned snapshots and deltas. The cost per candle close therefore
+    depends on the number of distinct pairs being watched, not on the number
+    of viewers. The last payloads are kept so a new subscriber gets them at once.
+
+    With ``partitions`` (a ``PartitionLeases``) several server processes share
+    the work: only the lease holder of a pair computes it and broadcasts
+    ``market_update`` to the room through the Socket.IO message queue; the
+    other processes pick the stored result up and send their own subscribers
+    the analysis snapshot or delta.
+    """
+
+    def __init__(self, socketio, fetcher, analyze, market_limit=100, interval=1.0, snapshot_every=10,
+                 partitions=None):
+        self.socketio = socketio
+        self.fetcher = fetcher
+        self.analyze = analyze
+        self.market_limit = market_limit
+        self.interval = interval
+        self.snapshot_every = snapshot_every
+        self.partitions = partitions
+        self._channels = {}
+        self._subscriptions = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._task = None
+        self.pushes = 0
+        self.relayed = 0
+
+    @staticmethod
+    def room(symbol, timeframe):
+        return f"analysis:{symbol}:{timeframe}"
+
+    def subscribe(self, sid, symbol, timeframe, encoding='json'):
+        """Move ``sid`` to the (symbol, timeframe) pair.
+
+        Returns the pair it left (or None) and the encoding its analysis
+        messages will use.
+        """
+        key = (symbol, timeframe)
+        previous = None
+        with self._lock:
+            if self._subscriptions.get(sid) != key:
+                previous = self._leave(sid)
+                channel = self._channels.get(key)
+                if channel is None:
+                    channel = self._channels[key] = DeltaChannel(symbol, timeframe, snapshot_every=self.snapshot_every)
+                self._subscriptions[sid] = key
+            encoding = self._channels[key].join(sid, encoding)
+        self.start()
+        return previous, encoding
+
+    def unsubscribe(self, sid):
+        with self._lock:
+            return self._leave(sid)
+
+    def _leave(self, sid):
+        key = self._subscriptions.pop(sid, None)
+        if key is None:
+            return None
+        channel = self._channels[key]
+        channel.leave(sid)
+        if not len(channel):
+            del self._channels[key]
+            self._latest.pop(key, None)
+        return key
+
+    def ack(self, sid, version):
+        with self._lock:
+            channel = self._channel_of(sid)
+            if channel is not None:
+                channel.ack(sid, version)
+
+    def send_latest(self, sid):
+        """Send ``sid`` the current candles and a full analysis snapshot for its pair."""
+        with self._lock:
+            key = self._subscriptions.get(sid)
+            channel = self._channels.get(key)
+            entry = self._latest.get(key)
+            if channel is None or entry is None:
+                return False
+            channel.resync(sid)
+            snapshot = channel.snapshot(sid)
+        self.socketio.emit('market_update', entry[1], to=sid)
+        self.socketio.emit(snapshot[0], snapshot[1], to=sid)
+        return True
+
+    def _channel_of(self, sid):
+        return self._channels.get(self._subscriptions.get(sid))
+
+    def start(self):
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error in analysis scheduler: {e}")
+            self.socketio.sleep(self.interval)
+
+    def tick(self):
+        now = self.fetcher.now()
+        with self._lock:
+            due = [
+                (key, self._latest[key][0] if key in self._latest else None)
+                for key in self._channels
+                if key not in self._latest or self._latest[key][0] < _last_closed(now, key[1])
+            ]
+        for (symbol, timeframe), delivered in due:
+            closed = _last_closed(now, timeframe)
+            if self.partitions is None:
+                self._push(symbol, timeframe, closed)
+            else:
+                self._sync(symbol, timeframe, closed, delivered)
+
+    def _sync(self, symbol, timeframe, closed, delivered):
+        stored = self.partitions.latest(symbol, timeframe)
+        if (stored is None or stored[0] < closed) and self.partitions.acquire(symbol, timeframe):
+            self._push(symbol, timeframe, closed)
+        elif stored is not None and (delivered is None or stored[0] > delivered):
+            # computed by the lease holder, which already sent market_update to the room
+            self._deliver(symbol, timeframe, *stored, broadcast=False)
+            self.relayed += 1
+
+    def _push(self, symbol, timeframe, closed):
+        data = self.fetcher.get_historical_data(symbol, timeframe, self.market_limit)
+        if not len(data) or data.timestamp[-1] < _ns(closed):
+            # loaded before this candle closed; reload past the candle cache
+            self.fetcher.invalidate(symbol, timeframe)
+            data = self.fetcher.get_historical_data(symbol, timeframe, self.market_limit)
+
+        result = self.analyze(symbol, timeframe)
+        # the analysis may have loaded a longer series; the chart takes its tail
+        data = self.fetcher.get_historical_data(symbol, timeframe, self.market_limit)
+
+        timestamp = datetime.utcnow().isoformat()
+        market = {'symbol': symbol, 'timeframe': timeframe, 'candles': data.to_records(), 'timestamp': timestamp}
+        if self.partitions is not None:
+            self.partitions.publish(symbol, timeframe, closed, market, result)
+        self._deliver(symbol, timeframe, closed, market, result)
+        self.pushes += 1
+
+    def _deliver(self, symbol, timeframe, closed, market, result, broadcast=True):
+        key = (symbol, timeframe)
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                return
+            self._latest[key] = (closed, market)
+            sends = channel.publish(result)
+
+        if broadcast:
+            self.socketio.emit('market_update', market, to=self.room(symbol, timeframe))
+        for event, payload, sids in sends:
+            for sid in sids:
+                self.socketio.emit(event, payload, to=sid)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pairs': len(self._channels),
+                'subscribers': len(self._subscriptions),
+                'pushes': self.pushes,
+                'relayed': self.relayed,
+                'channels': {f"{symbol} {timeframe}": channel.stats()
+                             for (symbol, timeframe), channel in self._channels.items()},
+                'partitions': self.partitions.stats() if self.partitions is not None else None,
+            }
+
+
+def _last_closed(now, timeframe):
+    return candle_open_time(now, timeframe) - timedelta(minutes=TIMEFRAME_MINUTES.get(timeframe, 60))
+
+
+def _ns(moment):
+    return np.datetime64(moment, 'ns').astype(np.int64)
@@ -1,13 +1,14 @@
+import math
 import os
+import subprocess
+import sys
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, jsonify, request, Response
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
-import json
+from datetime import datetime, timedelta, timezone
 
 app = Flask(__name__)
 
@@ -18,7 +19,7 @@ try:
 except ImportError:
     # Fallback to default SQLite configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'trading-ai-secret-key-2024')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///trading.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///trading.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
         'pool_pre_ping': True,
@@ -26,141 +27,545 @@ except ImportError:
     }
 
 CORS(app)
-db = SQLAlchemy(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+
+from serialization import FastJSONProvider, dumps
+app.json = FastJSONProvider(app)
+
+from models import db, Trade, Signal, BacktestResult, MarketData, UserSettings
+db.init_app(app)
+
+from message_queue import client_manager
+
+# with a message queue, emits from any server process reach clients on all of them
+message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE') or None
+queue_manager = client_manager(message_queue)
+if queue_manager is not None:
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', client_manager=queue_manager)
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', message_queue=message_queue)
 
 print(f"Using database: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
-from models import Trade, Signal, BacktestResult, MarketData, UserSettings
 from trading_engine import TradingEngine
-from market_data import MarketDataFetcher
-from backtester import Backtester
+from pattern_detector import PatternDetector
+from market_data import MarketDataFetcher, REPLAY_EPOCH, SUPPORTED_PAIRS
+from backtester import Backtester, STRATEGIES
+from analysis_cache import AnalysisCache
+from streaming_indicators import IndicatorStreams
+from ohlcv_store import OHLCVStore
+from candle_archive import CandleArchive
+from instrumentation import metrics
+from analysis_scheduler import AnalysisScheduler
+from worker_pool import WorkerPool, PoolBusy, JobTimeout
+from eventlet.semaphore import Semaphore
+from backtest_jobs import BacktestJobManager, JobCancelled
+from analysis_partition import PartitionLeases
+from signal_writer import SignalWriter
+from pagination import keyset_page
+from migrate import missing_columns, missing_indexes
 
+worker_pool = WorkerPool(
+    max_workers=app.config.get('WORKER_POOL_SIZE', 4),
+    max_waiting=app.config.get('WORKER_QUEUE_SIZE', 16),
+    wait_timeout=app.config.get('WORKER_WAIT_TIMEOUT', 5.0),
+    timeout=app.config.get('ANALYSIS_TIMEOUT', 30.0)
+)
+metrics.enabled = app.config.get('METRICS_ENABLED', True)
+metrics.track_allocations = app.config.get('METRICS_TRACK_ALLOCATIONS', True)
 trading_engine = TradingEngine()
-market_fetcher = MarketDataFetcher()
+pattern_detector = PatternDetector()
+# indicators are updated candle by candle on the hub; jobs only get the snapshot
+indicator_streams = IndicatorStreams()
+analysis_cache = AnalysisCache(
+    max_entries=app.config.get('ANALYSIS_CACHE_SIZE', 256),
+    ttl=app.config.get('ANALYSIS_CACHE_TTL', 300)
+)
+candle_archive = CandleArchive(app.config.get('CANDLE_ARCHIVE_DIR', 'candle_archive'))
+market_fetcher = MarketDataFetcher(
+    cache_duration=app.config.get('CANDLE_CACHE_TTL', 60),
+    cache_max_bytes=app.config.get('CANDLE_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+    archive=candle_archive,
+    base_timeframe=app.config.get('BASE_TIMEFRAME') or None,
+    max_base_bars=app.config.get('RESAMPLE_MAX_BASE_BARS', 100000),
+    pause=socketio.sleep
+)
 
 with app.app_context():
     db.create_all()
+    # create_all adds columns and indexes only with new tables; older databases need migrate.py
+    for table, column in missing_columns(db.engine):
+        print(f"Missing column {column} on {table}: run python migrate.py")
+    for table, index in missing_indexes(db.engine):
+        print(f"Missing index {index} on {table}: run python migrate.py")
+    market_fetcher.store = OHLCVStore(db.engine, pause=socketio.sleep)
+    signal_writer = None
+    if app.config.get('SIGNAL_PERSISTENCE', True):
+        signal_writer = SignalWriter(
+            db.engine,
+            journal_dir=app.config.get('SIGNAL_JOURNAL_DIR', 'signal_journal'),
+            max_batch=app.config.get('SIGNAL_FLUSH_SIZE', 500),
+            flush_interval=app.config.get('SIGNAL_FLUSH_INTERVAL', 2.0),
+            fsync=app.config.get('SIGNAL_JOURNAL_FSYNC', False)
+        )
+        signal_writer.start(socketio.start_background_task, socketio.sleep)
+
+@app.errorhandler(PoolBusy)
+def handle_pool_busy(e):
+    response = jsonify({'error': 'Server busy, retry shortly', 'detail': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+class InvalidParams(ValueError):
+    pass
+
+@app.errorhandler(InvalidParams)
+def handle_invalid_params(e):
+    return jsonify({'error': str(e)}), 400
+
+@app.errorhandler(JobTimeout)
+def handle_job_timeout(e):
+    response = jsonify({'error': 'Request timed out', 'detail': str(e)})
+    response.status_code = 504
+    return response
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def get_cached_analysis(symbol, timeframe):
+    data = market_fetcher.get_historical_data(symbol, timeframe, 200)
+    last_candle = int(data.timestamp[-1]) if len(data) else None
+    
+    def compute():
+        technical = indicator_streams.snapshot(symbol, timeframe, data)
+        analysis = worker_pool.run(trading_engine.analyze_market, symbol, data, technical)
+        # recomputed after every expiry or invalidation, and in every process,
+        # so the writer keeps the signals once per candle
+        if signal_writer is not None:
+            candle_time = data.timestamp[-1:].view('datetime64[ns]').astype('datetime64[us]').item() if len(data) else None
+            signal_writer.record_signals(analysis['signals'], symbol, timeframe, candle_time)
+        return analysis
+    
+    return analysis_cache.get_or_compute((symbol, timeframe, last_candle), compute)
+
+partitioned = app.config.get('ANALYSIS_PARTITIONED')
+if partitioned is None:
+    partitioned = message_queue is not None
+partitions = None
+if partitioned:
+    with app.app_context():
+        partitions = PartitionLeases(db.engine, lease_seconds=app.config.get('ANALYSIS_LEASE_SECONDS', 60.0))
+scheduler = AnalysisScheduler(
+    socketio, market_fetcher, get_cached_analysis,
+    interval=app.config.get('ANALYSIS_PUSH_INTERVAL', 1.0),
+    snapshot_every=app.config.get('ANALYSIS_SNAPSHOT_EVERY', 10),
+    partitions=partitions
+)
+
+def limit_argument(default, maximum):
+    """The ``limit`` query argument clamped to ``[1, maximum]``, or None if it is not an integer."""
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        return None
+    return max(1, min(limit, maximum))
+
 @app.route('/api/market-data/<symbol>')
 def get_market_data(symbol):
     symbol = symbol.replace('-', '/')
     timeframe = request.args.get('timeframe', '1h')
-    limit = int(request.args.get('limit', 100))
+    limit = limit_argument(100, app.config.get('MAX_CANDLE_LIMIT', 5000))
+    if limit is None:
+        return jsonify({'error': 'limit must be an integer'}), 400
     data = market_fetcher.get_historical_data(symbol, timeframe, limit)
-    return jsonify(data)
+    return jsonify(data.to_records())
 
 @app.route('/api/analysis/<symbol>')
 def get_analysis(symbol):
     symbol = symbol.replace('-', '/')
     timeframe = request.args.get('timeframe', '1h')
-    data = market_fetcher.get_historical_data(symbol, timeframe, 200)
-    analysis = trading_engine.analyze_market(symbol, data)
-    return jsonify(analysis)
+    return jsonify(get_cached_analysis(symbol, timeframe))
+
+@app.route('/api/patterns/<symbol>')
+def get_pattern_history(symbol):
+    symbol = symbol.replace('-', '/')
+    timeframe = request.args.get('timeframe', '1h')
+    limit = limit_argument(200, app.config.get('MAX_CANDLE_LIMIT', 5000))
+    if limit is None:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    data = market_fetcher.get_historical_data(symbol, timeframe, limit)
+    events = pattern_detector.scan_history(data.to_dataframe())
+    events['timestamp'] = events['timestamp'].astype(str)
+    return jsonify(events.reset_index().to_dict('records'))
+
+def paged_response(query, time_column, id_column, filters, default_limit=50):
+    """Newest-first page of ``query`` for a list endpoint.
+    
+    ``filters`` maps query-string arguments to the columns they match. The page
+    is the JSON array the endpoint always returned; the cursor for the next
+    page, if any, is in the ``X-Next-Cursor`` header and goes back as ``cursor``.
+    """
+    for argument, column in filters.items():
+        value = request.args.get(argument)
+        if value:
+            query = query.filter(column == (value.replace('-', '/') if argument == 'symbol' else value))
+    
+    limit = limit_argument(default_limit, app.config.get('MAX_PAGE_SIZE', 500))
+    if limit is None:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    try:
+        rows, next_cursor = keyset_page(query, time_column, id_column, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    response = jsonify([row.to_dict() for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/signals')
 def get_signals():
     with app.app_context():
-        signals = Signal.query.order_by(Signal.timestamp.desc()).limit(50).all()
-        return jsonify([s.to_dict() for s in signals])
+        return paged_response(Signal.query, Signal.timestamp, Signal.id,
+                              {'symbol': Signal.symbol, 'status': Signal.status, 'grade': Signal.grade})
 
 @app.route('/api/trades')
 def get_trades():
     with app.app_context():
-        trades = Trade.query.order_by(Trade.entry_time.desc()).limit(50).all()
-        return jsonify([t.to_dict() for t in trades])
+        return paged_response(Trade.query, Trade.entry_time, Trade.id,
+                              {'symbol': Trade.symbol, 'status': Trade.status, 'grade': Trade.signal_grade})
+
+def parse_replay_at(value):
+    if not value:
+        return REPLAY_EPOCH
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidParams('replay_at must be an ISO 8601 date and time')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def request_number(data, name, default, cast):
+    try:
+        value = cast(data.get(name, default))
+    except (TypeError, ValueError, OverflowError):
+        raise InvalidParams(f"{name} must be {'an integer' if cast is int else 'a number'}")
+    if not math.isfinite(value):
+        raise InvalidParams(f"{name} must be finite")
+    return value
+
+def sizing_params(data):
+    """Validated capital, risk and bar count of a backtest; raises ``InvalidParams`` (400)."""
+    if not isinstance(data, dict):
+        raise InvalidParams('Expected a JSON object')
+    initial_capital = request_number(data, 'initial_capital', 10000, float)
+    if initial_capital <= 0:
+        raise InvalidParams('initial_capital must be positive')
+    risk_per_trade = request_number(data, 'risk_per_trade', 0.02, float)
+    if not 0 < risk_per_trade <= 1:
+        raise InvalidParams('risk_per_trade must be a fraction between 0 and 1')
+    periods = request_number(data, 'periods', 200, int)
+    if periods < 1:
+        raise InvalidParams('periods must be positive')
+    periods = min(periods, app.config.get('BACKTEST_MAX_PERIODS', 100000))
+    return {'initial_capital': initial_capital, 'risk_per_trade': risk_per_trade, 'periods': periods}
+
+def backtest_params(data):
+    params = sizing_params(data)
+    seed = request_number(data, 'seed', None, int) if data.get('seed') is not None else None
+    params.update({
+        'symbol': data.get('symbol', 'EUR/USD'),
+        'strategy': data.get('strategy', 'smc_ict'),
+        'timeframe': data.get('timeframe', '1h'),
+        'vectorized': bool(data.get('vectorized', True)),
+        'seed': seed,
+        'replay_at': parse_replay_at(data.get('replay_at')).isoformat() if seed is not None else None
+    })
+    return params
+
+def prepare_backtest(params):
+    """Load the candles for a backtest and return ``run(progress=None)`` simulating on them.
+    
+    Loading uses the shared caches, so it happens here on the hub; ``run`` is
+    safe to hand to a worker thread.
+    """
+    seed = params['seed']
+    if seed is None:
+        backtester = Backtester(initial_capital=params['initial_capital'], risk_per_trade=params['risk_per_trade'],
+                                market_fetcher=market_fetcher, archive=candle_archive)
+    else:
+        # a seeded run generates its own pinned dataset rather than reading the
+        # shared, persisted candles, so the same request always sees the same bars
+        fetcher = MarketDataFetcher(seed=seed, replay_at=datetime.fromisoformat(params['replay_at']))
+        backtester = Backtester(initial_capital=params['initial_capital'], risk_per_trade=params['risk_per_trade'],
+                                market_fetcher=fetcher)
+    
+    candles = backtester.load_history(params['symbol'], params['timeframe'], params['periods'])
+    
+    def run(progress=None):
+        result = backtester.run_backtest(params['symbol'], params['strategy'], periods=params['periods'],
+                                         vectorized=params['vectorized'], data=candles,
+                                         timeframe=params['timeframe'], progress=progress)
+        if seed is not None:
+            result['seed'] = seed
+            result['replay_at'] = params['replay_at']
+        return result
+    
+    return run
+
+def save_backtest_result(params, result):
+    with app.app_context():
+        backtest = BacktestResult(
+            symbol=params['symbol'],
+            strategy=params['strategy'],
+            initial_capital=params['initial_capital'],
+            final_capital=float(result['final_capital']),
+            total_trades=int(result['total_trades']),
+            win_rate=float(result['win_rate']),
+            sharpe_ratio=float(result['sharpe_ratio']),
+            max_drawdown=float(result['max_drawdown']),
+            total_pips=float(result['total_pips']),
+            result_data=dumps(result)
+        )
+        db.session.add(backtest)
+        db.session.commit()
+        return backtest.id
+
+backtest_jobs = BacktestJobManager(
+    socketio,
+    WorkerPool(
+        max_workers=app.config.get('BACKTEST_JOB_WORKERS', 2),
+        max_waiting=app.config.get('BACKTEST_JOB_QUEUE_SIZE', 32),
+        wait_timeout=None,
+        timeout=app.config.get('BACKTEST_JOB_TIMEOUT', 3600.0)
+    ),
+    prepare_backtest,
+    save=lambda job, result: save_backtest_result(job.params, result),
+    max_pending=app.config.get('BACKTEST_JOB_QUEUE_SIZE', 32),
+    progress_interval=app.config.get('BACKTEST_PROGRESS_INTERVAL', 0.5)
+)
 
 @app.route('/api/backtest', methods=['POST'])
 def run_backtest():
-    data = request.get_json()
-    symbol = data.get('symbol', 'EUR/USD')
-    strategy = data.get('strategy', 'smc_ict')
-    initial_capital = data.get('initial_capital', 10000)
+    params = backtest_params(request.get_json() or {})
     
-    backtester = Backtester(initial_capital=initial_capital)
-    result = backtester.run_backtest(symbol, strategy)
+    # candles are loaded here, the simulation itself runs on a worker thread
+    run = prepare_backtest(params)
+    timed_out = []
+    
+    def progress(*report):
+        # a thread cannot be interrupted: once the request has timed out, the
+        # backtest stops at its next progress report and frees its pool slot
+        if timed_out:
+            raise JobCancelled()
+    
+    def run_until_timeout():
+        try:
+            return run(progress)
+        except JobCancelled:
+            return None
     
     try:
-        with app.app_context():
-            backtest = BacktestResult(
-                symbol=symbol,
-                strategy=strategy,
-                initial_capital=float(initial_capital),
-                final_capital=float(result['final_capital']),
-                total_trades=int(result['total_trades']),
-                win_rate=float(result['win_rate']),
-                sharpe_ratio=float(result['sharpe_ratio']),
-                max_drawdown=float(result['max_drawdown']),
-                total_pips=float(result['total_pips']),
-                result_data=json.dumps(result, default=str)
-            )
-            db.session.add(backtest)
-            db.session.commit()
+        result = worker_pool.run(run_until_timeout, timeout=app.config.get('BACKTEST_TIMEOUT', 120.0))
+    except JobTimeout:
+        timed_out.append(True)
+        raise
+    
+    try:
+        save_backtest_result(params, result)
     except Exception as e:
         print(f"Error saving backtest result: {e}")
     
     return jsonify(result)
 
+@app.route('/api/backtest/jobs', methods=['POST'])
+def submit_backtest_job():
+    job = backtest_jobs.submit(backtest_params(request.get_json() or {}))
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = f"/api/backtest/jobs/{job.id}"
+    return response
+
+@app.route('/api/backtest/jobs')
+def list_backtest_jobs():
+    return jsonify([job.to_dict() for job in backtest_jobs.list()])
+
+@app.route('/api/backtest/jobs/<job_id>')
+def get_backtest_job(job_id):
+    job = backtest_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/backtest/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_backtest_job(job_id):
+    job = backtest_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/backtest/jobs/<job_id>/result')
+def get_backtest_job_result(job_id):
+    job = backtest_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.state != 'completed':
+        return jsonify({'error': f"Job is {job.state}", 'state': job.state}), 409
+    return jsonify(job.result)
+
+def name_list(data, name):
+    """Optional list of symbol or strategy names; raises ``InvalidParams`` (400)."""
+    names = data.get(name) or []
+    if not isinstance(names, list) or not all(isinstance(n, str) and n and ',' not in n for n in names):
+        raise InvalidParams(f"{name} must be a list of names")
+    return names
+
+# every batch run is a process using up to its worker count of cores
+batch_slots = Semaphore(app.config.get('BACKTEST_BATCH_MAX_RUNNING', 1))
+
+@app.route('/api/backtest/batch', methods=['POST'])
+def run_batch_backtest():
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        raise InvalidParams('Expected a JSON object')
+    param_sets = data.get('params') or [{}]
+    if not isinstance(param_sets, list):
+        raise InvalidParams('params must be a list of parameter sets')
+    param_sets = [sizing_params(p) for p in param_sets]
+    symbols = name_list(data, 'symbols')
+    strategies = name_list(data, 'strategies')
+    timeframe = data.get('timeframe', '1h')
+    if not isinstance(timeframe, str):
+        raise InvalidParams('timeframe must be a string')
+    
+    grid_size = (len(symbols) or len(SUPPORTED_PAIRS)) * (len(strategies) or len(STRATEGIES)) * len(param_sets)
+    max_grid = app.config.get('BACKTEST_BATCH_MAX_GRID', 500)
+    if grid_size > max_grid:
+        raise InvalidParams(f"grid of {grid_size} backtests exceeds the limit of {max_grid}")
+    max_workers = app.config.get('BACKTEST_BATCH_MAX_WORKERS') or os.cpu_count() or 1
+    workers = min(max(1, request_number(data, 'workers', max_workers, int)), max_workers)
+    
+    # the grid runs through the batch_backtester CLI in a process of its own:
+    # worker processes spawned from here would re-import app.py as their
+    # __main__ and repeat the whole server startup
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_backtester.py'),
+               '--timeframe', timeframe, '--params', dumps(param_sets), '--workers', str(workers)]
+    if symbols:
+        command += ['--symbols', ','.join(symbols)]
+    if strategies:
+        command += ['--strategies', ','.join(strategies)]
+    if data.get('full', False):
+        command.append('--full')
+    seed = data.get('seed')
+    if seed is not None:
+        command += ['--seed', str(request_number(data, 'seed', None, int)), '--replay-at', parse_replay_at(data.get('replay_at')).isoformat()]
+    
+    if not batch_slots.acquire(blocking=False):
+        raise PoolBusy('a batch backtest is already running')
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    except Exception:
+        batch_slots.release()
+        raise
+    
+    def generate():
+        for line in process.stdout:
+            yield line
+    
+    def close():
+        # runs once the response is done or the client disconnects early,
+        # which stops the rest of the grid
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+        batch_slots.release()
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(close)
+    return response
+
 @app.route('/api/backtest-results')
 def get_backtest_results():
     with app.app_context():
-        results = BacktestResult.query.order_by(BacktestResult.timestamp.desc()).limit(10).all()
-        return jsonify([r.to_dict() for r in results])
+        return paged_response(BacktestResult.query, BacktestResult.timestamp, BacktestResult.id,
+                              {'symbol': BacktestResult.symbol, 'strategy': BacktestResult.strategy},
+                              default_limit=10)
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    stats = {'analysis': analysis_cache.stats(), 'candles': market_fetcher.cache.stats(),
+             'scheduler': scheduler.stats(), 'workers': worker_pool.stats(),
+             'backtest_jobs': backtest_jobs.stats(), 'indicators': indicator_streams.stats()}
+    if signal_writer is not None:
+        stats['signal_writer'] = signal_writer.stats()
+    if market_fetcher.resampler is not None:
+        stats['resampler'] = market_fetcher.resampler.stats()
+    return jsonify(stats)
+
+@app.route('/api/metrics')
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/supported-pairs')
 def get_supported_pairs():
-    pairs = [
-        {'symbol': 'EUR/USD', 'name': 'Euro/US Dollar', 'category': 'forex'},
-        {'symbol': 'GBP/USD', 'name': 'British Pound/US Dollar', 'category': 'forex'},
-        {'symbol': 'USD/JPY', 'name': 'US Dollar/Japanese Yen', 'category': 'forex'},
-        {'symbol': 'AUD/USD', 'name': 'Australian Dollar/US Dollar', 'category': 'forex'},
-        {'symbol': 'USD/CHF', 'name': 'US Dollar/Swiss Franc', 'category': 'forex'},
-        {'symbol': 'USD/CAD', 'name': 'US Dollar/Canadian Dollar', 'category': 'forex'},
-        {'symbol': 'NZD/USD', 'name': 'New Zealand Dollar/US Dollar', 'category': 'forex'},
-        {'symbol': 'EUR/GBP', 'name': 'Euro/British Pound', 'category': 'forex'},
-        {'symbol': 'EUR/JPY', 'name': 'Euro/Japanese Yen', 'category': 'forex'},
-        {'symbol': 'GBP/JPY', 'name': 'British Pound/Japanese Yen', 'category': 'forex'},
-        {'symbol': 'XAU/USD', 'name': 'Gold/US Dollar', 'category': 'commodity'},
-        {'symbol': 'XAG/USD', 'name': 'Silver/US Dollar', 'category': 'commodity'},
-        {'symbol': 'BTC/USD', 'name': 'Bitcoin/US Dollar', 'category': 'crypto'},
-        {'symbol': 'ETH/USD', 'name': 'Ethereum/US Dollar', 'category': 'crypto'},
-    ]
-    return jsonify(pairs)
+    return jsonify(SUPPORTED_PAIRS)
 
 @app.route('/api/strategies')
 def get_strategies():
-    strategies = [
-        {'id': 'smc_ict', 'name': 'SMC/ICT Strategy', 'description': 'Smart Money Concepts with ICT methodology'},
-        {'id': 'liquidity_grab', 'name': 'Liquidity Grab', 'description': 'Asian session liquidity sweep strategy'},
-        {'id': 'order_block', 'name': 'Order Block Trading', 'description': 'Trade based on institutional order blocks'},
-        {'id': 'fvg_strategy', 'name': 'Fair Value Gap', 'description': 'Trade imbalances and fair value gaps'},
-        {'id': 'breakout_retest', 'name': 'Breakout & Retest', 'description': 'Classic breakout with confirmation'},
-        {'id': 'mean_reversion', 'name': 'Mean Reversion', 'description': 'Statistical mean reversion strategy'},
-        {'id': 'momentum', 'name': 'Momentum Strategy', 'description': 'Trend following with momentum indicators'},
-        {'id': 'multi_timeframe', 'name': 'Multi-Timeframe', 'description': 'Confluence across multiple timeframes'},
-    ]
-    return jsonify(strategies)
+    return jsonify(STRATEGIES)
 
 @socketio.on('connect')
 def handle_connect():
     emit('connected', {'status': 'Connected to Trading AI'})
 
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    scheduler.unsubscribe(request.sid)
+
 @socketio.on('subscribe')
 def handle_subscribe(data):
     symbol = data.get('symbol', 'EUR/USD')
-    emit('subscribed', {'symbol': symbol, 'status': 'Subscribed'})
+    timeframe = data.get('timeframe', '1h')
+    
+    previous, encoding = scheduler.subscribe(request.sid, symbol, timeframe, data.get('encoding', 'json'))
+    if previous:
+        leave_room(scheduler.room(*previous))
+    join_room(scheduler.room(symbol, timeframe))
+    emit('subscribed', {'symbol': symbol, 'timeframe': timeframe, 'encoding': encoding, 'status': 'Subscribed'})
+    
+    # later updates arrive when the next candle closes
+    scheduler.send_latest(request.sid)
+
+@socketio.on('analysis_ack')
+def handle_analysis_ack(data):
+    scheduler.ack(request.sid, int(data.get('version', 0)))
+
+@socketio.on('analysis_resync')
+def handle_analysis_resync(data=None):
+    scheduler.send_latest(request.sid)
+
+@socketio.on('watch_backtest')
+def handle_watch_backtest(data):
+    job = backtest_jobs.get(data.get('job_id'))
+    if job is None:
+        emit('backtest_error', {'job_id': data.get('job_id'), 'error': 'Unknown job'})
+        return
+    
+    join_room(backtest_jobs.room(job.id))
+    emit('backtest_status', job.to_dict())
 
 @socketio.on('request_analysis')
 def handle_analysis_request(data):
     symbol = data.get('symbol', 'EUR/USD')
     timeframe = data.get('timeframe', '1h')
     
-    market_data = market_fetcher.get_historical_data(symbol, timeframe, 200)
-    analysis = trading_engine.analyze_market(symbol, market_data)
+    try:
+        analysis = get_cached_analysis(symbol, timeframe)
+    except (PoolBusy, JobTimeout) as e:
+        emit('server_busy', {'symbol': symbol, 'event': 'request_analysis', 'error': str(e)})
+        return
     
     emit('analysis_update', {
         'symbol': symbol,
@@ -174,7 +579,12 @@ def handle_live_narration(data):
     timeframe = data.get('timeframe', '15m')
     
     market_data = market_fetcher.get_historical_data(symbol, timeframe, 50)
-    narration = trading_engine.generate_live_narration(symbol, market_data)
+    try:
+        technical = indicator_streams.snapshot(symbol, timeframe, market_data)
+        narration = worker_pool.run(trading_engine.generate_live_narration, symbol, market_data, technical)
+    except (PoolBusy, JobTimeout) as e:
+        emit('server_busy', {'symbol': symbol, 'event': 'request_live_narration', 'error': str(e)})
+        return
     
     emit('live_narration', {
         'symbol': symbol,
@@ -0,0 +1,187 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from worker_pool import PoolBusy, JobTimeout
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TIMED_OUT = 'timed_out'
+
+FINISHED = (COMPLETED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running backtest, from its progress callback, to stop it."""
+
+
+class BacktestJob:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.state = QUEUED
+        self.progress = None
+        self.result = None
+        self.result_id = None
+        self.error = None
+        self.cancel_requested = False
+        self.submitted_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.state in FINISHED
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'params': self.params,
+            'progress': self.progress,
+            'result_id': self.result_id,
+            'error': self.error,
+            'submitted_at': self.submitted_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class BacktestJobManager:
+    """Runs backtests as background jobs and streams their progress.
+
+    ``submit`` returns at once with a queued job. A green task loads the
+    candles, then runs the backtest on ``pool`` (a ``WorkerPool`` of its own, so
+    long jobs never take the slots interactive analysis needs). The backtest
+    reports through its ``progress`` callback on the worker thread; that only
+    records the numbers, and a green reporter emits ``backtest_progress`` to the
+    job's room every ``progress_interval`` seconds, since Socket.IO must not be
+    touched from a native thread. The same callback raises ``JobCancelled``
+    once a cancel is requested or the job has timed out, which is how a running
+    thread is stopped.
+
+    On completion ``save(job, result)`` persists the result and returns its id.
+    At most ``max_pending`` jobs may be queued or running; the last ``keep``
+    finished jobs stay available for status and result lookups.
+    """
+
+    def __init__(self, socketio, pool, load, save=None, max_pending=32, keep=200, progress_interval=0.5):
+        self.socketio = socketio
+        self.pool = pool
+        self.load = load
+        self.save = save
+        self.max_pending = max_pending
+        self.keep = keep
+        self.progress_interval = progress_interval
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def room(job_id):
+        return f"backtest:{job_id}"
+
+    def submit(self, params):
+        """Queue a backtest described by ``params``; raises ``PoolBusy`` when too many are pending."""
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolBusy(f"{pending} backtest jobs already pending")
+            job = BacktestJob(params)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._prune()
+        self.socketio.start_background_task(self._execute, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id):
+        """Request cancellation. A queued job stops before it starts, a running one at its next progress report."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_requested = True
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
+
+    def _execute(self, job):
+        self.socketio.start_background_task(self._report, job)
+        try:
+            run = self.load(job.params)
+            result = self.pool.run(self._run, job, run)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except JobTimeout as e:
+            # the thread cannot be interrupted; stop it at its next progress report
+            job.cancel_requested = True
+            self._finish(job, TIMED_OUT, str(e))
+        except Exception as e:
+            print(f"Error in backtest job {job.id}: {e}")
+            self._finish(job, FAILED, str(e))
+        else:
+            job.result = result
+            if self.save is not None:
+                try:
+                    job.result_id = self.save(job, result)
+                except Exception as e:
+                    print(f"Error saving backtest result: {e}")
+            self._finish(job, COMPLETED)
+
+    def _run(self, job, run):
+        # worker thread: plain attribute writes only
+        if job.cancel_requested:
+            raise JobCancelled()
+        job.state = RUNNING
+        job.started_at = datetime.utcnow()
+
+        def progress(bars, total, trades, equity):
+            if job.cancel_requested:
+                raise JobCancelled()
+            job.progress = {'bars': int(bars), 'total_bars': int(total),
+                            'trades': int(trades), 'equity': round(float(equity), 2)}
+
+        return run(progress)
+
+    def _finish(self, job, state, error=None):
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        job.state = state
+
+    def _report(self, job):
+        sent = None
+        while True:
+            finished = job.finished
+            progress = job.progress
+            if progress is not None and progress is not sent:
+                self.socketio.emit('backtest_progress', dict(progress, job_id=job.id, state=job.state),
+                                   to=self.room(job.id))
+                sent = progress
+            if finished:
+                break
+            self.socketio.sleep(self.progress_interval)
+        self.socketio.emit('backtest_done', job.to_dict(), to=self.room(job.id))
+
+    def stats(self):
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {'submitted': self.submitted, 'rejected': self.rejected, 'states': states,
+                    'pool': self.pool.stats()}
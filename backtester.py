@@ -2,68 +2,131 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from market_data import MarketDataFetcher
+from candles import CandleSeries, TIMEFRAME_MINUTES, candle_open_time
 from trading_engine import TradingEngine
+from vectorized_signals import VectorizedSignalGenerator, GRADE_CODES, round_like_python
+from position_simulator import PositionSimulator, TradeLedger
 import json
 
+
+STRATEGIES = [
+    {'id': 'smc_ict', 'name': 'SMC/ICT Strategy', 'description': 'Smart Money Concepts with ICT methodology'},
+    {'id': 'liquidity_grab', 'name': 'Liquidity Grab', 'description': 'Asian session liquidity sweep strategy'},
+    {'id': 'order_block', 'name': 'Order Block Trading', 'description': 'Trade based on institutional order blocks'},
+    {'id': 'fvg_strategy', 'name': 'Fair Value Gap', 'description': 'Trade imbalances and fair value gaps'},
+    {'id': 'breakout_retest', 'name': 'Breakout & Retest', 'description': 'Classic breakout with confirmation'},
+    {'id': 'mean_reversion', 'name': 'Mean Reversion', 'description': 'Statistical mean reversion strategy'},
+    {'id': 'momentum', 'name': 'Momentum Strategy', 'description': 'Trend following with momentum indicators'},
+    {'id': 'multi_timeframe', 'name': 'Multi-Timeframe', 'description': 'Confluence across multiple timeframes'},
+]
+
+
+def _sequential_sum(values):
+    # left-to-right like sum() so totals do not depend on NumPy's pairwise summation
+    return float(np.cumsum(values)[-1]) if len(values) else 0
+
+
 class Backtester:
-    def __init__(self, initial_capital=10000, risk_per_trade=0.02):
+    def __init__(self, initial_capital=10000, risk_per_trade=0.02, market_fetcher=None, archive=None, seed=None):
         self.initial_capital = initial_capital
         self.risk_per_trade = risk_per_trade
-        self.market_fetcher = MarketDataFetcher()
+        self.market_fetcher = market_fetcher or MarketDataFetcher(seed=seed)
+        self.archive = archive
         self.trading_engine = TradingEngine()
+        self.lookback = 50
+        self.signal_generator = VectorizedSignalGenerator(lookback=self.lookback)
+        self.position_simulator = PositionSimulator()
     
-    def run_backtest(self, symbol, strategy, periods=200):
-        data = self.market_fetcher.get_historical_data(symbol, '1h', periods)
+    def run_backtest(self, symbol, strategy, periods=200, vectorized=True, data=None, timeframe='1h', progress=None):
+        if data is None:
+            data = self.load_history(symbol, timeframe, periods)
         
-        if not data or len(data) < 100:
+        candles = CandleSeries.coerce(data)
+        if candles is None or len(candles) < 100:
             return self._empty_result(symbol, strategy)
         
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp').reset_index(drop=True)
+        df = candles.to_dataframe()
+        
+        if vectorized:
+            ledger, equity_curve = self._simulate_vectorized(df)
+            if progress is not None:
+                bars = len(df) - 10 - self.lookback
+                progress(bars, bars, len(ledger), equity_curve[-1])
+            return self._calculate_metrics(symbol, strategy, ledger, equity_curve)
         
+        def signal_at(i):
+            analysis = self.trading_engine.analyze_market(symbol, candles[i-self.lookback:i+1])
+            if not analysis['signals']:
+                return None
+            signal = analysis['signals'][0]
+            if signal['grade'] not in ['S', 'A', 'B']:
+                return None
+            current_price = float(df['close'].iloc[i])
+            atr = analysis['technical'].get('atr', {}).get('value', current_price * 0.001)
+            return signal['direction'], signal['grade'], atr
+        
+        trades, equity_curve = self._simulate(df, signal_at, progress)
+        return self._calculate_metrics(symbol, strategy, TradeLedger.from_records(trades), equity_curve)
+    
+    def _simulate_vectorized(self, df):
+        signals = self.signal_generator.generate(df)
+        first_bar = self.lookback
+        last_bar = len(df) - 11
+        
+        entries = first_bar + np.flatnonzero(signals['grade'][first_bar:last_bar + 1] >= GRADE_CODES.index('B'))
+        grades = np.array(GRADE_CODES, dtype=object)[signals['grade'][entries]]
+        atr = round_like_python(signals['atr'][entries], 6)
+        
+        return self.position_simulator.simulate(
+            df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float), df['close'].to_numpy(dtype=float),
+            entries, signals['direction'][entries], grades, atr,
+            first_bar, last_bar, self.initial_capital, self.risk_per_trade,
+            timestamps=df['timestamp'].array
+        )
+    
+    def _simulate(self, df, signal_at, progress=None):
         capital = self.initial_capital
         trades = []
         equity_curve = [capital]
         positions = []
         
-        lookback = 50
+        # progress(bars_done, total_bars, closed_trades, equity) about every 1% of the run
+        total_bars = len(df) - 10 - self.lookback
+        report_every = max(1, total_bars // 100)
         
-        for i in range(lookback, len(df) - 10):
-            window = df.iloc[i-lookback:i+1]
+        for i in range(self.lookback, len(df) - 10):
+            if progress is not None and (i - self.lookback) % report_every == 0:
+                progress(i - self.lookback, total_bars, len(trades), capital)
             
-            analysis = self.trading_engine.analyze_market(symbol, window.to_dict('records'))
+            signal = signal_at(i)
             
-            if analysis['signals']:
-                signal = analysis['signals'][0]
+            if signal:
+                direction, grade, atr = signal
+                current_price = float(df['close'].iloc[i])
                 
-                if signal['grade'] in ['S', 'A', 'B']:
-                    current_price = float(df['close'].iloc[i])
-                    atr = analysis['technical'].get('atr', {}).get('value', current_price * 0.001)
-                    
-                    if signal['direction'] == 'long':
-                        stop_loss = current_price - (2 * atr)
-                        take_profit = current_price + (3 * atr)
-                    else:
-                        stop_loss = current_price + (2 * atr)
-                        take_profit = current_price - (3 * atr)
-                    
-                    risk_amount = capital * self.risk_per_trade
-                    sl_distance = abs(current_price - stop_loss)
-                    position_size = risk_amount / sl_distance if sl_distance > 0 else 0.01
-                    
-                    trade = {
-                        'entry_index': i,
-                        'entry_price': current_price,
-                        'entry_time': str(df['timestamp'].iloc[i]),
-                        'direction': signal['direction'],
-                        'stop_loss': stop_loss,
-                        'take_profit': take_profit,
-                        'position_size': position_size,
-                        'grade': signal['grade'],
-                        'status': 'open'
-                    }
-                    positions.append(trade)
+                if direction == 'long':
+                    stop_loss = current_price - (2 * atr)
+                    take_profit = current_price + (3 * atr)
+                else:
+                    stop_loss = current_price + (2 * atr)
+                    take_profit = current_price - (3 * atr)
+                
+                risk_amount = capital * self.risk_per_trade
+                sl_distance = abs(current_price - stop_loss)
+                position_size = risk_amount / sl_distance if sl_distance > 0 else 0.01
+                
+                trade = {
+                    'entry_index': i,
+                    'entry_price': current_price,
+                    'entry_time': str(df['timestamp'].iloc[i]),
+                    'direction': direction,
+                    'stop_loss': stop_loss,
+                    'take_profit': take_profit,
+                    'position_size': position_size,
+                    'grade': grade,
+                    'status': 'open'
+                }
+                positions.append(trade)
             
             closed_positions = []
             for pos in positions:
@@ -141,24 +204,29 @@ class Backtester:
                 capital += pnl
                 trades.append(pos)
         
-        return self._calculate_metrics(symbol, strategy, trades, equity_curve)
+        if progress is not None:
+            progress(total_bars, total_bars, len(trades), capital)
+        return trades, equity_curve
     
-    def _calculate_metrics(self, symbol, strategy, trades, equity_curve):
-        if not trades:
+    def _calculate_metrics(self, symbol, strategy, ledger, equity_curve):
+        if not len(ledger):
             return self._empty_result(symbol, strategy)
         
-        total_trades = len(trades)
-        winning_trades = [t for t in trades if t['pnl'] > 0]
-        losing_trades = [t for t in trades if t['pnl'] <= 0]
+        total_trades = len(ledger)
+        pnl = ledger.pnl
+        winning = pnl > 0
+        winning_pnl = pnl[winning]
+        losing_pnl = pnl[~winning]
         
-        win_rate = len(winning_trades) / total_trades * 100 if total_trades > 0 else 0
+        win_rate = len(winning_pnl) / total_trades * 100 if total_trades > 0 else 0
         
-        total_pips = sum(t.get('pips', 0) for t in trades)
-        total_pnl = sum(t.get('pnl', 0) for t in trades)
+        total_pips = _sequential_sum(ledger.pips)
+        total_pnl = _sequential_sum(pnl)
         
-        avg_win = np.mean([t['pnl'] for t in winning_trades]) if winning_trades else 0
-        avg_loss = abs(np.mean([t['pnl'] for t in losing_trades])) if losing_trades else 1
-        profit_factor = abs(sum(t['pnl'] for t in winning_trades) / sum(t['pnl'] for t in losing_trades)) if losing_trades and sum(t['pnl'] for t in losing_trades) != 0 else 0
+        avg_win = np.mean(winning_pnl) if len(winning_pnl) else 0
+        avg_loss = abs(np.mean(losing_pnl)) if len(losing_pnl) else 1
+        losing_total = _sequential_sum(losing_pnl)
+        profit_factor = abs(_sequential_sum(winning_pnl) / losing_total) if len(losing_pnl) and losing_total != 0 else 0
         
         equity_series = pd.Series(equity_curve)
         returns = equity_series.pct_change().dropna()
@@ -174,18 +242,17 @@ class Backtester:
         final_capital = equity_curve[-1] if equity_curve else self.initial_capital
         
         grade_distribution = {}
-        for t in trades:
-            grade = t.get('grade', 'Unknown')
-            if grade not in grade_distribution:
-                grade_distribution[grade] = {'count': 0, 'wins': 0, 'total_pnl': 0}
-            grade_distribution[grade]['count'] += 1
-            if t['pnl'] > 0:
-                grade_distribution[grade]['wins'] += 1
-            grade_distribution[grade]['total_pnl'] += t['pnl']
-        
-        for grade in grade_distribution:
-            count = grade_distribution[grade]['count']
-            grade_distribution[grade]['win_rate'] = (grade_distribution[grade]['wins'] / count * 100) if count > 0 else 0
+        grades, first_seen = np.unique(ledger.grade.astype(str), return_index=True)
+        for grade in grades[np.argsort(first_seen)].tolist():
+            mask = ledger.grade == grade
+            count = int(mask.sum())
+            wins = int((mask & winning).sum())
+            grade_distribution[grade] = {
+                'count': count,
+                'wins': wins,
+                'total_pnl': _sequential_sum(pnl[mask]),
+                'win_rate': (wins / count * 100) if count > 0 else 0
+            }
         
         return {
             'symbol': symbol,
@@ -194,8 +261,8 @@ class Backtester:
             'final_capital': round(final_capital, 2),
             'total_return': round((final_capital - self.initial_capital) / self.initial_capital * 100, 2),
             'total_trades': total_trades,
-            'winning_trades': len(winning_trades),
-            'losing_trades': len(losing_trades),
+            'winning_trades': len(winning_pnl),
+            'losing_trades': len(losing_pnl),
             'win_rate': round(win_rate, 2),
             'total_pips': round(total_pips, 1),
             'total_pnl': round(total_pnl, 2),
@@ -205,11 +272,31 @@ class Backtester:
             'sharpe_ratio': round(sharpe_ratio, 2),
             'max_drawdown': round(max_drawdown, 2),
             'equity_curve': equity_curve[::10] if len(equity_curve) > 50 else equity_curve,
-            'trades': trades[-20:],
+            'trades': ledger.to_records(max(0, total_trades - 20)),
             'grade_distribution': grade_distribution,
             'timestamp': datetime.utcnow().isoformat()
         }
     
+    def load_history(self, symbol, timeframe, periods):
+        # long histories are read straight from the archive as a memmap view
+        # instead of going through the fetcher's in-memory cache, but only when
+        # it holds the whole window up to the last closed candle
+        if self.archive is None:
+            return self.market_fetcher.get_historical_data(symbol, timeframe, periods)
+        
+        step = timedelta(minutes=TIMEFRAME_MINUTES.get(timeframe, 60))
+        last_closed = np.datetime64(candle_open_time(self.market_fetcher.now(), timeframe) - step, 'ns').astype(np.int64)
+        archived = self.archive.read(symbol, timeframe, limit=periods)
+        if len(archived) == periods and archived.timestamp[-1] == last_closed:
+            return archived
+        
+        candles = self.market_fetcher.get_historical_data(symbol, timeframe, periods)
+        if self.archive.append(symbol, timeframe, candles):
+            archived = self.archive.read(symbol, timeframe, limit=periods)
+            if len(archived) == len(candles) and archived.timestamp[-1] == candles.timestamp[-1]:
+                return archived
+        return candles
+    
     def _empty_result(self, symbol, strategy):
         return {
             'symbol': symbol,
@@ -0,0 +1,178 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import signal
+import sys
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtester import Backtester, STRATEGIES
+from candles import CandleSeries, PRICE_COLUMNS
+from market_data import MarketDataFetcher, REPLAY_EPOCH, SUPPORTED_PAIRS
+from serialization import dumps, loads
+
+DEFAULT_PARAMS = {'initial_capital': 10000, 'risk_per_trade': 0.02, 'periods': 200}
+SUMMARY_FIELDS = ['final_capital', 'total_return', 'total_trades', 'win_rate', 'profit_factor',
+                  'sharpe_ratio', 'max_drawdown', 'total_pips']
+
+
+class SharedCandles:
+    """OHLCV columns for one symbol in a shared memory block.
+
+    Layout is the ``CandleSeries`` one, five float64 rows (open, high, low, close,
+    volume) followed by the int64 epoch-nanosecond timestamps, so workers map the
+    block by name instead of receiving pickled lists of dicts.
+    """
+
+    def __init__(self, data):
+        candles = CandleSeries.coerce(data)
+        self.length = len(candles)
+        size = max(1, self.length * (len(PRICE_COLUMNS) + 1) * 8)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        prices, stamps = _map_block(self.shm, self.length)
+        prices[:] = candles.values
+        stamps[:] = candles.timestamp
+        del prices, stamps
+
+    @property
+    def spec(self):
+        return {'name': self.shm.name, 'length': self.length}
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _map_block(shm, length):
+    prices = np.ndarray((len(PRICE_COLUMNS), length), dtype=np.float64, buffer=shm.buf)
+    stamps = np.ndarray((length,), dtype=np.int64, buffer=shm.buf, offset=prices.nbytes)
+    return prices, stamps
+
+
+def _run_job(spec, job):
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    try:
+        prices, stamps = _map_block(shm, spec['length'])
+        params = job['params']
+        start = max(0, spec['length'] - params['periods'])
+
+        # copied out so the mapping can be closed before the run
+        candles = CandleSeries(stamps[start:].copy(), prices[:, start:].copy())
+        del prices, stamps
+    finally:
+        shm.close()
+
+    backtester = Backtester(initial_capital=params['initial_capital'], risk_per_trade=params['risk_per_trade'])
+    result = backtester.run_backtest(job['symbol'], job['strategy'], data=candles)
+    result['params'] = params
+    return result
+
+
+class BatchBacktester:
+    def __init__(self, max_workers=None, timeframe='1h', seed=None, replay_at=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeframe = timeframe
+        self.market_fetcher = MarketDataFetcher(seed=seed, replay_at=replay_at)
+
+    def build_grid(self, symbols=None, strategies=None, param_sets=None):
+        symbols = symbols or [p['symbol'] for p in SUPPORTED_PAIRS]
+        strategies = strategies or [s['id'] for s in STRATEGIES]
+        param_sets = [dict(DEFAULT_PARAMS, **p) for p in (param_sets or [{}])]
+
+        return [
+            {'symbol': symbol, 'strategy': strategy, 'params': params}
+            for symbol, strategy, params in itertools.product(symbols, strategies, param_sets)
+        ]
+
+    def run(self, jobs):
+        """Run the jobs across worker processes, yielding results as they finish.
+
+        Each symbol is fetched once, at the longest ``periods`` any of its jobs asks
+        for; shorter runs take the most recent bars of the same block.
+        """
+        periods = {}
+        for job in jobs:
+            periods[job['symbol']] = max(periods.get(job['symbol'], 0), job['params']['periods'])
+
+        blocks = {}
+        try:
+            for symbol, count in periods.items():
+                data = self.market_fetcher.get_historical_data(symbol, self.timeframe, count)
+                blocks[symbol] = SharedCandles(data)
+
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as executor:
+                futures = {executor.submit(_run_job, blocks[job['symbol']].spec, job): job for job in jobs}
+                try:
+                    for future in as_completed(futures):
+                        job = futures[future]
+                        try:
+                            yield future.result()
+                        except Exception as e:
+                            # stdout carries the NDJSON results when run as the CLI
+                            print(f"Error in batch backtest {job['symbol']} {job['strategy']}: {e}", file=sys.stderr)
+                            yield {'symbol': job['symbol'], 'strategy': job['strategy'],
+                                   'params': job['params'], 'error': str(e)}
+                finally:
+                    # a consumer that stops early should not wait for the rest of the grid
+                    for future in futures:
+                        future.cancel()
+        finally:
+            for block in blocks.values():
+                block.release()
+
+
+def summarize(result):
+    summary = {'symbol': result['symbol'], 'strategy': result['strategy'], 'params': result.get('params')}
+    if 'error' in result:
+        summary['error'] = result['error']
+        return summary
+    for field in SUMMARY_FIELDS:
+        summary[field] = result.get(field)
+    return summary
+
+
+def _split(value, cast=str):
+    return [cast(v.strip()) for v in value.split(',') if v.strip()] if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run backtests over a grid of symbols, strategies and parameters')
+    parser.add_argument('--symbols', help='comma separated symbols (default: all supported pairs)')
+    parser.add_argument('--strategies', help='comma separated strategy ids (default: all strategies)')
+    parser.add_argument('--capital', default=str(DEFAULT_PARAMS['initial_capital']), help='comma separated initial capital values')
+    parser.add_argument('--risk', default=str(DEFAULT_PARAMS['risk_per_trade']), help='comma separated risk per trade values')
+    parser.add_argument('--periods', default=str(DEFAULT_PARAMS['periods']), help='comma separated bar counts')
+    parser.add_argument('--params', type=loads, default=None,
+                        help='JSON list of parameter sets, instead of the --capital/--risk/--periods product')
+    parser.add_argument('--timeframe', default='1h')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--full', action='store_true', help='print full results instead of summaries')
+    parser.add_argument('--seed', type=int, default=None, help='generate a reproducible dataset from this seed')
+    parser.add_argument('--replay-at', type=datetime.fromisoformat, default=None,
+                        help=f'moment a seeded dataset ends at (default {REPLAY_EPOCH.isoformat()})')
+    args = parser.parse_args(argv)
+    # the server stops a grid with SIGTERM; exiting normally shuts the worker
+    # processes down with it instead of leaving them orphaned
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+    param_sets = args.params or [
+        {'initial_capital': capital, 'risk_per_trade': risk, 'periods': periods}
+        for capital, risk, periods in itertools.product(
+            _split(args.capital, float), _split(args.risk, float), _split(args.periods, int))
+    ]
+
+    replay_at = args.replay_at or (REPLAY_EPOCH if args.seed is not None else None)
+    runner = BatchBacktester(max_workers=args.workers, timeframe=args.timeframe, seed=args.seed, replay_at=replay_at)
+    jobs = runner.build_grid(_split(args.symbols), _split(args.strategies), param_sets)
+    for result in runner.run(jobs):
+        print(dumps(result if args.full else summarize(result)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
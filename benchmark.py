@@ -0,0 +1,222 @@
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from market_data import MarketDataFetcher, REPLAY_EPOCH
+
+DEFAULT_SIZES = [200, 1000, 10000, 100000, 1000000]
+DEFAULT_THRESHOLD = 0.25
+SYMBOL = 'EUR/USD'
+
+
+def _analysis_cases():
+    from technical_indicators import TechnicalIndicators
+    from smc_analyzer import SMCAnalyzer
+    from pattern_detector import PatternDetector
+    from trading_engine import TradingEngine
+    from backtester import Backtester
+
+    indicators = TechnicalIndicators()
+    smc = SMCAnalyzer()
+    patterns = PatternDetector()
+    engine = TradingEngine()
+    backtester = Backtester()
+
+    return [
+        ('indicators.calculate_all', lambda candles, df: indicators.calculate_all(df)),
+        ('smc.analyze', lambda candles, df: smc.analyze(df)),
+        ('patterns.detect_all', lambda candles, df: patterns.detect_all(df)),
+        ('engine.analyze_market', lambda candles, df: engine.analyze_market(SYMBOL, candles)),
+        ('backtester.run_backtest', lambda candles, df: backtester.run_backtest(SYMBOL, 'smc_ict', data=candles)),
+    ]
+
+
+def _api_cases():
+    # the app is imported only when API cases run: it patches the standard
+    # library for eventlet and opens its database, candle archive and signal
+    # journal, which point at a scratch directory so a run never touches real data
+    scratch = tempfile.mkdtemp(prefix='benchmark-')
+    atexit.register(shutil.rmtree, scratch, True)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'trading.db')}"
+    os.environ['CANDLE_ARCHIVE_DIR'] = os.path.join(scratch, 'candle_archive')
+    os.environ['SIGNAL_JOURNAL_DIR'] = os.path.join(scratch, 'signal_journal')
+    import app as webapp
+
+    client = webapp.app.test_client()
+
+    def cold(request):
+        def run():
+            webapp.analysis_cache.invalidate()
+            webapp.market_fetcher.cache.clear()
+            if webapp.market_fetcher.resampler is not None:
+                webapp.market_fetcher.resampler.clear()
+            return request()
+        return run
+
+    def get(path):
+        def request():
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return request
+
+    def post(path, body):
+        def request():
+            response = client.post(path, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"POST {path} returned {response.status_code}")
+        return request
+
+    analysis = get('/api/analysis/EUR-USD?timeframe=1h')
+    return [
+        ('api.market_data', get('/api/market-data/EUR-USD?timeframe=1h&limit=100')),
+        ('api.analysis.cold', cold(analysis)),
+        ('api.analysis.cached', analysis),
+        ('api.patterns', get('/api/patterns/EUR-USD?timeframe=1h&limit=500')),
+        ('api.backtest', post('/api/backtest', {'symbol': SYMBOL, 'strategy': 'smc_ict', 'seed': 1})),
+    ]
+
+
+def _time(function, repeat, budget):
+    """Wall times of up to ``repeat`` calls; stops early once ``budget`` seconds are spent."""
+    times = []
+    spent = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+        if spent > budget:
+            break
+    return times
+
+
+def _summary(times, bars=None):
+    summary = {
+        'runs': len(times),
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+    }
+    if bars:
+        summary['bars'] = bars
+        summary['bars_per_second'] = bars / summary['median']
+    return summary
+
+
+def run(sizes, repeat=3, budget=30.0, seed=1, api=True, only=None, log=print):
+    """Run the benchmark cases and return the results keyed by case name.
+
+    Analysis cases run once per size on the same seeded 1m series; a case whose
+    runs at one size take longer than ``budget`` seconds is not run at larger
+    sizes. Case names contain ``only`` when it is given.
+    """
+    fetcher = MarketDataFetcher(seed=seed, replay_at=REPLAY_EPOCH)
+    results = {}
+
+    cases = [case for case in _analysis_cases() if not only or only in case[0]]
+    over_budget = set()
+    for size in sorted(sizes):
+        candles = fetcher._generate_realistic_data(SYMBOL, '1m', size)
+        df = candles.to_dataframe()
+        for name, function in cases:
+            key = f"{name}[{size}]"
+            if name in over_budget:
+                results[key] = {'skipped': 'over budget at a smaller size'}
+                continue
+            # one untimed call so imports and caches do not count
+            function(candles, df)
+            times = _time(lambda: function(candles, df), repeat, budget)
+            results[key] = _summary(times, size)
+            log(f"{key:45s} {results[key]['median'] * 1000:12.2f} ms")
+            if sum(times) > budget:
+                over_budget.add(name)
+
+    if api:
+        for name, function in _api_cases():
+            if only and only not in name:
+                continue
+            function()
+            results[name] = _summary(_time(function, repeat, budget))
+            log(f"{name:45s} {results[name]['median'] * 1000:12.2f} ms")
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Cases whose median is more than ``threshold`` slower than in ``baseline``."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if 'median' not in current or not previous or 'median' not in previous:
+            continue
+        ratio = current['median'] / previous['median']
+        if ratio > 1 + threshold:
+            regressions.append({'case': name, 'baseline': previous['median'],
+                                'current': current['median'], 'ratio': ratio})
+    return regressions
+
+
+def _environment(seed):
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpus': os.cpu_count(),
+        'seed': seed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the analysis, backtest and API hot paths')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='comma separated bar counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=30.0, help='seconds per case and size before larger sizes are skipped')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', help='run only cases whose name contains this')
+    parser.add_argument('--no-api', action='store_true', help='skip the Flask endpoint cases')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown before flagging, e.g. 0.25')
+    parser.add_argument('--save-baseline', action='store_true', help='also write the results to --baseline')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    results = run(sizes, args.repeat, args.budget, args.seed, api=not args.no_api, only=args.only)
+    report = {'environment': _environment(args.seed), 'results': results}
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        report['baseline'] = args.baseline
+        report['regressions'] = regressions
+        for r in regressions:
+            print(f"REGRESSION {r['case']}: {r['baseline'] * 1000:.2f} ms -> {r['current'] * 1000:.2f} ms ({r['ratio']:.2f}x)")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline and args.baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"Wrote {args.output}" + (f", {len(regressions)} regression(s)" if args.baseline else ''))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import argparse
+import os
+import struct
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from candles import CandleSeries, PRICE_COLUMNS, TIMEFRAME_MINUTES
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b'CNDL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHqq')
+HEADER_SIZE = 64
+COLUMN_COUNT = 1 + len(PRICE_COLUMNS)
+MIN_CAPACITY = 1024
+
+
+class CandleArchive:
+    """Append-only columnar candle files, one per symbol/timeframe, read through ``numpy.memmap``.
+
+    Each file is a 64-byte header (magic, version, column count, capacity, length)
+    followed by ``capacity`` slots per column: int64 epoch-ns timestamps, then the
+    float64 open, high, low, close and volume columns. ``read`` returns a
+    ``CandleSeries`` whose arrays are views of the mapping, so only the pages a
+    caller touches are loaded. Appends write into the spare capacity and bump the
+    length; when it runs out the file is rewritten at double the capacity.
+
+    Writers in any process take an exclusive lock on a ``.lock`` file next to the
+    archive and only then read the header, so concurrent appends and grows of one
+    file are serialised and each sees the length the previous one wrote.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.root, f"{symbol.replace('/', '')}_{timeframe}.candles")
+
+    def exists(self, symbol, timeframe):
+        return os.path.exists(self.path(symbol, timeframe))
+
+    def length(self, symbol, timeframe):
+        path = self.path(symbol, timeframe)
+        return _read_header(path)[1] if os.path.exists(path) else 0
+
+    def bounds(self, symbol, timeframe):
+        """``(first, last)`` archived timestamps (int64 epoch ns), or None if nothing is archived."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        capacity, length = _read_header(path)
+        if length == 0:
+            return None
+        stamps = _map(path, capacity, 'r')[0, :length].view(np.int64)
+        return int(stamps[0]), int(stamps[-1])
+
+    def read(self, symbol, timeframe, start=None, end=None, limit=None):
+        """Candles with ``start <= timestamp <= end`` (datetimes), oldest first; with
+        ``limit``, the most recent ``limit`` of them. The arrays are read-only views
+        of the file."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return _empty()
+
+        capacity, length = _read_header(path)
+        if length == 0:
+            return _empty()
+        columns = _map(path, capacity, 'r')
+        timestamps = columns[0, :length].view(np.int64)
+
+        lo = 0 if start is None else int(np.searchsorted(timestamps, _ns(start), side='left'))
+        hi = length if end is None else int(np.searchsorted(timestamps, _ns(end), side='right'))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return CandleSeries(timestamps[lo:hi], columns[1:, lo:hi])
+
+    def append(self, symbol, timeframe, candles):
+        """Archive the candles not yet in the file; returns how many were written.
+
+        Candles newer than the last archived one are appended in place. Older
+        ones (a longer history than archived) are merged in front by rewriting
+        the file. Candles that would leave a gap before or after the archived
+        ones are not written at all, so a read never spans missing bars and
+        archived history is never dropped; the caller fills the gap first.
+        """
+        candles = CandleSeries.coerce(candles)
+        if not len(candles):
+            return 0
+        path = self.path(symbol, timeframe)
+        with _locked(path):
+            return self._append(path, symbol, timeframe, candles)
+
+    def _append(self, path, symbol, timeframe, candles):
+        # the header is read under the lock: another process may have just written it
+        if os.path.exists(path):
+            capacity, length = _read_header(path)
+        else:
+            capacity, length = 0, 0
+        if not length:
+            return self._rewrite(path, candles)
+
+        stamps = _map(path, capacity, 'r')[0, :length].view(np.int64)
+        first, last = int(stamps[0]), int(stamps[-1])
+        del stamps
+        step = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 10**9
+        older = candles[:int(np.searchsorted(candles.timestamp, first, side='left'))]
+        newer = candles[int(np.searchsorted(candles.timestamp, last, side='right')):]
+
+        if (len(older) and older.timestamp[-1] < first - step) or (len(newer) and newer.timestamp[0] > last + step):
+            return 0
+        if len(older):
+            current = self.read(symbol, timeframe)
+            return self._rewrite(path, CandleSeries.concat([older, current, newer])) - len(current)
+
+        count = len(newer)
+        if count == 0:
+            return 0
+        if length + count > capacity:
+            capacity = self._grow(path, capacity, length, length + count)
+
+        columns = _map(path, capacity, 'r+')
+        columns[0, length:length + count].view(np.int64)[:] = newer.timestamp
+        columns[1:, length:length + count] = newer.values
+        columns.flush()
+        del columns
+        _write_header(path, capacity, length + count)
+        return count
+
+    def _rewrite(self, path, candles):
+        capacity = max(MIN_CAPACITY, len(candles))
+        tmp_path = path + '.tmp'
+        _create(tmp_path, capacity)
+        columns = _map(tmp_path, capacity, 'r+')
+        columns[0, :len(candles)].view(np.int64)[:] = candles.timestamp
+        columns[1:, :len(candles)] = candles.values
+        columns.flush()
+        del columns
+        _write_header(tmp_path, capacity, len(candles))
+        os.replace(tmp_path, path)
+        return len(candles)
+
+    def _grow(self, path, capacity, length, needed):
+        new_capacity = max(MIN_CAPACITY, capacity * 2, needed)
+        tmp_path = path + '.tmp'
+        _create(tmp_path, new_capacity)
+        if length:
+            old = _map(path, capacity, 'r')
+            new = _map(tmp_path, new_capacity, 'r+')
+            new[:, :length] = old[:, :length]
+            new.flush()
+            del old, new
+        _write_header(tmp_path, new_capacity, length)
+        # readers holding the old mapping keep reading the replaced file
+        os.replace(tmp_path, path)
+        return new_capacity
+
+    def info(self, symbol, timeframe):
+        series = self.read(symbol, timeframe)
+        path = self.path(symbol, timeframe)
+        info = {'symbol': symbol, 'timeframe': timeframe, 'path': path, 'length': len(series)}
+        if len(series):
+            info['capacity'] = _read_header(path)[0]
+            info['first'] = str(series.timestamp[:1].view('datetime64[ns]')[0])
+            info['last'] = str(series.timestamp[-1:].view('datetime64[ns]')[0])
+        return info
+
+
+@contextmanager
+def _locked(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _ns(moment):
+    return np.datetime64(moment, 'ns').astype(np.int64)
+
+
+def _empty():
+    return CandleSeries(np.empty(0, dtype=np.int64), np.empty((len(PRICE_COLUMNS), 0)))
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        magic, version, column_count, capacity, length = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or column_count != COLUMN_COUNT:
+        raise ValueError(f"{path} is not a version {VERSION} candle archive")
+    return capacity, length
+
+
+def _write_header(path, capacity, length):
+    with open(path, 'r+b') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, COLUMN_COUNT, capacity, length))
+
+
+def _create(path, capacity):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, COLUMN_COUNT, capacity, 0).ljust(HEADER_SIZE, b'\0'))
+        f.truncate(HEADER_SIZE + COLUMN_COUNT * capacity * 8)
+
+
+def _map(path, capacity, mode):
+    return np.memmap(path, dtype=np.float64, mode=mode, offset=HEADER_SIZE, shape=(COLUMN_COUNT, capacity))
+
+
+def main(argv=None):
+    from market_data import MarketDataFetcher, TIMEFRAME_MINUTES, candle_open_time
+
+    parser = argparse.ArgumentParser(description='Inspect or fill memory-mapped candle archives')
+    parser.add_argument('command', choices=['info', 'fill'])
+    parser.add_argument('symbol')
+    parser.add_argument('timeframe')
+    parser.add_argument('--bars', type=int, default=0, help='bars of history to generate for fill')
+    parser.add_argument('--chunk', type=int, default=100000)
+    parser.add_argument('--root', default=os.environ.get('CANDLE_ARCHIVE_DIR', 'candle_archive'))
+    args = parser.parse_args(argv)
+
+    archive = CandleArchive(args.root)
+    if args.command == 'fill':
+        fetcher = MarketDataFetcher()
+        step = timedelta(minutes=TIMEFRAME_MINUTES.get(args.timeframe, 60))
+        last = candle_open_time(datetime.utcnow(), args.timeframe) - step
+        remaining = args.bars
+        while remaining > 0:
+            count = min(args.chunk, remaining)
+            remaining -= count
+            chunk = fetcher._generate_realistic_data(args.symbol, args.timeframe, count, end=last - step * remaining)
+            archive.append(args.symbol, args.timeframe, chunk)
+    print(archive.info(args.symbol, args.timeframe))
+
+
+if __name__ == '__main__':
+    main()
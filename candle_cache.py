@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CandleCache:
+    """Bounded LRU store holding one ``CandleSeries`` per (symbol, timeframe).
+
+    Requests are answered with a tail view of the cached series, so any number of
+    distinct ``limit`` values share one entry. A request for more bars than are
+    cached, or for an expired entry, refetches ``limit`` bars, so one large request
+    does not make every later refetch of the pair as large. Total array memory is
+    kept under ``max_bytes`` by evicting the least recently used series; a series
+    larger than ``max_bytes`` on its own is returned but not cached.
+    """
+
+    def __init__(self, ttl=60, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+
+    def get(self, symbol, timeframe, limit, fetch):
+        key = (symbol, timeframe)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                series, fetched_at = entry
+                if time.monotonic() - fetched_at < self.ttl and len(series) >= limit:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return series.tail(limit)
+            self.misses += 1
+
+        series = fetch(symbol, timeframe, limit)
+        self._store(key, series)
+        return series.tail(limit)
+
+    def _store(self, key, series):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= _nbytes(old[0])
+            if _nbytes(series) > self.max_bytes:
+                self.oversized += 1
+                return
+            self._entries[key] = (series, time.monotonic())
+            self.bytes += _nbytes(series)
+
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= _nbytes(evicted)
+                self.evictions += 1
+
+    def invalidate(self, symbol, timeframe):
+        with self._lock:
+            entry = self._entries.pop((symbol, timeframe), None)
+            if entry is not None:
+                self.bytes -= _nbytes(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'series': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'oversized': self.oversized,
+            }
+
+
+def _nbytes(series):
+    return series.values.nbytes + series.timestamp.nbytes
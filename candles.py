@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+TIMEFRAME_MINUTES = {
+    '1m': 1,
+    '5m': 5,
+    '15m': 15,
+    '30m': 30,
+    '1h': 60,
+    '4h': 240,
+    '1d': 1440,
+    '1w': 10080
+}
+
+
+def candle_open_time(moment, timeframe):
+    """Start of the candle containing ``moment``, aligned to the timeframe since the epoch."""
+    step = TIMEFRAME_MINUTES.get(timeframe, 60) * 60
+    seconds = int((moment - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds - seconds % step)
+
+
+def missing_ranges(timestamps, start, end, step):
+    """Runs of the candle grid ``start, start + step, ... end`` (datetimes) absent
+    from ``timestamps`` (int64 epoch ns), as ``(first, last)`` datetime pairs."""
+    step_ns = int(step.total_seconds()) * 10**9
+    first_ns = np.datetime64(start, 'ns').astype(np.int64)
+    last_ns = np.datetime64(end, 'ns').astype(np.int64)
+    # counted in integers: arange sizes the grid in floating point and can drop the last candle
+    expected = first_ns + np.arange((last_ns - first_ns) // step_ns + 1, dtype=np.int64) * step_ns
+    missing = ~np.isin(expected, timestamps)
+    if not missing.any():
+        return []
+
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], missing.astype(np.int8), [0]])))
+    to_datetime = lambda ns: ns.astype('datetime64[ns]').astype('datetime64[us]').item()
+    return [(to_datetime(expected[a]), to_datetime(expected[b - 1])) for a, b in zip(edges[::2], edges[1::2])]
+
+
+class CandleSeries:
+    """Columnar OHLCV candles in ascending time order.
+
+    Prices and volume live in one contiguous ``(5, n)`` float64 block and the
+    timestamps are int64 epoch nanoseconds, so slicing and ``to_dataframe`` are
+    views rather than copies. ``to_records`` produces the list-of-dicts shape the
+    API has always returned and is meant to be called only when responding.
+    """
+
+    __slots__ = ('timestamp', 'values')
+
+    def __init__(self, timestamp, values):
+        self.timestamp = timestamp
+        self.values = values
+
+    @classmethod
+    def from_arrays(cls, timestamp, open, high, low, close, volume):
+        values = np.empty((len(PRICE_COLUMNS), len(timestamp)), dtype=np.float64)
+        for row, column in enumerate((open, high, low, close, volume)):
+            values[row] = column
+        return cls(np.asarray(timestamp, dtype='datetime64[ns]').view(np.int64), values)
+
+    @classmethod
+    def from_records(cls, records):
+        df = pd.DataFrame(list(records), columns=['timestamp'] + list(PRICE_COLUMNS))
+        return cls.from_dataframe(df)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        timestamp = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(timestamp, kind='stable')
+        if np.all(order[1:] > order[:-1]):
+            order = slice(None)
+        return cls.from_arrays(timestamp[order], *(df[c].to_numpy(dtype=float)[order] for c in PRICE_COLUMNS))
+
+    @classmethod
+    def concat(cls, parts):
+        return cls(np.concatenate([p.timestamp for p in parts]), np.concatenate([p.values for p in parts], axis=1))
+
+    @classmethod
+    def coerce(cls, data):
+        if data is None or isinstance(data, cls):
+            return data
+        if isinstance(data, pd.DataFrame):
+            return cls.from_dataframe(data)
+        return cls.from_records(data)
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return CandleSeries(self.timestamp[key], self.values[:, key])
+        return self.record(key)
+
+    def column(self, name):
+        return self.values[PRICE_COLUMNS.index(name)]
+
+    @property
+    def open(self):
+        return self.values[0]
+
+    @property
+    def high(self):
+        return self.values[1]
+
+    @property
+    def low(self):
+        return self.values[2]
+
+    @property
+    def close(self):
+        return self.values[3]
+
+    @property
+    def volume(self):
+        return self.values[4]
+
+    def tail(self, count):
+        return self[max(0, len(self) - count):]
+
+    def copy(self):
+        return CandleSeries(self.timestamp.copy(), self.values.copy())
+
+    def record(self, index):
+        record = {'timestamp': self._isoformat(self.timestamp[[index]])[0]}
+        for row, column in enumerate(PRICE_COLUMNS):
+            record[column] = float(self.values[row, index])
+        return record
+
+    def to_dataframe(self):
+        # copy=False keeps every column a view of the series' own buffers
+        columns = {'timestamp': self.timestamp.view('datetime64[ns]')}
+        for row, column in enumerate(PRICE_COLUMNS):
+            columns[column] = self.values[row]
+        return pd.DataFrame(columns, copy=False)
+
+    def to_records(self):
+        stamps = self._isoformat(self.timestamp)
+        columns = [self.values[row].tolist() for row in range(len(PRICE_COLUMNS))]
+        return [
+            {'timestamp': ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for ts, o, h, l, c, v in zip(stamps, *columns)
+        ]
+
+    @staticmethod
+    def _isoformat(stamps):
+        return np.datetime_as_string(stamps.view('datetime64[ns]'), unit='us').tolist()
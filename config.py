@@ -28,8 +28,79 @@ class Config:
     else:
         SQLALCHEMY_DATABASE_URI = 'sqlite:///trading.db'
     
+    # A full database URL (e.g. PostgreSQL) overrides DB_TYPE
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or SQLALCHEMY_DATABASE_URI
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    
+    # Analysis result cache (entries are keyed by symbol, timeframe and last candle)
+    ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', 256))
+    ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', 300))
+    
+    # Candle cache: one series per symbol/timeframe, bounded by memory
+    CANDLE_CACHE_TTL = int(os.environ.get('CANDLE_CACHE_TTL', 60))
+    CANDLE_CACHE_MAX_BYTES = int(os.environ.get('CANDLE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # Upper bound for ?limit= on the market data and pattern history endpoints
+    MAX_CANDLE_LIMIT = int(os.environ.get('MAX_CANDLE_LIMIT', 5000))
+    
+    # Memory-mapped candle archive used for long-horizon backtests
+    CANDLE_ARCHIVE_DIR = os.environ.get('CANDLE_ARCHIVE_DIR', 'candle_archive')
+    
+    # Timeframes coarser than this are aggregated from it, so every timeframe shows the same
+    # prices; empty loads each one separately
+    BASE_TIMEFRAME = os.environ.get('BASE_TIMEFRAME', '1m')
+    RESAMPLE_MAX_BASE_BARS = int(os.environ.get('RESAMPLE_MAX_BASE_BARS', 100000))
+    
+    # Per-stage analysis timing exposed at /api/metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Allocated-block counts are process-wide, so a stage's count is only kept
+    # when no other analysis ran alongside it
+    METRICS_TRACK_ALLOCATIONS = os.environ.get('METRICS_TRACK_ALLOCATIONS', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Seconds between checks for closed candles on subscribed symbol/timeframe pairs
+    ANALYSIS_PUSH_INTERVAL = float(os.environ.get('ANALYSIS_PUSH_INTERVAL', 1.0))
+    # Shared Socket.IO message queue for running several server processes:
+    # redis://host:6379/0, any kombu URL, or sqlite:///path/to/queue.db on one machine
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    # Split analysis scheduling across processes with database leases (default: on with a message queue)
+    ANALYSIS_PARTITIONED = (os.environ['ANALYSIS_PARTITIONED'].lower() in ('1', 'true', 'yes')
+                            if os.environ.get('ANALYSIS_PARTITIONED') else None)
+    ANALYSIS_LEASE_SECONDS = float(os.environ.get('ANALYSIS_LEASE_SECONDS', 60.0))
+    # Pushed analysis is sent as deltas between full snapshots every this many versions
+    ANALYSIS_SNAPSHOT_EVERY = int(os.environ.get('ANALYSIS_SNAPSHOT_EVERY', 10))
+    
+    # Native worker threads for analysis and backtests (eventlet tpool)
+    WORKER_POOL_SIZE = int(os.environ.get('WORKER_POOL_SIZE', 4))
+    WORKER_QUEUE_SIZE = int(os.environ.get('WORKER_QUEUE_SIZE', 16))
+    WORKER_WAIT_TIMEOUT = float(os.environ.get('WORKER_WAIT_TIMEOUT', 5.0))
+    ANALYSIS_TIMEOUT = float(os.environ.get('ANALYSIS_TIMEOUT', 30.0))
+    BACKTEST_TIMEOUT = float(os.environ.get('BACKTEST_TIMEOUT', 120.0))
+    # Upper bound for the bars a single backtest request may ask for
+    BACKTEST_MAX_PERIODS = int(os.environ.get('BACKTEST_MAX_PERIODS', 100000))
+    
+    # Generated signals are buffered, journaled locally and bulk-inserted in batches
+    SIGNAL_PERSISTENCE = os.environ.get('SIGNAL_PERSISTENCE', 'true').lower() in ('1', 'true', 'yes')
+    SIGNAL_JOURNAL_DIR = os.environ.get('SIGNAL_JOURNAL_DIR', 'signal_journal')
+    SIGNAL_FLUSH_SIZE = int(os.environ.get('SIGNAL_FLUSH_SIZE', 500))
+    SIGNAL_FLUSH_INTERVAL = float(os.environ.get('SIGNAL_FLUSH_INTERVAL', 2.0))
+    SIGNAL_JOURNAL_FSYNC = os.environ.get('SIGNAL_JOURNAL_FSYNC', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Upper bound for ?limit= on the paginated signal, trade and backtest result lists
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+    
+    # Background backtest jobs (/api/backtest/jobs) run on their own worker threads
+    BACKTEST_JOB_WORKERS = int(os.environ.get('BACKTEST_JOB_WORKERS', 2))
+    BACKTEST_JOB_QUEUE_SIZE = int(os.environ.get('BACKTEST_JOB_QUEUE_SIZE', 32))
+    BACKTEST_JOB_TIMEOUT = float(os.environ.get('BACKTEST_JOB_TIMEOUT', 3600.0))
+    # Seconds between backtest_progress events for a running job
+    BACKTEST_PROGRESS_INTERVAL = float(os.environ.get('BACKTEST_PROGRESS_INTERVAL', 0.5))
+    
+    # Batch grids (/api/backtest/batch): concurrent runs, worker processes per run
+    # (0 means one per CPU) and backtests per grid
+    BACKTEST_BATCH_MAX_RUNNING = int(os.environ.get('BACKTEST_BATCH_MAX_RUNNING', 1))
+    BACKTEST_BATCH_MAX_WORKERS = int(os.environ.get('BACKTEST_BATCH_MAX_WORKERS', 0))
+    BACKTEST_BATCH_MAX_GRID = int(os.environ.get('BACKTEST_BATCH_MAX_GRID', 500))
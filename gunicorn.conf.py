@@ -0,0 +1,21 @@
+import os
+
+# gunicorn -c gunicorn.conf.py app:app
+#
+# Flask-SocketIO needs the eventlet worker. Each worker process keeps its own
+# caches and Socket.IO sessions, so running more than one needs
+# SOCKETIO_MESSAGE_QUEUE (emits then reach clients on every process, and
+# analysis scheduling is split between processes) and clients that either use
+# the websocket transport only or are pinned to one process by a load balancer
+# with sticky sessions, since gunicorn itself spreads polling requests at random.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = 'eventlet'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+
+# each worker imports the app itself, so leases and queue listeners are per process
+preload_app = False
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+accesslog = '-'
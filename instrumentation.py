@@ -0,0 +1,207 @@
+import bisect
+import sys
+import threading
+import time
+
+# upper bounds in seconds; analysis stages run from well under a millisecond to seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Series:
+    __slots__ = ('buckets', 'seconds', 'count', 'blocks', 'block_samples')
+
+    def __init__(self, size):
+        self.buckets = [0] * size
+        self.seconds = 0.0
+        self.count = 0
+        self.blocks = 0
+        self.block_samples = 0
+
+
+class Span:
+    """Times consecutive stages of one operation.
+
+    Each ``mark`` records the wall time since the previous mark, so a call site
+    marks after each stage instead of wrapping it. ``finish`` records the whole
+    operation as the ``total`` stage; used as a context manager, the span
+    finishes however the block exits.
+
+    With ``track_allocations`` a mark also records the net change in allocated
+    memory blocks (``sys.getallocatedblocks``). That count is process-wide, and
+    spans run concurrently on worker threads, so the change is only recorded
+    when no other span ran since the previous mark; otherwise it would include
+    their allocations too. Allocations by the rest of the process (request
+    handlers on the hub) are still counted.
+    """
+
+    __slots__ = ('metrics', 'operation', 'blocks', 'started', 'last',
+                 'started_blocks', 'last_blocks', 'started_spans', 'last_spans')
+
+    def __init__(self, metrics, operation):
+        self.metrics = metrics
+        self.operation = operation
+        # getallocatedblocks walks the allocator's arenas, tens of microseconds on a large heap
+        self.blocks = sys.getallocatedblocks if metrics.track_allocations else None
+        self.started_spans = self.last_spans = metrics._enter() if self.blocks else None
+        self.started = self.last = time.perf_counter()
+        self.started_blocks = self.last_blocks = self.blocks() if self.blocks else 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.finish()
+
+    def _blocks_since(self, spans, blocks, since_spans, since_blocks):
+        # (running, started) span counts: unchanged at one means this span ran alone
+        if since_spans is None or since_spans != spans or spans[0] != 1:
+            return None
+        return blocks - since_blocks
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        blocks, spans = (self.blocks(), self.metrics._spans()) if self.blocks else (0, None)
+        self.metrics.observe(self.operation, stage, now - self.last,
+                             self._blocks_since(spans, blocks, self.last_spans, self.last_blocks))
+        self.last = now
+        self.last_blocks = blocks
+        self.last_spans = spans
+
+    def finish(self):
+        now = time.perf_counter()
+        blocks, spans = (self.blocks(), self.metrics._spans()) if self.blocks else (0, None)
+        started_spans, self.started_spans = self.started_spans, None
+        if started_spans is not None:
+            self.metrics._exit()
+        self.metrics.observe(self.operation, 'total', now - self.started,
+                             self._blocks_since(spans, blocks, started_spans, self.started_blocks))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _native_lock():
+    # stages also run in native worker threads (see worker_pool), where a lock
+    # green-patched by eventlet is not safe; the critical sections never block
+    try:
+        from eventlet.patcher import original
+    except ImportError:
+        return threading.Lock()
+    return original('threading').Lock()
+
+
+class Metrics:
+    """Per-stage timing histograms for the analysis hot path.
+
+    Observations are aggregated in place (bucket counts, sums and counts per
+    operation and stage), so memory stays constant however many calls are
+    recorded. ``render`` produces the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled=True, track_allocations=True, prefix='trading_engine'):
+        self.bounds = tuple(buckets)
+        self.enabled = enabled
+        self.track_allocations = track_allocations
+        self.prefix = prefix
+        self._series = {}
+        self._lock = _native_lock()
+        # spans tracking allocations: how many are running, and how many have started
+        self._active = 0
+        self._started = 0
+
+    def span(self, operation):
+        return Span(self, operation) if self.enabled else NULL_SPAN
+
+    def _enter(self):
+        with self._lock:
+            self._active += 1
+            self._started += 1
+            return self._active, self._started
+
+    def _exit(self):
+        with self._lock:
+            self._active -= 1
+
+    def _spans(self):
+        with self._lock:
+            return self._active, self._started
+
+    def observe(self, operation, stage, seconds, blocks=None):
+        key = (operation, stage)
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bounds) + 1)
+            series.buckets[index] += 1
+            series.seconds += seconds
+            series.count += 1
+            if blocks is not None:
+                series.blocks += blocks
+                series.block_samples += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f"{operation}.{stage}": {
+                    'count': s.count,
+                    'seconds': s.seconds,
+                    'mean_seconds': s.seconds / s.count,
+                    'allocated_blocks': s.blocks,
+                    'allocation_samples': s.block_samples,
+                }
+                for (operation, stage), s in self._series.items()
+            }
+
+    def render(self):
+        name = f"{self.prefix}_stage_seconds"
+        blocks_name = f"{self.prefix}_stage_allocated_blocks"
+        with self._lock:
+            items = sorted((key, list(s.buckets), s.seconds, s.count, s.blocks, s.block_samples)
+                           for key, s in self._series.items())
+
+        lines = [
+            f"# HELP {name} Wall time of each analysis stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for (operation, stage), buckets, seconds, count, _, _ in items:
+            labels = f'operation="{operation}",stage="{stage}"'
+            cumulative = 0
+            for bound, hits in zip(self.bounds, buckets):
+                cumulative += hits
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {seconds}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+
+        lines.append(f"# HELP {blocks_name} Net memory blocks allocated process-wide during each analysis stage, "
+                     f"sampled only while no other stage was running.")
+        lines.append(f"# TYPE {blocks_name} summary")
+        for (operation, stage), _, _, _, blocks, samples in items:
+            labels = f'operation="{operation}",stage="{stage}"'
+            lines.append(f'{blocks_name}_sum{{{labels}}} {blocks}')
+            lines.append(f'{blocks_name}_count{{{labels}}} {samples}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -2,13 +2,68 @@ import requests
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import random
-import math
+import zlib
+from scipy.signal import lfilter
+from candles import CandleSeries, TIMEFRAME_MINUTES, candle_open_time, missing_ranges
+from candle_cache import CandleCache
+from resampler import Resampler
+
+SUPPORTED_PAIRS = [
+    {'symbol': 'EUR/USD', 'name': 'Euro/US Dollar', 'category': 'forex'},
+    {'symbol': 'GBP/USD', 'name': 'British Pound/US Dollar', 'category': 'forex'},
+    {'symbol': 'USD/JPY', 'name': 'US Dollar/Japanese Yen', 'category': 'forex'},
+    {'symbol': 'AUD/USD', 'name': 'Australian Dollar/US Dollar', 'category': 'forex'},
+    {'symbol': 'USD/CHF', 'name': 'US Dollar/Swiss Franc', 'category': 'forex'},
+    {'symbol': 'USD/CAD', 'name': 'US Dollar/Canadian Dollar', 'category': 'forex'},
+    {'symbol': 'NZD/USD', 'name': 'New Zealand Dollar/US Dollar', 'category': 'forex'},
+    {'symbol': 'EUR/GBP', 'name': 'Euro/British Pound', 'category': 'forex'},
+    {'symbol': 'EUR/JPY', 'name': 'Euro/Japanese Yen', 'category': 'forex'},
+    {'symbol': 'GBP/JPY', 'name': 'British Pound/Japanese Yen', 'category': 'forex'},
+    {'symbol': 'XAU/USD', 'name': 'Gold/US Dollar', 'category': 'commodity'},
+    {'symbol': 'XAG/USD', 'name': 'Silver/US Dollar', 'category': 'commodity'},
+    {'symbol': 'BTC/USD', 'name': 'Bitcoin/US Dollar', 'category': 'crypto'},
+    {'symbol': 'ETH/USD', 'name': 'Ethereum/US Dollar', 'category': 'crypto'},
+]
+
+# default moment a seeded replay is pinned to when none is given
+REPLAY_EPOCH = datetime(2024, 1, 1)
+
+# generated prices: the trend levels off at this fraction of the base price, and
+# the random walk around it reverts with this time constant
+MAX_TREND = 0.05
+REVERSION_HOURS = 30 * 24
+
+# most candles loaded at once when catching the archive up with the clock
+ARCHIVE_CHUNK = 100000
+
+
+def _ns(moment):
+    return int(np.datetime64(moment, 'ns').astype(np.int64))
+
+
+def _datetime(ns):
+    return np.int64(ns).astype('datetime64[ns]').astype('datetime64[us]').item()
+
 
 class MarketDataFetcher:
-    def __init__(self):
-        self.cache = {}
-        self.cache_duration = 60
+    def __init__(self, cache_duration=60, cache_max_bytes=64 * 1024 * 1024, store=None, archive=None,
+                 base_timeframe=None, max_base_bars=100000, seed=None, replay_at=None, pause=None):
+        self.cache_duration = cache_duration
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        # replay mode: the clock stands still at replay_at, so with a seed every
+        # request generates the same candles on every run
+        self.replay_at = replay_at
+        self.cache = CandleCache(ttl=cache_duration, max_bytes=cache_max_bytes)
+        self.store = store
+        self.archive = archive
+        # called between chunks of a long load (e.g. socketio.sleep) to let other green threads run
+        self.pause = pause
+        
+        # with a base timeframe, coarser timeframes are aggregated from it rather
+        # than loaded on their own, as long as that needs at most max_base_bars
+        self.resampler = Resampler(base_timeframe) if base_timeframe else None
+        self.max_base_bars = max_base_bars
         
         self.base_prices = {
             'EUR/USD': 1.0850,
@@ -44,109 +99,190 @@ class MarketDataFetcher:
             'ETH/USD': 30.0,
         }
     
+    def now(self):
+        return self.replay_at or datetime.utcnow()
+    
+    def stream(self, *key):
+        """Generator for one generation request. Seeded fetchers derive an
+        independent stream from the seed and ``key``, so a series depends only on
+        what was asked for and not on which requests came before it."""
+        if self.seed is None:
+            return self.rng
+        words = [zlib.crc32(str(part).encode()) for part in key]
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=words))
+    
     def get_historical_data(self, symbol, timeframe='1h', limit=100):
-        cache_key = f"{symbol}_{timeframe}_{limit}"
+        resampler = self.resampler
+        if resampler is not None and resampler.supports(timeframe):
+            # one extra bucket of base candles covers the one still forming
+            base_limit = (limit + 1) * resampler.ratio(timeframe)
+            if base_limit <= self.max_base_bars:
+                base = self.cache.get(symbol, resampler.base_timeframe, base_limit, self._load)
+                return resampler.get(symbol, timeframe, base, limit)
+        return self.cache.get(symbol, timeframe, limit, self._load)
+    
+    def invalidate(self, symbol, timeframe):
+        """Drop the cached candles a ``timeframe`` request is served from, so the
+        next request sees candles that closed since they were loaded."""
+        self.cache.invalidate(symbol, timeframe)
+        if self.resampler is not None and self.resampler.supports(timeframe):
+            self.cache.invalidate(symbol, self.resampler.base_timeframe)
+    
+    def _load(self, symbol, timeframe, limit):
+        # the last closed candle and the limit-1 before it
+        step = timedelta(minutes=TIMEFRAME_MINUTES.get(timeframe, 60))
+        end = candle_open_time(self.now(), timeframe) - step
+        start = end - step * (limit - 1)
+        if self.archive is None:
+            return self._load_closed(symbol, timeframe, limit, start, end, step)
         
-        if cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if (datetime.utcnow() - timestamp).seconds < self.cache_duration:
-                return cached_data
+        archived = self.archive.read(symbol, timeframe, start, end)
+        if len(archived) == limit:
+            return archived
         
-        data = self._generate_realistic_data(symbol, timeframe, limit)
-        self.cache[cache_key] = (data, datetime.utcnow())
+        # serve from the archive once it covers the window, so repeated loads
+        # are zero-copy views of the same file. An archive that reaches back to
+        # the window is only extended past its last candle, which also fills a
+        # gap left while the server was down; otherwise the window is loaded
+        # and merged in front of it
+        bounds = self.archive.bounds(symbol, timeframe)
+        if bounds is not None and bounds[0] <= _ns(start):
+            self._extend_archive(symbol, timeframe, _datetime(bounds[1]) + step, end, step)
+        else:
+            self.archive.append(symbol, timeframe, self._load_closed(symbol, timeframe, limit, start, end, step))
         
-        return data
+        archived = self.archive.read(symbol, timeframe, start, end)
+        if len(archived) == limit:
+            return archived
+        return self._load_closed(symbol, timeframe, limit, start, end, step)
+    
+    def _extend_archive(self, symbol, timeframe, first, end, step):
+        """Archive the candles from ``first`` to ``end``, ``ARCHIVE_CHUNK`` at a time."""
+        while first <= end:
+            last = min(end, first + step * (ARCHIVE_CHUNK - 1))
+            count = (last - first) // step + 1
+            self.archive.append(symbol, timeframe, self._load_closed(symbol, timeframe, count, first, last, step))
+            first = last + step
+            self._pause()
     
-    def _generate_realistic_data(self, symbol, timeframe, limit):
+    def _pause(self):
+        if self.pause is not None:
+            self.pause()
+    
+    def _load_closed(self, symbol, timeframe, limit, start, end, step):
+        if self.store is None:
+            return self._generate_realistic_data(symbol, timeframe, limit, end=end)
+        
+        # only gaps in what the store already holds are generated and written back
+        stored = self.store.load(symbol, timeframe, start, end)
+        gaps = missing_ranges(stored.timestamp, start, end, step)
+        if not gaps:
+            return stored
+        
+        # merged with what was stored rather than read back
+        parts = [stored]
+        for first, last in gaps:
+            count = (last - first) // step + 1
+            generated = self._generate_realistic_data(symbol, timeframe, count, end=last)
+            self.store.upsert(symbol, timeframe, generated)
+            parts.append(generated)
+            self._pause()
+        candles = CandleSeries.concat(parts)
+        order = np.argsort(candles.timestamp, kind='stable')
+        return CandleSeries(candles.timestamp[order], candles.values[:, order])
+    
+    def _generate_realistic_data(self, symbol, timeframe, limit, end=None):
         base_price = self.base_prices.get(symbol, 1.0)
-        vol = self.volatility.get(symbol, 0.001)
-        
-        timeframe_minutes = {
-            '1m': 1,
-            '5m': 5,
-            '15m': 15,
-            '30m': 30,
-            '1h': 60,
-            '4h': 240,
-            '1d': 1440,
-            '1w': 10080
-        }
+        # the volatility table is in price units per hour; the walk runs on log prices
+        vol = self.volatility.get(symbol, 0.001) / base_price
         
-        minutes = timeframe_minutes.get(timeframe, 60)
+        minutes = TIMEFRAME_MINUTES.get(timeframe, 60)
+        bar_hours = minutes / 60
+        bar_vol = vol * np.sqrt(bar_hours)
+        step = minutes * 60 * 10**9
+        if end is None:
+            end = candle_open_time(self.now(), timeframe) - timedelta(minutes=minutes)
+        rng = self.stream(symbol, timeframe, limit, end.isoformat())
         
-        data = []
-        current_time = datetime.utcnow()
-        price = base_price
+        # bars_back runs limit..1, oldest first, as the per-bar loop used to
+        bars_back = np.arange(limit, 0, -1)
+        timestamps = np.datetime64(end, 'ns').astype(np.int64) - (bars_back - 1) * step
+        elapsed = (limit - bars_back) * bar_hours
         
-        trend = random.choice([-1, 0, 1])
-        trend_strength = random.uniform(0.0001, 0.0003)
+        trend = rng.choice([-1, 0, 1])
+        trend_strength = rng.uniform(0.0001, 0.0003)
         
-        for i in range(limit, 0, -1):
-            timestamp = current_time - timedelta(minutes=i * minutes)
-            
-            trend_component = trend * trend_strength * (limit - i)
-            
-            cycle_component = 0.002 * base_price * math.sin(2 * math.pi * i / 24)
-            
-            noise = random.gauss(0, vol)
-            
-            price = base_price + trend_component + cycle_component + noise
-            
-            high_factor = abs(random.gauss(0, vol * 0.5))
-            low_factor = abs(random.gauss(0, vol * 0.5))
-            
-            open_price = price + random.gauss(0, vol * 0.2)
-            close_price = price + random.gauss(0, vol * 0.2)
-            high_price = max(open_price, close_price) + high_factor
-            low_price = min(open_price, close_price) - low_factor
-            
-            volume = random.uniform(1000, 10000) * (1 + 0.5 * math.sin(2 * math.pi * timestamp.hour / 24))
-            
-            data.append({
-                'timestamp': timestamp.isoformat(),
-                'open': round(open_price, 5),
-                'high': round(high_price, 5),
-                'low': round(low_price, 5),
-                'close': round(close_price, 5),
-                'volume': round(volume, 2)
-            })
+        # log-price offset from the base price, in hours rather than bars so every
+        # timeframe follows the same process. The trend starts at trend_strength per
+        # hour and levels off at MAX_TREND, and the walk is mean-reverting (AR(1)),
+        # so series of any length stay positive and near the symbol's price
+        reversion = np.exp(-bar_hours / REVERSION_HOURS)
+        log_price = trend * MAX_TREND * np.tanh(trend_strength * elapsed / MAX_TREND)
+        log_price += lfilter([1.0], [1.0, -reversion], rng.normal(0, bar_vol, limit))
+        log_price += 0.002 * np.sin(2 * np.pi * elapsed / 24)
+        price = base_price * np.exp(log_price)
+        
+        opens = price * np.exp(rng.normal(0, bar_vol * 0.2, limit))
+        closes = price * np.exp(rng.normal(0, bar_vol * 0.2, limit))
+        highs = np.maximum(opens, closes) * np.exp(np.abs(rng.normal(0, bar_vol * 0.5, limit)))
+        lows = np.minimum(opens, closes) * np.exp(-np.abs(rng.normal(0, bar_vol * 0.5, limit)))
+        
+        hours = timestamps // (3600 * 10**9) % 24
+        volumes = rng.uniform(1000, 10000, limit) * (1 + 0.5 * np.sin(2 * np.pi * hours / 24))
         
-        self._add_market_patterns(data, symbol)
+        values = np.empty((5, limit), dtype=np.float64)
+        for row, column in enumerate((opens, highs, lows, closes)):
+            np.round(column, 5, out=values[row])
+        np.round(volumes, 2, out=values[4])
+        
+        data = CandleSeries(timestamps, values)
+        self._add_market_patterns(data, symbol, rng)
         
         return data
     
-    def _add_market_patterns(self, data, symbol):
+    def _add_market_patterns(self, data, symbol, rng):
         if len(data) < 20:
             return
         
-        if random.random() > 0.7:
-            idx = random.randint(10, len(data) - 5)
+        opens, highs, lows, closes = data.open, data.high, data.low, data.close
+        
+        if rng.random() > 0.7:
+            idx = rng.integers(10, len(data) - 4)
             for i in range(3):
                 if idx + i < len(data):
-                    data[idx + i]['close'] = data[idx + i]['open'] * (1 + random.uniform(0.001, 0.003))
-                    data[idx + i]['high'] = max(data[idx + i]['high'], data[idx + i]['close'] * 1.001)
+                    closes[idx + i] = opens[idx + i] * (1 + rng.uniform(0.001, 0.003))
+                    highs[idx + i] = max(highs[idx + i], closes[idx + i] * 1.001)
         
-        if random.random() > 0.8:
-            idx = random.randint(5, len(data) - 3)
+        if rng.random() > 0.8:
+            idx = rng.integers(5, len(data) - 2)
             if idx + 2 < len(data):
-                base = data[idx]['close']
-                data[idx + 1]['low'] = base * 0.998
-                data[idx + 1]['high'] = base * 1.003
-                data[idx + 1]['close'] = data[idx + 1]['high']
-        
-        if random.random() > 0.7:
-            idx = random.randint(15, len(data) - 2)
-            vol = self.volatility.get(symbol, 0.001)
-            data[idx]['high'] = data[idx]['close'] * (1 + vol * 3)
-            data[idx]['close'] = data[idx]['open']
+                base = closes[idx]
+                lows[idx + 1] = base * 0.998
+                highs[idx + 1] = base * 1.003
+                closes[idx + 1] = highs[idx + 1]
+        
+        if rng.random() > 0.7:
+            idx = rng.integers(15, len(data) - 1)
+            vol = self.volatility.get(symbol, 0.001) / self.base_prices.get(symbol, 1.0)
+            highs[idx] = closes[idx] * (1 + vol * 3)
+            closes[idx] = opens[idx]
     
     def get_current_price(self, symbol):
         data = self.get_historical_data(symbol, '1m', 1)
-        if data:
-            return data[-1]['close']
+        if len(data):
+            return float(data.close[-1])
         return self.base_prices.get(symbol, 1.0)
     
     def get_multiple_timeframes(self, symbol, timeframes=['1m', '5m', '15m', '1h', '4h']):
+        resampler = self.resampler
+        if resampler is not None:
+            # load the base series once at the longest length any timeframe needs,
+            # so every timeframe is aggregated from the same candles
+            lengths = [(100 + 1) * resampler.ratio(tf) for tf in timeframes if resampler.supports(tf)]
+            lengths = [n for n in lengths if n <= self.max_base_bars]
+            if lengths:
+                self.cache.get(symbol, resampler.base_timeframe, max(lengths), self._load)
+        
         result = {}
         for tf in timeframes:
             result[tf] = self.get_historical_data(symbol, tf, 100)
@@ -154,14 +290,15 @@ class MarketDataFetcher:
 
 
 class LiveMarketSimulator:
-    def __init__(self):
-        self.fetcher = MarketDataFetcher()
+    def __init__(self, fetcher=None, seed=None):
+        self.fetcher = fetcher or MarketDataFetcher(seed=seed)
+        self.rng = np.random.default_rng(seed)
         self.subscribers = {}
     
     def simulate_tick(self, symbol):
         current_data = self.fetcher.get_historical_data(symbol, '1m', 1)
-        if current_data:
-            base = current_data[-1]['close']
+        if len(current_data):
+            base = float(current_data.close[-1])
             vol = self.fetcher.volatility.get(symbol, 0.001)
             
             tick = {
@@ -170,7 +307,7 @@ class LiveMarketSimulator:
                 'ask': round(base + vol * 0.1, 5),
                 'mid': round(base, 5),
                 'spread': round(vol * 0.2, 6),
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': self.fetcher.now().isoformat()
             }
             return tick
         return None
@@ -186,8 +323,8 @@ class LiveMarketSimulator:
             bid_price = current_price - (i + 1) * vol * 0.1
             ask_price = current_price + (i + 1) * vol * 0.1
             
-            bid_size = random.uniform(100, 1000) * (depth - i) / depth
-            ask_size = random.uniform(100, 1000) * (depth - i) / depth
+            bid_size = self.rng.uniform(100, 1000) * (depth - i) / depth
+            ask_size = self.rng.uniform(100, 1000) * (depth - i) / depth
             
             bids.append({'price': round(bid_price, 5), 'size': round(bid_size, 2)})
             asks.append({'price': round(ask_price, 5), 'size': round(ask_size, 2)})
@@ -196,5 +333,5 @@ class LiveMarketSimulator:
             'symbol': symbol,
             'bids': bids,
             'asks': asks,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': self.fetcher.now().isoformat()
         }
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import time
+
+import socketio
+
+
+def client_manager(url, channel='flask-socketio'):
+    """Socket.IO client manager for ``url``, or None to let Flask-SocketIO pick one.
+
+    ``sqlite:///path`` selects ``SQLiteManager``; ``redis://``, ``kafka://``,
+    ``zmq+tcp://`` and kombu URLs are handled by Flask-SocketIO itself through its
+    ``message_queue`` option.
+    """
+    if url and url.startswith('sqlite:'):
+        return SQLiteManager(url, channel=channel)
+    return None
+
+
+class SQLiteManager(socketio.PubSubManager):
+    """Socket.IO pub/sub backed by a table in a shared SQLite file.
+
+    A stand-in for Redis when several server processes run on one machine, as
+    in tests and local multi-worker runs. ``_publish`` appends a row; each
+    process polls for rows newer than the last one it saw. Rows older than
+    ``retention`` seconds are pruned now and then by the publishers.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, url='sqlite:///socketio_queue.db', channel='socketio', write_only=False, logger=None,
+                 json=None, poll_interval=0.05, retention=60.0):
+        self.path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url[len('sqlite:'):]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._published = 0
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = self._connect()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS socketio_messages ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, created REAL NOT NULL, data TEXT NOT NULL)'
+        )
+
+    def _connect(self):
+        # autocommit; green threads share the connection under eventlet
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+
+    def _publish(self, data):
+        now = time.time()
+        self._conn.execute('INSERT INTO socketio_messages (channel, created, data) VALUES (?, ?, ?)',
+                           (self.channel, now, self.json.dumps(data)))
+        self._published += 1
+        if self._published % 1000 == 0:
+            self._conn.execute('DELETE FROM socketio_messages WHERE created < ?', (now - self.retention,))
+
+    def _listen(self):
+        conn = self._connect()
+        last = conn.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_messages').fetchone()[0]
+        while True:
+            rows = conn.execute('SELECT id, data FROM socketio_messages WHERE channel = ? AND id > ? ORDER BY id',
+                                (self.channel, last)).fetchall()
+            for last, data in rows:
+                yield data
+            if not rows:
+                time.sleep(self.poll_interval)
@@ -0,0 +1,111 @@
+"""
+Database migration for columns and indexes added to existing tables.
+
+db.create_all() only creates columns and indexes together with new tables, so
+databases created before the signal candle columns and the signal, trade and
+backtest result indexes existed need this once:
+
+    python migrate.py            # add the missing columns, then the indexes
+    python migrate.py --check    # only list them
+
+On MySQL each index is built with ALGORITHM=INPLACE, LOCK=NONE so the table
+stays writable while a large one is indexed.
+"""
+
+import sys
+
+from sqlalchemy import inspect, text
+
+from models import BacktestResult, MarketData, Signal, Trade
+
+MODELS = (Signal, Trade, BacktestResult, MarketData)
+
+
+def missing_columns(engine):
+    """``(table, column)`` pairs declared on the models but absent from the database."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for model in MODELS:
+        table = model.__table__
+        if table.name not in tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend((table.name, column.name) for column in table.columns if column.name not in existing)
+    return missing
+
+
+def add_columns(engine):
+    """Add the missing columns as nullable; returns the ``table.column`` names added."""
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    for table_name, column_name in missing_columns(engine):
+        column = next(model.__table__.c[column_name] for model in MODELS if model.__table__.name == table_name)
+        column_type = column.type.compile(dialect=engine.dialect)
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {preparer.quote(table_name)} "
+                              f"ADD COLUMN {preparer.quote(column_name)} {column_type}"))
+        added.append(f"{table_name}.{column_name}")
+    return added
+
+
+def missing_indexes(engine):
+    """``(table, index)`` pairs declared on the models but absent from the database."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for model in MODELS:
+        table = model.__table__
+        if table.name not in tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend((table.name, index.name) for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def create_indexes(engine, names=None):
+    """Create the missing indexes (or just those in ``names``); returns the names created."""
+    created = []
+    for table_name, index_name in missing_indexes(engine):
+        if names is not None and index_name not in names:
+            continue
+        index = next(i for model in MODELS for i in model.__table__.indexes if i.name == index_name)
+        with engine.begin() as conn:
+            if engine.dialect.name in ('mysql', 'mariadb'):
+                columns = ', '.join(f"`{column.name}`" for column in index.columns)
+                unique = 'UNIQUE ' if index.unique else ''
+                conn.execute(text(f"CREATE {unique}INDEX `{index_name}` ON `{table_name}` ({columns}) "
+                                  f"ALGORITHM=INPLACE LOCK=NONE"))
+            else:
+                index.create(conn)
+        created.append(index_name)
+    return created
+
+
+def main():
+    from app import app, db
+
+    check = '--check' in sys.argv[1:]
+    with app.app_context():
+        columns = missing_columns(db.engine)
+        missing = missing_indexes(db.engine)
+        if not columns and not missing:
+            print("✓ All columns and indexes present")
+            return 0
+
+        for table_name, column_name in columns:
+            print(f"{'✗ Missing' if check else '… Adding'} column {column_name} on {table_name}")
+        for table_name, index_name in missing:
+            print(f"{'✗ Missing' if check else '… Creating'} {index_name} on {table_name}")
+        if check:
+            return 1
+
+        for name in add_columns(db.engine):
+            print(f"✓ Added {name}")
+        for index_name in create_indexes(db.engine):
+            print(f"✓ Created {index_name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
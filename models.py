@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
+from serialization import loads
 
 db = SQLAlchemy()
 
@@ -28,6 +29,14 @@ class Trade(db.Model):
     strategy = db.Column(db.String(50))
     reasoning = db.Column(db.Text)
     
+    # newest-first listing, optionally filtered; the primary key rides along as the tiebreaker
+    __table_args__ = (
+        db.Index('idx_trades_entry_time', 'entry_time'),
+        db.Index('idx_trades_symbol_entry_time', 'symbol', 'entry_time'),
+        db.Index('idx_trades_status_entry_time', 'status', 'entry_time'),
+        db.Index('idx_trades_signal_grade_entry_time', 'signal_grade', 'entry_time', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -53,6 +62,8 @@ class Signal(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     symbol = db.Column(db.String(20), nullable=False)
+    timeframe = db.Column(db.String(10))
+    candle_time = db.Column(db.DateTime)
     signal_type = db.Column(db.String(50), nullable=False)
     direction = db.Column(db.String(10), nullable=False)
     grade = db.Column(db.String(5), nullable=False)
@@ -69,10 +80,20 @@ class Signal(db.Model):
     status = db.Column(db.String(20), default='active')
     outcome = db.Column(db.String(20))
     
+    __table_args__ = (
+        db.Index('idx_signals_timestamp', 'timestamp'),
+        db.Index('idx_signals_symbol_timestamp', 'symbol', 'timestamp'),
+        db.Index('idx_signals_status_timestamp', 'status', 'timestamp'),
+        db.Index('idx_signals_grade_timestamp', 'grade', 'timestamp'),
+        db.Index('uq_signals_candle', 'symbol', 'timeframe', 'candle_time', 'signal_type', unique=True),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
             'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'candle_time': self.candle_time.isoformat() if self.candle_time else None,
             'signal_type': self.signal_type,
             'direction': self.direction,
             'grade': self.grade,
@@ -109,6 +130,12 @@ class BacktestResult(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     result_data = db.Column(db.Text)
     
+    __table_args__ = (
+        db.Index('idx_backtest_results_timestamp', 'timestamp'),
+        db.Index('idx_backtest_results_symbol_timestamp', 'symbol', 'timestamp'),
+        db.Index('idx_backtest_results_strategy_timestamp', 'strategy', 'timestamp'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -125,7 +152,7 @@ class BacktestResult(db.Model):
             'total_pips': self.total_pips,
             'avg_trade_duration': self.avg_trade_duration,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
-            'result_data': json.loads(self.result_data) if self.result_data else {}
+            'result_data': loads(self.result_data) if self.result_data else {}
         }
 
 class MarketData(db.Model):
@@ -142,7 +169,7 @@ class MarketData(db.Model):
     volume = db.Column(db.Float, default=0)
     
     __table_args__ = (
-        db.Index('idx_symbol_timeframe_timestamp', 'symbol', 'timeframe', 'timestamp'),
+        db.Index('idx_symbol_timeframe_timestamp', 'symbol', 'timeframe', 'timestamp', unique=True),
     )
     
     def to_dict(self):
@@ -157,6 +184,16 @@ class MarketData(db.Model):
             'volume': self.volume
         }
 
+class AnalysisPartition(db.Model):
+    __tablename__ = 'analysis_partitions'
+    
+    symbol = db.Column(db.String(20), primary_key=True)
+    timeframe = db.Column(db.String(10), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    lease_expires = db.Column(db.DateTime, nullable=False)
+    closed = db.Column(db.DateTime)
+    payload = db.Column(db.Text)
+    
 class UserSettings(db.Model):
     __tablename__ = 'user_settings'
     
@@ -0,0 +1,120 @@
+import numpy as np
+from sqlalchemy import func, inspect, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from candles import CandleSeries, PRICE_COLUMNS
+from models import MarketData
+
+CONFLICT_COLUMNS = ['symbol', 'timeframe', 'timestamp']
+
+
+class OHLCVStore:
+    """Candle persistence on the ``market_data`` table.
+
+    Writes are bulk upserts (``INSERT ... ON CONFLICT`` / ``ON DUPLICATE KEY``)
+    against the unique ``idx_symbol_timeframe_timestamp`` index, executed as one
+    executemany per chunk; reads are range scans on the same index that come back
+    as a ``CandleSeries``. Works on a plain SQLAlchemy engine so it can be used
+    outside a Flask app context.
+
+    Long writes and reads are split into ``chunk_size`` rows, each chunk its own
+    short transaction or query, and ``pause`` (e.g. ``socketio.sleep``) is called
+    between them so a large load does not hold up every other green thread.
+    """
+
+    def __init__(self, engine, chunk_size=5000, pause=None):
+        self.engine = engine
+        self.table = MarketData.__table__
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self._ensure_unique_index()
+
+    def _ensure_unique_index(self):
+        # databases created before the index became unique keep the old one, which
+        # upserts cannot use as a conflict target; nothing wrote to the table then
+        index = next(i for i in self.table.indexes if i.name == 'idx_symbol_timeframe_timestamp')
+        existing = {i['name']: i for i in inspect(self.engine).get_indexes(self.table.name)}
+        current = existing.get(index.name)
+        if current is not None and current.get('unique'):
+            return
+        with self.engine.begin() as conn:
+            if current is not None:
+                index.drop(conn)
+            index.create(conn)
+
+    def upsert(self, symbol, timeframe, candles):
+        if not len(candles):
+            return 0
+
+        stamps = candles.timestamp.view('datetime64[ns]').astype('datetime64[us]').tolist()
+        columns = [candles.values[row].tolist() for row in range(len(PRICE_COLUMNS))]
+        rows = [
+            {'symbol': symbol, 'timeframe': timeframe, 'timestamp': ts,
+             'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for ts, o, h, l, c, v in zip(stamps, *columns)
+        ]
+
+        statement = self._upsert_statement()
+        for start in range(0, len(rows), self.chunk_size):
+            if start:
+                self._pause()
+            # a transaction per chunk: an upsert is safe to repeat, and no lock is
+            # held while other green threads run
+            with self.engine.begin() as conn:
+                conn.execute(statement, rows[start:start + self.chunk_size])
+        return len(rows)
+
+    def _pause(self):
+        if self.pause is not None:
+            self.pause()
+
+    def _upsert_statement(self):
+        dialect = self.engine.dialect.name
+        if dialect in ('mysql', 'mariadb'):
+            statement = mysql.insert(self.table)
+            return statement.on_duplicate_key_update({c: statement.inserted[c] for c in PRICE_COLUMNS})
+
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(self.table)
+        return statement.on_conflict_do_update(
+            index_elements=CONFLICT_COLUMNS,
+            set_={c: statement.excluded[c] for c in PRICE_COLUMNS}
+        )
+
+    def load(self, symbol, timeframe, start=None, end=None, limit=None):
+        """Candles in ``[start, end]``, oldest first; with ``limit``, the most recent ``limit`` of them."""
+        t = self.table
+        query = select(t.c.timestamp, *(t.c[c] for c in PRICE_COLUMNS)).where(
+            t.c.symbol == symbol, t.c.timeframe == timeframe
+        )
+        if start is not None:
+            query = query.where(t.c.timestamp >= start)
+        if end is not None:
+            query = query.where(t.c.timestamp <= end)
+        if limit is not None:
+            with self.engine.connect() as conn:
+                rows = conn.execute(query.order_by(t.c.timestamp.desc()).limit(limit)).all()
+            rows.reverse()
+        else:
+            # keyset chunks, each a query of its own, so no read stays open across a pause
+            rows = []
+            while True:
+                chunk_query = query if not rows else query.where(t.c.timestamp > rows[-1][0])
+                with self.engine.connect() as conn:
+                    chunk = conn.execute(chunk_query.order_by(t.c.timestamp).limit(self.chunk_size)).all()
+                rows.extend(chunk)
+                if len(chunk) < self.chunk_size:
+                    break
+                self._pause()
+
+        if not rows:
+            return CandleSeries(np.empty(0, dtype=np.int64), np.empty((len(PRICE_COLUMNS), 0)))
+        timestamps, *columns = zip(*rows)
+        columns = [np.array(col, dtype=float) for col in columns]
+        return CandleSeries.from_arrays(np.array(timestamps, dtype='datetime64[ns]'), *columns)
+
+    def count(self, symbol, timeframe):
+        t = self.table
+        query = select(func.count()).select_from(t).where(t.c.symbol == symbol, t.c.timeframe == timeframe)
+        with self.engine.connect() as conn:
+            return conn.execute(query).scalar()
@@ -1,9 +1,26 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from analysis_context import AnalysisContext
+
+SINGLE_CANDLE_PATTERNS = ['hammer', 'hanging_man', 'shooting_star', 'inverted_hammer', 'doji', 'marubozu']
+DOUBLE_CANDLE_PATTERNS = ['bullish_engulfing', 'bearish_engulfing', 'bullish_harami', 'bearish_harami',
+                          'tweezer_top', 'tweezer_bottom']
+TRIPLE_CANDLE_PATTERNS = ['morning_star', 'evening_star', 'three_white_soldiers', 'three_black_crows']
+CANDLE_PATTERNS = SINGLE_CANDLE_PATTERNS + DOUBLE_CANDLE_PATTERNS + TRIPLE_CANDLE_PATTERNS
+
+PATTERN_DIRECTIONS = {
+    'hammer': 'bullish', 'hanging_man': 'bearish', 'shooting_star': 'bearish', 'inverted_hammer': 'bullish',
+    'doji': 'neutral', 'marubozu': None,
+    'bullish_engulfing': 'bullish', 'bearish_engulfing': 'bearish', 'bullish_harami': 'bullish',
+    'bearish_harami': 'bearish', 'tweezer_top': 'bearish', 'tweezer_bottom': 'bullish',
+    'morning_star': 'bullish', 'evening_star': 'bearish', 'three_white_soldiers': 'bullish',
+    'three_black_crows': 'bearish',
+}
+
 
 class PatternDetector:
-    def detect_all(self, df):
+    def detect_all(self, df, context=None):
         if len(df) < 10:
             return []
         
@@ -12,10 +29,118 @@ class PatternDetector:
         patterns.extend(self.detect_single_candle_patterns(df))
         patterns.extend(self.detect_double_candle_patterns(df))
         patterns.extend(self.detect_triple_candle_patterns(df))
-        patterns.extend(self.detect_chart_patterns(df))
+        patterns.extend(self.detect_chart_patterns(df, context))
         
         return patterns
     
+    @staticmethod
+    def pattern_flags(opens, highs, lows, closes):
+        """Boolean arrays, per bar, for every candlestick pattern the detect_* methods
+        check on the last few candles, using the same conditions."""
+        n = len(closes)
+        o, h, l, c = opens, highs, lows, closes
+        body = np.abs(c - o)
+        upper_wick = h - np.maximum(o, c)
+        lower_wick = np.minimum(o, c) - l
+        total_range = h - l
+        has_range = total_range != 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            body_ratio = np.where(has_range, body / total_range, 0.0)
+        
+        flags = {}
+        flags['hammer'] = has_range & (lower_wick > 2 * body) & (upper_wick < body * 0.5) & (c > o)
+        flags['hanging_man'] = has_range & (lower_wick > 2 * body) & (upper_wick < body * 0.5) & (c < o)
+        flags['shooting_star'] = has_range & (upper_wick > 2 * body) & (lower_wick < body * 0.5) & (c < o)
+        flags['inverted_hammer'] = has_range & (upper_wick > 2 * body) & (lower_wick < body * 0.5) & (c > o)
+        flags['doji'] = has_range & (body_ratio < 0.1) & (upper_wick > 0) & (lower_wick > 0)
+        flags['marubozu'] = has_range & (body_ratio > 0.8) & (upper_wick < body * 0.05) & (lower_wick < body * 0.05)
+        
+        def prev(values, k):
+            out = np.full(n, np.nan)
+            out[k:] = values[:n - k]
+            return out
+        
+        o1, h1, l1, c1 = prev(o, 1), prev(h, 1), prev(l, 1), prev(c, 1)
+        body1 = np.abs(c1 - o1)
+        flags['bullish_engulfing'] = (c1 < o1) & (c > o) & (c > o1) & (o < c1)
+        flags['bearish_engulfing'] = (c1 > o1) & (c < o) & (c < o1) & (o > c1)
+        flags['bullish_harami'] = (c1 < o1) & (c > o) & (body < body1 * 0.5) & (o > c1) & (c < o1)
+        flags['bearish_harami'] = (c1 > o1) & (c < o) & (body < body1 * 0.5) & (o < c1) & (c > o1)
+        flags['tweezer_top'] = (np.abs(h1 - h) < body1 * 0.1) & (np.abs(h1 - h) < body * 0.1)
+        flags['tweezer_bottom'] = (np.abs(l1 - l) < body1 * 0.1) & (np.abs(l1 - l) < body * 0.1)
+        
+        o2, c2 = prev(o, 2), prev(c, 2)
+        body2 = np.abs(c2 - o2)
+        flags['morning_star'] = (c2 < o2) & (body1 < body2 * 0.3) & (c > o) & (c > (o2 + c2) / 2)
+        flags['evening_star'] = (c2 > o2) & (body1 < body2 * 0.3) & (c < o) & (c < (o2 + c2) / 2)
+        flags['three_white_soldiers'] = (c2 > o2) & (c1 > o1) & (c > o) & (o1 > c2 * 0.98) & (o > c1 * 0.98)
+        flags['three_black_crows'] = (c2 < o2) & (c1 < o1) & (c < o) & (o1 < c2 * 1.02) & (o < c1 * 1.02)
+        return flags
+    
+    def scan_history(self, df, patterns=None):
+        """Candlestick patterns over the whole series as a sparse event table.
+        
+        One row per (bar, pattern) hit, indexed by bar, with the same type,
+        direction, strength and price the per-candle detectors report for the
+        last few bars. Hits on one bar follow ``CANDLE_PATTERNS`` order.
+        """
+        names = [p for p in CANDLE_PATTERNS if patterns is None or p in patterns]
+        o = df['open'].to_numpy(dtype=float)
+        h = df['high'].to_numpy(dtype=float)
+        l = df['low'].to_numpy(dtype=float)
+        c = df['close'].to_numpy(dtype=float)
+        flags = self.pattern_flags(o, h, l, c)
+        
+        body = np.abs(c - o)
+        body1 = np.concatenate([[np.nan], body[:-1]])
+        upper_wick = h - np.maximum(o, c)
+        lower_wick = np.minimum(o, c) - l
+        prev_high = np.concatenate([[np.nan], h[:-1]])
+        prev_low = np.concatenate([[np.nan], l[:-1]])
+        strong = {
+            'hammer': lower_wick > 3 * body,
+            'hanging_man': lower_wick > 3 * body,
+            'shooting_star': upper_wick > 3 * body,
+            'inverted_hammer': upper_wick > 3 * body,
+            'bullish_engulfing': body > 1.5 * body1,
+            'bearish_engulfing': body > 1.5 * body1,
+        }
+        price = {
+            'tweezer_top': np.maximum(prev_high, h),
+            'tweezer_bottom': np.minimum(prev_low, l),
+        }
+        
+        bars, types, directions, strengths, prices = [], [], [], [], []
+        for name in names:
+            hits = np.flatnonzero(flags[name])
+            bars.append(hits)
+            types.append(np.full(len(hits), name, dtype=object))
+            if PATTERN_DIRECTIONS[name] is None:
+                directions.append(np.where(c[hits] > o[hits], 'bullish', 'bearish').astype(object))
+            else:
+                directions.append(np.full(len(hits), PATTERN_DIRECTIONS[name], dtype=object))
+            if name in strong:
+                strengths.append(np.where(strong[name][hits], 'strong', 'moderate').astype(object))
+            else:
+                level = 'strong' if name in TRIPLE_CANDLE_PATTERNS or name == 'marubozu' else 'moderate'
+                strengths.append(np.full(len(hits), level, dtype=object))
+            prices.append(price.get(name, c)[hits])
+        
+        bars = np.concatenate(bars) if bars else np.array([], dtype=np.int64)
+        order = np.argsort(bars, kind='stable')
+        bars = bars[order]
+        
+        def column(parts, dtype=object):
+            return np.concatenate(parts)[order] if parts else np.array([], dtype=dtype)
+        
+        return pd.DataFrame({
+            'timestamp': df['timestamp'].to_numpy()[bars],
+            'type': column(types),
+            'direction': column(directions),
+            'strength': column(strengths),
+            'price': column(prices, float),
+        }, index=pd.Index(bars, name='bar'))
+    
     def detect_single_candle_patterns(self, df):
         patterns = []
         
@@ -249,7 +374,7 @@ class PatternDetector:
         
         return patterns
     
-    def detect_chart_patterns(self, df):
+    def detect_chart_patterns(self, df, context=None):
         patterns = []
         
         if len(df) < 30:
@@ -282,18 +407,18 @@ class PatternDetector:
             })
         
         if len(df) >= 20:
-            recent_highs = []
-            recent_lows = []
+            context = context or AnalysisContext(df)
             
-            for i in range(5, len(df) - 5):
-                if df['high'].iloc[i] == max(df['high'].iloc[i-5:i+5]):
-                    recent_highs.append({'idx': i, 'price': float(df['high'].iloc[i])})
-                if df['low'].iloc[i] == min(df['low'].iloc[i-5:i+5]):
-                    recent_lows.append({'idx': i, 'price': float(df['low'].iloc[i])})
+            # windows run from 5 bars before to 4 bars after, for bars 5..len-6
+            last_bar = len(df) - 6
+            recent_highs = context.swing_highs(5, 4)
+            recent_lows = context.swing_lows(5, 4)
+            recent_highs = recent_highs[recent_highs <= last_bar]
+            recent_lows = recent_lows[recent_lows <= last_bar]
             
             if len(recent_highs) >= 2 and len(recent_lows) >= 2:
-                high_trend = recent_highs[-1]['price'] - recent_highs[0]['price']
-                low_trend = recent_lows[-1]['price'] - recent_lows[0]['price']
+                high_trend = float(context.highs[recent_highs[-1]]) - float(context.highs[recent_highs[0]])
+                low_trend = float(context.lows[recent_lows[-1]]) - float(context.lows[recent_lows[0]])
                 
                 if high_trend < 0 and low_trend > 0:
                     patterns.append({
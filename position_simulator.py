@@ -0,0 +1,229 @@
+import heapq
+
+import numpy as np
+
+EXIT_STOP_LOSS = 0
+EXIT_TAKE_PROFIT = 1
+EXIT_END_OF_BACKTEST = 2
+EXIT_REASONS = ['stop_loss', 'take_profit', 'end_of_backtest']
+
+
+class TradeLedger:
+    """Columnar trade ledger: one NumPy array per field, one row per trade.
+
+    Rows are kept in the order the per-bar loop used to close trades: by exit
+    bar (then entry order), followed by positions still open at the end.
+    """
+
+    __slots__ = ('entry_index', 'exit_index', 'direction', 'grade', 'entry_price', 'exit_price',
+                 'stop_loss', 'take_profit', 'position_size', 'pnl', 'pips', 'exit_reason',
+                 'timestamps', 'records')
+
+    def __init__(self, entry_index, exit_index, direction, grade, entry_price, exit_price,
+                 stop_loss, take_profit, position_size, pnl, pips, exit_reason, timestamps=None, records=None):
+        self.entry_index = entry_index
+        self.exit_index = exit_index
+        self.direction = direction
+        self.grade = grade
+        self.entry_price = entry_price
+        self.exit_price = exit_price
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.position_size = position_size
+        self.pnl = pnl
+        self.pips = pips
+        self.exit_reason = exit_reason
+        self.timestamps = timestamps
+        self.records = records
+
+    def __len__(self):
+        return len(self.pnl)
+
+    @classmethod
+    def from_records(cls, trades):
+        return cls(
+            entry_index=np.array([t['entry_index'] for t in trades], dtype=np.int64),
+            exit_index=np.array([t.get('exit_index', -1) for t in trades], dtype=np.int64),
+            direction=np.array([1 if t['direction'] == 'long' else -1 for t in trades], dtype=np.int8),
+            grade=np.array([t.get('grade', 'Unknown') for t in trades], dtype=object),
+            entry_price=np.array([t['entry_price'] for t in trades], dtype=float),
+            exit_price=np.array([t['exit_price'] for t in trades], dtype=float),
+            stop_loss=np.array([t['stop_loss'] for t in trades], dtype=float),
+            take_profit=np.array([t['take_profit'] for t in trades], dtype=float),
+            position_size=np.array([t['position_size'] for t in trades], dtype=float),
+            pnl=np.array([t['pnl'] for t in trades], dtype=float),
+            pips=np.array([t.get('pips', 0) for t in trades], dtype=float),
+            exit_reason=np.array([EXIT_REASONS.index(t['exit_reason']) for t in trades], dtype=np.int8),
+            records=trades,
+        )
+
+    def to_records(self, start=0):
+        if self.records is not None:
+            return self.records[start:]
+
+        records = []
+        for k in range(len(self))[start:]:
+            exit_reason = EXIT_REASONS[self.exit_reason[k]]
+            record = {
+                'entry_index': int(self.entry_index[k]),
+                'entry_price': float(self.entry_price[k]),
+                'entry_time': str(self.timestamps[self.entry_index[k]]),
+                'direction': 'long' if self.direction[k] == 1 else 'short',
+                'stop_loss': float(self.stop_loss[k]),
+                'take_profit': float(self.take_profit[k]),
+                'position_size': float(self.position_size[k]),
+                'grade': self.grade[k],
+                'status': 'closed',
+                'exit_price': float(self.exit_price[k]),
+                'exit_reason': exit_reason,
+                'pnl': float(self.pnl[k]),
+                'pips': float(self.pips[k]),
+            }
+            if exit_reason == 'end_of_backtest':
+                record['exit_time'] = str(self.timestamps[-1])
+            else:
+                record['exit_time'] = str(self.timestamps[self.exit_index[k]])
+                record['exit_index'] = int(self.exit_index[k])
+            records.append(record)
+        return records
+
+
+class PositionSimulator:
+    """Resolves SL/TP exits for many trades at once over high/low arrays.
+
+    ``resolve_exits`` scans forward from every entry in blocks of bars (the block
+    doubles each round, capped by ``max_cells`` per chunk) and takes the first bar
+    that touches either level, so the cost is driven by trade durations rather than
+    by a Python loop over bars. Stop loss wins when both levels are touched on the
+    same bar, matching the per-bar loop.
+    """
+
+    def __init__(self, initial_block=32, max_block=4096, max_cells=1 << 22):
+        self.initial_block = initial_block
+        self.max_block = max_block
+        self.max_cells = max_cells
+
+    def resolve_exits(self, highs, lows, entry_index, direction, stop_loss, take_profit, last_bar):
+        count = len(entry_index)
+        exit_index = np.full(count, -1, dtype=np.int64)
+        exit_reason = np.full(count, EXIT_END_OF_BACKTEST, dtype=np.int8)
+        if count == 0:
+            return exit_index, exit_reason
+
+        cursor = entry_index.astype(np.int64).copy()
+        pending = np.flatnonzero(cursor <= last_bar)
+        width = self.initial_block
+
+        while pending.size:
+            rows_per_chunk = max(1, self.max_cells // width)
+            carry = []
+            for chunk_start in range(0, pending.size, rows_per_chunk):
+                rows = pending[chunk_start:chunk_start + rows_per_chunk]
+                start = cursor[rows]
+                bars = start[:, None] + np.arange(width)
+                in_range = bars <= last_bar
+                bars = np.minimum(bars, last_bar)
+                bar_high = highs[bars]
+                bar_low = lows[bars]
+
+                is_long = (direction[rows] == 1)[:, None]
+                sl = stop_loss[rows][:, None]
+                tp = take_profit[rows][:, None]
+                sl_hit = np.where(is_long, bar_low <= sl, bar_high >= sl) & in_range
+                tp_hit = np.where(is_long, bar_high >= tp, bar_low <= tp) & in_range
+                hit = sl_hit | tp_hit
+
+                found = hit.any(axis=1)
+                first = hit.argmax(axis=1)
+                done = np.flatnonzero(found)
+                exit_index[rows[done]] = start[done] + first[done]
+                exit_reason[rows[done]] = np.where(sl_hit[done, first[done]], EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+
+                remaining = ~found & (start + width <= last_bar)
+                cursor[rows[remaining]] = start[remaining] + width
+                carry.append(rows[remaining])
+
+            pending = np.concatenate(carry)
+            width = min(width * 2, self.max_block)
+
+        return exit_index, exit_reason
+
+    def simulate(self, highs, lows, closes, entry_index, direction, grade, atr,
+                 first_bar, last_bar, initial_capital, risk_per_trade, timestamps=None):
+        """Run entries through SL/TP exits and capital accounting.
+
+        Exit bars come from ``resolve_exits``; only position sizing, which depends
+        on the capital available at entry, is walked trade by trade. Returns the
+        ledger and the per-bar equity curve the walk-forward loop would record.
+        """
+        entry_index = np.asarray(entry_index, dtype=np.int64)
+        is_long = direction == 1
+        entry_price = closes[entry_index]
+        stop_loss = np.where(is_long, entry_price - (2 * atr), entry_price + (2 * atr))
+        take_profit = np.where(is_long, entry_price + (3 * atr), entry_price - (3 * atr))
+        sl_distance = np.abs(entry_price - stop_loss)
+
+        exit_index, exit_reason = self.resolve_exits(highs, lows, entry_index, direction,
+                                                     stop_loss, take_profit, last_bar)
+        exit_price = np.where(exit_reason == EXIT_STOP_LOSS, stop_loss,
+                              np.where(exit_reason == EXIT_TAKE_PROFIT, take_profit, closes[-1]))
+        price_move = np.where(is_long, exit_price - entry_price, entry_price - exit_price)
+
+        count = len(entry_index)
+        position_size = [0.0] * count
+        pnl = [0.0] * count
+        capital = initial_capital
+        pending = []
+        closed, close_bars, close_capital = [], [], []
+        still_open = []
+
+        entry_list = entry_index.tolist()
+        exit_list = exit_index.tolist()
+        distance_list = sl_distance.tolist()
+        move_list = price_move.tolist()
+        for k in range(count):
+            while pending and pending[0][0] < entry_list[k]:
+                bar, j = heapq.heappop(pending)
+                capital += pnl[j]
+                closed.append(j)
+                close_bars.append(bar)
+                close_capital.append(capital)
+
+            size = capital * risk_per_trade / distance_list[k] if distance_list[k] > 0 else 0.01
+            position_size[k] = size
+            pnl[k] = move_list[k] * size
+            if exit_list[k] >= 0:
+                heapq.heappush(pending, (exit_list[k], k))
+            else:
+                still_open.append(k)
+
+        while pending:
+            bar, j = heapq.heappop(pending)
+            capital += pnl[j]
+            closed.append(j)
+            close_bars.append(bar)
+            close_capital.append(capital)
+
+        bars = np.arange(first_bar, last_bar + 1)
+        latest = np.searchsorted(np.array(close_bars, dtype=np.int64), bars, side='right') - 1
+        curve = np.array(close_capital, dtype=float)[np.maximum(latest, 0)].tolist() if close_capital else []
+        before_first_close = int((latest < 0).sum())
+        equity_curve = [initial_capital] + [initial_capital] * before_first_close + curve[before_first_close:]
+
+        order = np.array(closed + still_open, dtype=np.int64)
+        ledger = TradeLedger(
+            entry_index=entry_index[order],
+            exit_index=exit_index[order],
+            direction=np.asarray(direction)[order],
+            grade=np.asarray(grade, dtype=object)[order],
+            entry_price=entry_price[order],
+            exit_price=exit_price[order],
+            stop_loss=stop_loss[order],
+            take_profit=take_profit[order],
+            position_size=np.array(position_size)[order],
+            pnl=np.array(pnl)[order],
+            pips=(price_move * 10000)[order],
+            exit_reason=exit_reason[order],
+            timestamps=timestamps,
+        )
+        return ledger, equity_curve
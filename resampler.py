@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+
+from candles import CandleSeries, TIMEFRAME_MINUTES, PRICE_COLUMNS
+
+MINUTE_NS = 60 * 10**9
+
+
+def timeframe_ns(timeframe):
+    return TIMEFRAME_MINUTES.get(timeframe, 60) * MINUTE_NS
+
+
+def resample(candles, step, base_step):
+    """Aggregate ``candles`` into epoch-aligned buckets ``step`` ns wide.
+
+    Open is the first open in the bucket, close the last close, high/low the
+    extremes and volume the sum. A bucket at either end is dropped unless the
+    candles cover it from its first ``base_step`` to its last, so every candle
+    returned is complete.
+    """
+    stamps = candles.timestamp
+    if not len(stamps):
+        return CandleSeries(np.empty(0, dtype=np.int64), np.empty((len(PRICE_COLUMNS), 0)))
+
+    buckets = stamps - stamps % step
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.concatenate([starts[1:], [len(stamps)]]) - 1
+
+    keep = np.ones(len(starts), dtype=bool)
+    keep[0] &= stamps[0] == buckets[0]
+    keep[-1] &= stamps[-1] == buckets[-1] + step - base_step
+
+    values = candles.values
+    out = np.empty((len(PRICE_COLUMNS), len(starts)), dtype=np.float64)
+    out[0] = values[0, starts]
+    out[1] = np.maximum.reduceat(values[1], starts)
+    out[2] = np.minimum.reduceat(values[2], starts)
+    out[3] = values[3, ends]
+    out[4] = np.add.reduceat(values[4], starts)
+    return CandleSeries(buckets[starts][keep], out[:, keep])
+
+
+class Resampler:
+    """Derives higher timeframes from candles at one base resolution.
+
+    Completed buckets are cached per (symbol, timeframe) together with the base
+    candle they ended on. Later calls aggregate only the base candles after that
+    one and append the buckets they complete, so a new base candle costs a
+    single bucket's worth of work. The cache is rebuilt when the base series no
+    longer contains that candle unchanged, or reaches back further than the
+    cache does and more buckets are asked for.
+    """
+
+    def __init__(self, base_timeframe='1m', max_buckets=5000):
+        self.base_timeframe = base_timeframe
+        self.max_buckets = max_buckets
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.updates = 0
+
+    def supports(self, timeframe):
+        base = TIMEFRAME_MINUTES.get(self.base_timeframe)
+        target = TIMEFRAME_MINUTES.get(timeframe)
+        return base is not None and target is not None and target > base and target % base == 0
+
+    def ratio(self, timeframe):
+        return TIMEFRAME_MINUTES[timeframe] // TIMEFRAME_MINUTES[self.base_timeframe]
+
+    def get(self, symbol, timeframe, base, limit):
+        """The most recent ``limit`` complete ``timeframe`` candles built from ``base``."""
+        key = (symbol, timeframe)
+        step = timeframe_ns(timeframe)
+        base_step = timeframe_ns(self.base_timeframe)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        series = None
+        if entry is not None:
+            cached, last_stamp, last_close = entry
+            pos = int(np.searchsorted(base.timestamp, last_stamp))
+            intact = pos < len(base) and base.timestamp[pos] == last_stamp and base.close[pos] == last_close
+            if intact and (len(cached) >= limit or base.timestamp[0] >= cached.timestamp[0]):
+                fresh = resample(base[pos + 1:], step, base_step)
+                series = CandleSeries.concat([cached, fresh]) if len(fresh) else cached
+                self.updates += 1
+        if series is None:
+            series = resample(base, step, base_step)
+            self.rebuilds += 1
+
+        series = series.tail(max(limit, self.max_buckets))
+        if len(series):
+            # the base candle the newest bucket ended on marks where the next update starts
+            pos = int(np.searchsorted(base.timestamp, series.timestamp[-1] + step)) - 1
+            with self._lock:
+                self._entries[key] = (series, base.timestamp[pos], base.close[pos])
+        return series.tail(limit)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'base_timeframe': self.base_timeframe,
+                'series': len(self._entries),
+                'rebuilds': self.rebuilds,
+                'updates': self.updates,
+            }
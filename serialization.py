@@ -0,0 +1,72 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+
+def _default(value):
+    # what orjson does natively, for the stdlib fallback; anything else becomes
+    # its str() as result_data always did
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[us]').item().isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.floating):
+        return float(str(value))
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def dumps_bytes(obj):
+    """Compact, key-sorted UTF-8 JSON.
+
+    Uses orjson when it is installed. The stdlib fallback encodes NumPy
+    scalars and arrays, datetimes and everything else the analysis and backtest
+    payloads contain to the same JSON, but not always the same bytes: floats
+    can be spelled differently (orjson writes ``-0.00008999999999992347`` and
+    ``1e16`` where the stdlib writes ``-8.999999999992347e-05`` and ``1e+16``)
+    and parse back to the same value. NaN and infinity do differ: orjson writes
+    them as ``null``, the stdlib as ``NaN`` and ``Infinity``.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=OPTIONS)
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by ``dumps_bytes``, so ``jsonify`` responses
+    skip the stdlib encoder and understand NumPy values."""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
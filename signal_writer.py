@@ -0,0 +1,282 @@
+import glob
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Signal, Trade
+from serialization import dumps, loads
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DATETIME_COLUMNS = ('timestamp', 'expiry', 'entry_time', 'exit_time', 'candle_time')
+SIGNAL_COLUMNS = ('symbol', 'timeframe', 'candle_time', 'signal_type', 'direction', 'grade', 'confidence', 'entry_price',
+                  'stop_loss', 'take_profit', 'risk_reward', 'timestamp', 'expiry', 'reasoning', 'status')
+TRADE_COLUMNS = ('symbol', 'direction', 'entry_price', 'exit_price', 'stop_loss', 'take_profit',
+                 'position_size', 'entry_time', 'exit_time', 'pnl', 'pips', 'status', 'signal_grade',
+                 'strategy', 'reasoning')
+
+
+class SignalWriter:
+    """Write-behind persistence for generated signals and trade updates.
+
+    ``record_signals`` and ``record_trade`` only append to an in-memory buffer
+    and to a local journal file, so the analysis path never waits on the
+    database. ``flush`` writes the buffer with one bulk insert per table (and
+    one executemany for trade updates); the background task started by
+    ``start`` flushes every ``flush_interval`` seconds, and a flush is
+    scheduled early once ``max_batch`` records are waiting.
+
+    The journal is split into segments. A flush seals the current segment and
+    deletes the sealed ones only after the batch committed, so after a crash
+    ``recover`` (run by the constructor) re-queues everything that may not have
+    reached the database. Delivery is at least once: a crash between the commit
+    and the delete replays that batch.
+
+    Each process claims its own numbered journal directory with a file lock, so
+    several server processes can share ``journal_dir``; a restarted process
+    takes over the directory of the one that died.
+
+    Signals recorded with the candle they were computed on are kept once per
+    ``(symbol, timeframe, candle_time, signal_type)``: a candle this writer
+    already recorded for the pair is skipped, and the insert ignores rows
+    another process (or a replayed journal) already wrote under the unique
+    index on those columns.
+    """
+
+    def __init__(self, engine, journal_dir='signal_journal', max_batch=500, flush_interval=2.0, fsync=False):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.signals = Signal.__table__
+        self.trades = Trade.__table__
+        self._buffer = []
+        self._pending_segments = []
+        self._lock = threading.Lock()
+        self._flushing = False
+        self._spawn = None
+        self._task = None
+        self._last_candles = {}
+        self.recorded = 0
+        self.skipped = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+
+        self.directory, self._dir_lock = _claim_directory(journal_dir)
+        self._sequence = 0
+        self._journal = None
+        self.recover()
+        self._open_segment()
+
+    def recover(self):
+        """Re-queue records from journal segments left by a previous run of this directory."""
+        segments = sorted(glob.glob(os.path.join(self.directory, 'segment-*.ndjson')), key=_segment_number)
+        for path in segments:
+            with open(path, 'rb') as journal:
+                for line in journal:
+                    try:
+                        self._buffer.append(_from_journal(loads(line)))
+                    except ValueError:
+                        # a torn last line from a crash mid-write
+                        break
+            self._pending_segments.append(path)
+            self._sequence = max(self._sequence, _segment_number(path))
+        if segments:
+            print(f"Recovered {len(self._buffer)} journaled signal/trade records from {self.directory}")
+        return len(self._buffer)
+
+    def _open_segment(self):
+        self._sequence += 1
+        path = os.path.join(self.directory, f"segment-{self._sequence:08d}.ndjson")
+        self._journal = open(path, 'ab')
+        self._journal_path = path
+
+    def record_signals(self, signals, symbol=None, timeframe=None, candle_time=None):
+        """Queue the signals of one analysis; ``candle_time`` is the last candle it saw.
+
+        With ``candle_time`` the signals are recorded only the first time that
+        candle (or a later one) is seen for ``(symbol, timeframe)``, however
+        often the analysis is recomputed for it.
+        """
+        if candle_time is not None:
+            key = (symbol, timeframe)
+            with self._lock:
+                last = self._last_candles.get(key)
+                if last is not None and candle_time <= last:
+                    self.skipped += 1
+                    return
+                self._last_candles[key] = candle_time
+        records = []
+        for signal in signals:
+            row = _signal_row(signal)
+            if candle_time is not None:
+                row.update(symbol=symbol, timeframe=timeframe, candle_time=candle_time)
+            records.append(('signal', None, row))
+        self._record(records)
+
+    def record_trade(self, trade):
+        """Queue a new trade, or an update of an existing one when ``trade`` has an ``id``."""
+        row = {c: trade[c] for c in TRADE_COLUMNS if c in trade}
+        self._record([('trade', trade.get('id'), row)])
+
+    def _record(self, records):
+        if not records:
+            return
+        with self._lock:
+            self._journal.write(b''.join(dumps(_to_journal(record)).encode() + b'\n' for record in records))
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._buffer.extend(records)
+            self.recorded += len(records)
+            due = len(self._buffer) >= self.max_batch and not self._flushing
+        if due and self._spawn is not None:
+            self._spawn(self.flush)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of records committed."""
+        with self._lock:
+            if self._flushing or not self._buffer:
+                return 0
+            self._flushing = True
+            batch, self._buffer = self._buffer, []
+            self._journal.close()
+            self._pending_segments.append(self._journal_path)
+            self._open_segment()
+            sealed = list(self._pending_segments)
+
+        try:
+            self._write(batch)
+        except Exception as e:
+            print(f"Error flushing signal writer: {e}")
+            with self._lock:
+                # retried with the next flush; the sealed segments stay until then
+                self._buffer[:0] = batch
+                self._flushing = False
+                self.failures += 1
+            return 0
+
+        with self._lock:
+            self._pending_segments = [path for path in self._pending_segments if path not in sealed]
+            self._flushing = False
+            self.flushed += len(batch)
+            self.flushes += 1
+        for path in sealed:
+            os.remove(path)
+        return len(batch)
+
+    def _write(self, batch):
+        signals = [row for kind, _, row in batch if kind == 'signal']
+        new_trades = [row for kind, trade_id, row in batch if kind == 'trade' and trade_id is None]
+        updates = {}
+        for kind, trade_id, row in batch:
+            if kind == 'trade' and trade_id is not None:
+                updates.setdefault(frozenset(row), []).append(dict(row, _id=trade_id))
+
+        # executemany needs the same columns in every row, hence the grouping
+        with self.engine.begin() as conn:
+            for rows in _by_columns(signals):
+                conn.execute(self._signal_insert(), rows)
+            for rows in _by_columns(new_trades):
+                conn.execute(insert(self.trades), rows)
+            statement = update(self.trades).where(self.trades.c.id == bindparam('_id'))
+            for rows in updates.values():
+                conn.execute(statement, rows)
+
+    def _signal_insert(self):
+        dialect = self.engine.dialect.name
+        if dialect in ('mysql', 'mariadb'):
+            return insert(self.signals).prefix_with('IGNORE')
+        if dialect in ('postgresql', 'sqlite'):
+            insert_ = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            return insert_(self.signals).on_conflict_do_nothing()
+        return insert(self.signals)
+
+    def start(self, spawn, sleep):
+        """Run the periodic flush with the given task spawner and sleep, e.g. ``socketio``'s."""
+        self._spawn = spawn
+        if self._task is None:
+            self._task = spawn(self._run, sleep)
+
+    def _run(self, sleep):
+        while True:
+            sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self._journal.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'buffered': len(self._buffer),
+                'recorded': self.recorded,
+                'skipped': self.skipped,
+                'flushed': self.flushed,
+                'flushes': self.flushes,
+                'failures': self.failures,
+                'journal': self.directory,
+            }
+
+
+def _signal_row(signal):
+    row = {c: signal[c] for c in SIGNAL_COLUMNS if c in signal}
+    if isinstance(row.get('timestamp'), str):
+        row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+    row['contributors'] = dumps(signal.get('contributors', []))
+    if 'prediction' in signal:
+        row['prediction'] = dumps(signal['prediction'])
+    for column in ('confidence', 'entry_price', 'stop_loss', 'take_profit', 'risk_reward'):
+        if row.get(column) is not None:
+            row[column] = float(row[column])
+    return row
+
+
+def _to_journal(record):
+    kind, trade_id, row = record
+    return {'kind': kind, 'id': trade_id, 'row': row}
+
+
+def _from_journal(entry):
+    row = entry['row']
+    for column in DATETIME_COLUMNS:
+        if isinstance(row.get(column), str):
+            row[column] = datetime.fromisoformat(row[column])
+    return entry['kind'], entry['id'], row
+
+
+def _by_columns(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    return groups.values()
+
+
+def _segment_number(path):
+    return int(os.path.basename(path).split('-')[1].split('.')[0])
+
+
+def _claim_directory(root):
+    os.makedirs(root, exist_ok=True)
+    if fcntl is None:
+        return root, None
+    slot = 0
+    while True:
+        directory = os.path.join(root, f"writer-{slot}")
+        os.makedirs(directory, exist_ok=True)
+        lock = open(os.path.join(directory, '.lock'), 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            slot += 1
+            continue
+        return directory, lock
@@ -1,18 +1,22 @@
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime
+from analysis_context import AnalysisContext
 
 class SMCAnalyzer:
-    def analyze(self, df):
+    def analyze(self, df, context=None):
         if len(df) < 20:
             return {}
         
+        context = context or AnalysisContext(df)
+        
         result = {
-            'order_blocks': self.detect_order_blocks(df),
+            'order_blocks': self.detect_order_blocks(df, context),
             'fvgs': self.detect_fair_value_gaps(df),
-            'liquidity_zones': self.detect_liquidity_zones(df),
+            'liquidity_zones': self.detect_liquidity_zones(df, context),
             'supply_demand': self.detect_supply_demand_zones(df),
-            'breaker_blocks': self.detect_breaker_blocks(df),
+            'breaker_blocks': self.detect_breaker_blocks(df, context),
             'liquidity_sweep': self.detect_liquidity_sweep(df),
             'displacement': self.detect_displacement(df),
             'session_analysis': self.analyze_sessions(df)
@@ -20,61 +24,83 @@ class SMCAnalyzer:
         
         return result
     
-    def detect_order_blocks(self, df):
+    @staticmethod
+    def order_block_flags(opens, closes):
+        """Per-bar bullish/bearish order block flags, plus whether the impulse that
+        follows is strong (more than twice the average body)."""
+        n = len(closes)
+        bull = np.zeros(n, dtype=bool)
+        bear = np.zeros(n, dtype=bool)
+        strong = np.zeros(n, dtype=bool)
+        if n < 3:
+            return bull, bear, strong
+        body = np.abs(closes - opens)
+        curr = slice(1, n - 1)
+        nxt = slice(2, n)
+        prv = slice(0, n - 2)
+        avg_body = (body[curr] + body[prv]) / 2
+        impulse = body[nxt] > 1.5 * avg_body
+        bull[curr] = impulse & (closes[nxt] > opens[nxt]) & (closes[curr] < opens[curr])
+        bear[curr] = impulse & (closes[nxt] < opens[nxt]) & (closes[curr] > opens[curr])
+        strong[curr] = body[nxt] > 2 * avg_body
+        return bull, bear, strong
+    
+    @staticmethod
+    def fair_value_gap_flags(highs, lows):
+        n = len(highs)
+        bull = np.zeros(n, dtype=bool)
+        bear = np.zeros(n, dtype=bool)
+        bull[1:] = lows[1:] > highs[:-1]
+        bear[1:] = highs[1:] < lows[:-1]
+        return bull, bear
+    
+    def detect_order_blocks(self, df, context=None):
+        if context is not None and context.order_blocks is not None:
+            return context.order_blocks
+        
         order_blocks = []
         
         if len(df) < 10:
             return order_blocks
         
-        for i in range(3, len(df) - 1):
-            curr_close = float(df['close'].iloc[i])
-            curr_open = float(df['open'].iloc[i])
-            curr_high = float(df['high'].iloc[i])
-            curr_low = float(df['low'].iloc[i])
-            
-            next_close = float(df['close'].iloc[i + 1]) if i + 1 < len(df) else curr_close
-            next_open = float(df['open'].iloc[i + 1]) if i + 1 < len(df) else curr_open
-            next_high = float(df['high'].iloc[i + 1]) if i + 1 < len(df) else curr_high
-            next_low = float(df['low'].iloc[i + 1]) if i + 1 < len(df) else curr_low
-            
-            prev_close = float(df['close'].iloc[i - 1])
-            prev_open = float(df['open'].iloc[i - 1])
-            
-            curr_body = abs(curr_close - curr_open)
-            next_body = abs(next_close - next_open)
-            prev_body = abs(prev_close - prev_open)
-            
-            avg_body = (curr_body + prev_body) / 2
-            
-            if next_body > 1.5 * avg_body and next_close > next_open:
-                if curr_close < curr_open:
-                    order_blocks.append({
-                        'type': 'bullish',
-                        'index': i,
-                        'price': float(curr_low),
-                        'high': float(curr_high),
-                        'low': float(curr_low),
-                        'timestamp': str(df['timestamp'].iloc[i]),
-                        'strength': 'strong' if next_body > 2 * avg_body else 'moderate',
-                        'status': 'fresh',
-                        'description': 'Bullish Order Block - institutional buying zone'
-                    })
-            
-            if next_body > 1.5 * avg_body and next_close < next_open:
-                if curr_close > curr_open:
-                    order_blocks.append({
-                        'type': 'bearish',
-                        'index': i,
-                        'price': float(curr_high),
-                        'high': float(curr_high),
-                        'low': float(curr_low),
-                        'timestamp': str(df['timestamp'].iloc[i]),
-                        'strength': 'strong' if next_body > 2 * avg_body else 'moderate',
-                        'status': 'fresh',
-                        'description': 'Bearish Order Block - institutional selling zone'
-                    })
-        
-        return order_blocks[-10:] if order_blocks else []
+        opens = df['open'].to_numpy(dtype=float)
+        highs = df['high'].to_numpy(dtype=float)
+        lows = df['low'].to_numpy(dtype=float)
+        closes = df['close'].to_numpy(dtype=float)
+        
+        bull, bear, strong = self.order_block_flags(opens, closes)
+        bull[:3] = False
+        bear[:3] = False
+        
+        for i in np.flatnonzero(bull | bear)[-10:].tolist():
+            if bull[i]:
+                order_blocks.append({
+                    'type': 'bullish',
+                    'index': i,
+                    'price': float(lows[i]),
+                    'high': float(highs[i]),
+                    'low': float(lows[i]),
+                    'timestamp': str(df['timestamp'].iloc[i]),
+                    'strength': 'strong' if strong[i] else 'moderate',
+                    'status': 'fresh',
+                    'description': 'Bullish Order Block - institutional buying zone'
+                })
+            else:
+                order_blocks.append({
+                    'type': 'bearish',
+                    'index': i,
+                    'price': float(highs[i]),
+                    'high': float(highs[i]),
+                    'low': float(lows[i]),
+                    'timestamp': str(df['timestamp'].iloc[i]),
+                    'strength': 'strong' if strong[i] else 'moderate',
+                    'status': 'fresh',
+                    'description': 'Bearish Order Block - institutional selling zone'
+                })
+        
+        if context is not None:
+            context.order_blocks = order_blocks
+        return order_blocks
     
     def detect_fair_value_gaps(self, df):
         fvgs = []
@@ -82,84 +108,85 @@ class SMCAnalyzer:
         if len(df) < 5:
             return fvgs
         
-        for i in range(1, len(df) - 1):
-            prev_high = float(df['high'].iloc[i - 1])
-            prev_low = float(df['low'].iloc[i - 1])
-            curr_high = float(df['high'].iloc[i])
-            curr_low = float(df['low'].iloc[i])
-            next_high = float(df['high'].iloc[i + 1])
-            next_low = float(df['low'].iloc[i + 1])
+        highs = df['high'].to_numpy(dtype=float)
+        lows = df['low'].to_numpy(dtype=float)
+        
+        bull, bear = self.fair_value_gap_flags(highs, lows)
+        bull[-1] = False
+        bear[-1] = False
+        
+        # every flagged bar yields at least one gap, so the last 10 bars cover the last 10 gaps
+        for i in np.flatnonzero(bull | bear)[-10:].tolist():
+            prev_high = float(highs[i - 1])
+            prev_low = float(lows[i - 1])
+            curr_high = float(highs[i])
+            curr_low = float(lows[i])
             
-            if curr_low > prev_high:
-                gap_size = curr_low - prev_high
+            if bull[i]:
                 fvgs.append({
                     'type': 'bullish',
                     'index': i,
-                    'gap_top': float(curr_low),
-                    'gap_bottom': float(prev_high),
-                    'gap_size': gap_size,
+                    'gap_top': curr_low,
+                    'gap_bottom': prev_high,
+                    'gap_size': curr_low - prev_high,
                     'timestamp': str(df['timestamp'].iloc[i]),
-                    'filled': next_low <= prev_high,
+                    'filled': bool(lows[i + 1] <= prev_high),
                     'description': f'Bullish FVG - gap zone {prev_high:.5f} to {curr_low:.5f}'
                 })
             
-            if curr_high < prev_low:
-                gap_size = prev_low - curr_high
+            if bear[i]:
                 fvgs.append({
                     'type': 'bearish',
                     'index': i,
-                    'gap_top': float(prev_low),
-                    'gap_bottom': float(curr_high),
-                    'gap_size': gap_size,
+                    'gap_top': prev_low,
+                    'gap_bottom': curr_high,
+                    'gap_size': prev_low - curr_high,
                     'timestamp': str(df['timestamp'].iloc[i]),
-                    'filled': next_high >= prev_low,
+                    'filled': bool(highs[i + 1] >= prev_low),
                     'description': f'Bearish FVG - gap zone {curr_high:.5f} to {prev_low:.5f}'
                 })
         
-        return fvgs[-10:] if fvgs else []
+        return fvgs[-10:]
     
-    def detect_liquidity_zones(self, df):
+    def detect_liquidity_zones(self, df, context=None):
         zones = []
         
         if len(df) < 20:
             return zones
         
-        highs = df['high'].values
-        lows = df['low'].values
-        
-        swing_highs = []
-        swing_lows = []
+        context = context or AnalysisContext(df)
+        highs = context.highs
+        lows = context.lows
         lookback = 5
         
-        for i in range(lookback, len(df) - lookback):
-            if highs[i] == max(highs[i-lookback:i+lookback+1]):
-                swing_highs.append({'index': i, 'price': float(highs[i])})
-            if lows[i] == min(lows[i-lookback:i+lookback+1]):
-                swing_lows.append({'index': i, 'price': float(lows[i])})
+        swing_highs = context.swing_highs(lookback, lookback)
+        swing_lows = context.swing_lows(lookback, lookback)
         
-        for sh in swing_highs[-5:]:
+        for i in swing_highs[-5:].tolist():
+            price = float(highs[i])
             zones.append({
                 'type': 'sell_side_liquidity',
-                'level': sh['price'],
-                'index': sh['index'],
-                'timestamp': str(df['timestamp'].iloc[sh['index']]),
-                'description': f'Sell-side liquidity above {sh["price"]:.5f} - stops resting above'
+                'level': price,
+                'index': i,
+                'timestamp': str(df['timestamp'].iloc[i]),
+                'description': f'Sell-side liquidity above {price:.5f} - stops resting above'
             })
         
-        for sl in swing_lows[-5:]:
+        for i in swing_lows[-5:].tolist():
+            price = float(lows[i])
             zones.append({
                 'type': 'buy_side_liquidity',
-                'level': sl['price'],
-                'index': sl['index'],
-                'timestamp': str(df['timestamp'].iloc[sl['index']]),
-                'description': f'Buy-side liquidity below {sl["price"]:.5f} - stops resting below'
+                'level': price,
+                'index': i,
+                'timestamp': str(df['timestamp'].iloc[i]),
+                'description': f'Buy-side liquidity below {price:.5f} - stops resting below'
             })
         
         closes = df['close'].values
-        price_range = max(closes) - min(closes)
+        price_range = closes.max() - closes.min()
         
         round_levels = []
-        base_price = min(closes)
+        base_price = closes.min()
         increment = price_range / 10
         
         for i in range(11):
@@ -181,44 +208,59 @@ class SMCAnalyzer:
         if len(df) < 20:
             return zones
         
-        for i in range(10, len(df) - 3):
-            window = df.iloc[i-5:i+1]
-            
-            consolidation_range = window['high'].max() - window['low'].min()
-            avg_body = abs(window['close'] - window['open']).mean()
-            
-            if consolidation_range < avg_body * 3:
-                next_move = float(df['close'].iloc[i+3]) - float(df['close'].iloc[i])
-                
-                if next_move > consolidation_range * 1.5:
-                    zones.append({
-                        'type': 'demand',
-                        'zone_high': float(window['high'].max()),
-                        'zone_low': float(window['low'].min()),
-                        'index': i,
-                        'timestamp': str(df['timestamp'].iloc[i]),
-                        'strength': 'strong' if next_move > consolidation_range * 2 else 'moderate',
-                        'status': 'fresh',
-                        'description': 'Demand Zone - accumulation area before rally'
-                    })
-                
-                elif next_move < -consolidation_range * 1.5:
-                    zones.append({
-                        'type': 'supply',
-                        'zone_high': float(window['high'].max()),
-                        'zone_low': float(window['low'].min()),
-                        'index': i,
-                        'timestamp': str(df['timestamp'].iloc[i]),
-                        'strength': 'strong' if next_move < -consolidation_range * 2 else 'moderate',
-                        'status': 'fresh',
-                        'description': 'Supply Zone - distribution area before drop'
-                    })
-        
-        return zones[-10:] if zones else []
+        opens = df['open'].to_numpy(dtype=float)
+        highs = df['high'].to_numpy(dtype=float)
+        lows = df['low'].to_numpy(dtype=float)
+        closes = df['close'].to_numpy(dtype=float)
+        
+        # window i covers bars i-5..i for i in 10..len-4
+        width = 6
+        bars = np.arange(10, len(df) - 3)
+        zone_high = sliding_window_view(highs, width).max(axis=1)[bars - 5]
+        zone_low = sliding_window_view(lows, width).min(axis=1)[bars - 5]
+        consolidation_range = zone_high - zone_low
+        
+        body = np.abs(closes - opens)
+        body_sum = body[bars - 5]
+        for k in range(4, -1, -1):
+            body_sum = body_sum + body[bars - k]
+        avg_body = body_sum / width
+        
+        next_move = closes[bars + 3] - closes[bars]
+        consolidating = consolidation_range < avg_body * 3
+        demand = consolidating & (next_move > consolidation_range * 1.5)
+        supply = consolidating & ~demand & (next_move < -consolidation_range * 1.5)
+        
+        for k in np.flatnonzero(demand | supply)[-10:].tolist():
+            i = int(bars[k])
+            if demand[k]:
+                zones.append({
+                    'type': 'demand',
+                    'zone_high': float(zone_high[k]),
+                    'zone_low': float(zone_low[k]),
+                    'index': i,
+                    'timestamp': str(df['timestamp'].iloc[i]),
+                    'strength': 'strong' if next_move[k] > consolidation_range[k] * 2 else 'moderate',
+                    'status': 'fresh',
+                    'description': 'Demand Zone - accumulation area before rally'
+                })
+            else:
+                zones.append({
+                    'type': 'supply',
+                    'zone_high': float(zone_high[k]),
+                    'zone_low': float(zone_low[k]),
+                    'index': i,
+                    'timestamp': str(df['timestamp'].iloc[i]),
+                    'strength': 'strong' if next_move[k] < -consolidation_range[k] * 2 else 'moderate',
+                    'status': 'fresh',
+                    'description': 'Supply Zone - distribution area before drop'
+                })
+        
+        return zones
     
-    def detect_breaker_blocks(self, df):
+    def detect_breaker_blocks(self, df, context=None):
         breakers = []
-        order_blocks = self.detect_order_blocks(df)
+        order_blocks = self.detect_order_blocks(df, context)
         
         current_price = float(df['close'].iloc[-1])
         
@@ -8,7 +8,7 @@ document.addEventListener('DOMContentLoaded', function() {
     socket.on('connect', function() {
         document.querySelector('.status-dot').classList.add('connected');
         document.querySelector('.status-text').textContent = 'Connected';
-        socket.emit('subscribe', { symbol: currentSymbol });
+        socket.emit('subscribe', { symbol: currentSymbol, timeframe: currentTimeframe });
     });
 
     socket.on('disconnect', function() {
@@ -16,10 +16,68 @@ document.addEventListener('DOMContentLoaded', function() {
         document.querySelector('.status-text').textContent = 'Disconnected';
     });
 
+    // pushed by the server for the subscribed symbol/timeframe whenever a candle closes
+    socket.on('market_update', function(data) {
+        if (data.symbol !== currentSymbol || data.timeframe !== currentTimeframe) return;
+        updateChart(data.candles);
+        updatePriceDisplay(data.candles);
+    });
+
     socket.on('analysis_update', function(data) {
         updateAnalysis(data);
     });
 
+    // pushed analysis arrives as a full snapshot or as the changes since the
+    // version we last acknowledged; a delta we cannot apply asks for a snapshot
+    let pushedAnalysis = null;
+    let pushedVersion = 0;
+
+    function decodeAnalysisMessage(payload) {
+        return typeof payload === 'string' ? JSON.parse(payload) : payload;
+    }
+
+    function applyAnalysisOps(doc, ops) {
+        ops.forEach(([op, path, value]) => {
+            let target = doc;
+            for (let i = 0; i < path.length - 1; i++) {
+                if (typeof target[path[i]] !== 'object' || target[path[i]] === null) target[path[i]] = {};
+                target = target[path[i]];
+            }
+            const key = path[path.length - 1];
+            if (op === 'd') {
+                delete target[key];
+            } else {
+                target[key] = value;
+            }
+        });
+    }
+
+    socket.on('analysis_snapshot', function(payload) {
+        const message = decodeAnalysisMessage(payload);
+        if (message.symbol !== currentSymbol || message.timeframe !== currentTimeframe) return;
+        pushedAnalysis = message.analysis;
+        pushedVersion = message.version;
+        updateAnalysis({ analysis: pushedAnalysis });
+        socket.emit('analysis_ack', { version: pushedVersion });
+    });
+
+    socket.on('analysis_delta', function(payload) {
+        const message = decodeAnalysisMessage(payload);
+        if (message.symbol !== currentSymbol || message.timeframe !== currentTimeframe) return;
+        if (!pushedAnalysis || message.base !== pushedVersion) {
+            socket.emit('analysis_resync');
+            return;
+        }
+        applyAnalysisOps(pushedAnalysis, message.ops);
+        pushedVersion = message.version;
+        updateAnalysis({ analysis: pushedAnalysis });
+        socket.emit('analysis_ack', { version: pushedVersion });
+    });
+
+    socket.on('server_busy', function(data) {
+        console.warn(`Server busy, ${data.event} for ${data.symbol} was not run:`, data.error);
+    });
+
     socket.on('live_narration', function(data) {
         updateNarration(data);
     });
@@ -34,7 +92,7 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('symbolSelect').addEventListener('change', function() {
         currentSymbol = this.value;
         document.getElementById('chartSymbol').textContent = currentSymbol;
-        socket.emit('subscribe', { symbol: currentSymbol });
+        socket.emit('subscribe', { symbol: currentSymbol, timeframe: currentTimeframe });
         loadMarketData();
     });
 
@@ -45,6 +103,7 @@ document.addEventListener('DOMContentLoaded', function() {
             currentTimeframe = this.dataset.tf;
             const tfNames = { '1m': '1 Minute', '5m': '5 Minutes', '15m': '15 Minutes', '1h': '1 Hour', '4h': '4 Hours', '1d': '1 Day' };
             document.getElementById('chartTimeframe').textContent = tfNames[currentTimeframe] || currentTimeframe;
+            socket.emit('subscribe', { symbol: currentSymbol, timeframe: currentTimeframe });
             loadMarketData();
         });
     });
@@ -534,6 +593,4 @@ document.addEventListener('DOMContentLoaded', function() {
 
     initChart();
     loadMarketData();
-    
-    setInterval(loadMarketData, 60000);
 });
@@ -0,0 +1,678 @@
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+
+def _div(a, b):
+    # IEEE division (x/0 -> +-inf, 0/0 -> nan) to mirror the pandas batch path
+    if b == 0:
+        if a != a or a == 0:
+            return float('nan')
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _nan_or(value, default):
+    return default if value != value else value
+
+
+class _RollingMean:
+    """Fixed-window mean with the same compensated add/remove updates as pandas' roll_mean."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = float('nan')
+        self.value = float('nan')
+
+    def update(self, val):
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.comp_remove
+                t = self.sum_x + y
+                self.comp_remove = t - self.sum_x - y
+                self.sum_x = t
+                if math.copysign(1.0, old) < 0:
+                    self.neg_ct -= 1
+
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp_add
+            t = self.sum_x + y
+            self.comp_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.same_count += 1
+            else:
+                self.same_count = 1
+            self.prev_value = val
+
+        if self.nobs >= self.window:
+            result = self.sum_x / self.nobs
+            if self.same_count >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            self.value = result
+        else:
+            self.value = float('nan')
+        return self.value
+
+
+class _RollingStd:
+    """Fixed-window sample standard deviation using pandas' online (Welford) roll_var updates."""
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = float('nan')
+        self.value = float('nan')
+
+    def update(self, val):
+        self.values.append(val)
+        if val == val:
+            if val == self.prev_value:
+                self.same_count += 1
+            else:
+                self.same_count = 1
+            self.prev_value = val
+            self.nobs += 1
+            prev_mean = self.mean_x - self.comp_add
+            y = val - self.comp_add
+            t = y - self.mean_x
+            self.comp_add = t + self.mean_x - y
+            self.mean_x += t / self.nobs
+            self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                if self.nobs:
+                    prev_mean = self.mean_x - self.comp_remove
+                    y = old - self.comp_remove
+                    t = y - self.mean_x
+                    self.comp_remove = t + self.mean_x - y
+                    self.mean_x -= t / self.nobs
+                    self.ssqdm_x -= (old - prev_mean) * (old - self.mean_x)
+                else:
+                    self.mean_x = 0.0
+                    self.ssqdm_x = 0.0
+
+        if self.nobs >= self.window and self.nobs > self.ddof:
+            if self.nobs == 1 or self.same_count >= self.nobs:
+                variance = 0.0
+            else:
+                variance = self.ssqdm_x / (self.nobs - self.ddof)
+            self.value = math.sqrt(variance) if variance > 0 else 0.0
+        else:
+            self.value = float('nan')
+        return self.value
+
+
+class _RollingExtreme:
+    """Fixed-window max (or min) backed by a monotonic deque of (index, value)."""
+
+    def __init__(self, window, mode='max'):
+        self.window = window
+        self.is_max = mode == 'max'
+        self.queue = deque()
+        self.count = 0
+        self.value = float('nan')
+
+    def update(self, val):
+        index = self.count
+        self.count += 1
+        if val == val:
+            if self.is_max:
+                while self.queue and self.queue[-1][1] <= val:
+                    self.queue.pop()
+            else:
+                while self.queue and self.queue[-1][1] >= val:
+                    self.queue.pop()
+            self.queue.append((index, val))
+        while self.queue and self.queue[0][0] <= index - self.window:
+            self.queue.popleft()
+
+        if self.count >= self.window and self.queue:
+            self.value = self.queue[0][1]
+        else:
+            self.value = float('nan')
+        return self.value
+
+
+class _EMA:
+    """Exponential moving average matching ``Series.ewm(span=..., adjust=False).mean()``."""
+
+    def __init__(self, span):
+        alpha = 2.0 / (span + 1.0)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = alpha
+        self.value = float('nan')
+
+    def update(self, cur):
+        weighted = self.value
+        if weighted == weighted:
+            if cur == cur:
+                old_wt = self.old_wt_factor
+                if weighted != cur:
+                    weighted = old_wt * weighted + self.new_wt * cur
+                    weighted /= (old_wt + self.new_wt)
+        elif cur == cur:
+            weighted = cur
+        self.value = weighted
+        return weighted
+
+
+class StreamingIndicators:
+    """Incremental counterpart of ``TechnicalIndicators.calculate_all``.
+
+    Every indicator keeps O(1) state per bar (EMA accumulators, compensated rolling
+    sums, monotonic deques for rolling extremes), so feeding one new candle with
+    ``update`` and reading ``snapshot`` costs the same regardless of history length.
+    The snapshot mirrors the batch output for the same candle history.
+    """
+
+    EMA_PERIODS = [9, 21, 50, 100, 200]
+    SMA_PERIODS = [10, 20, 50, 100, 200]
+
+    def __init__(self, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9,
+                 bb_period=20, bb_std=2, atr_period=14, adx_period=14,
+                 stoch_k=14, stoch_d=3, momentum_period=10, williams_period=14, cci_period=20):
+        self.rsi_period = rsi_period
+        self.macd_slow = macd_slow
+        self.macd_signal_period = macd_signal
+        self.bb_period = bb_period
+        self.bb_std = bb_std
+        self.atr_period = atr_period
+        self.adx_period = adx_period
+        self.stoch_k_period = stoch_k
+        self.momentum_period = momentum_period
+        self.williams_period = williams_period
+        self.cci_period = cci_period
+
+        self.count = 0
+        self.prev_close = float('nan')
+        self.prev_high = float('nan')
+        self.prev_low = float('nan')
+        self.last = None
+        self.closes = deque(maxlen=max(momentum_period + 1, 10))
+
+        self.rsi_gain = _RollingMean(rsi_period)
+        self.rsi_loss = _RollingMean(rsi_period)
+        self.rsi_history = deque(maxlen=10)
+
+        self.ema_fast = _EMA(macd_fast)
+        self.ema_slow = _EMA(macd_slow)
+        self.macd_signal_ema = _EMA(macd_signal)
+        self.macd_history = deque(maxlen=2)
+
+        self.bb_mean = _RollingMean(bb_period)
+        self.bb_stddev = _RollingStd(bb_period)
+
+        self.atr_mean = _RollingMean(atr_period)
+
+        self.adx_tr = _RollingMean(adx_period)
+        self.adx_plus = _RollingMean(adx_period)
+        self.adx_minus = _RollingMean(adx_period)
+        self.adx_dx = _RollingMean(adx_period)
+        self.adx_plus_di = float('nan')
+        self.adx_minus_di = float('nan')
+
+        self.stoch_low = _RollingExtreme(stoch_k, 'min')
+        self.stoch_high = _RollingExtreme(stoch_k, 'max')
+        self.stoch_d = _RollingMean(stoch_d)
+        self.stoch_k_value = float('nan')
+
+        self.emas = {period: _EMA(period) for period in self.EMA_PERIODS}
+        self.smas = {period: _RollingMean(period) for period in self.SMA_PERIODS}
+
+        self.obv = 0.0
+        self.obv_mean = _RollingMean(10)
+
+        self.vwap_pv = 0.0
+        self.vwap_volume = 0.0
+
+        self.williams_high = _RollingExtreme(williams_period, 'max')
+        self.williams_low = _RollingExtreme(williams_period, 'min')
+
+        self.cci_mean = _RollingMean(cci_period)
+        self.cci_window = deque(maxlen=cci_period)
+
+    @classmethod
+    def from_dataframe(cls, df, **kwargs):
+        stream = cls(**kwargs)
+        stream.extend(df)
+        return stream
+
+    def extend(self, df):
+        opens = df['open'].to_numpy(dtype=float)
+        highs = df['high'].to_numpy(dtype=float)
+        lows = df['low'].to_numpy(dtype=float)
+        closes = df['close'].to_numpy(dtype=float)
+        volumes = df['volume'].to_numpy(dtype=float) if 'volume' in df.columns else np.zeros(len(df))
+        for o, h, l, c, v in zip(opens.tolist(), highs.tolist(), lows.tolist(), closes.tolist(), volumes.tolist()):
+            self._update(o, h, l, c, v)
+        return self
+
+    def update(self, candle):
+        self._update(float(candle['open']), float(candle['high']), float(candle['low']),
+                     float(candle['close']), float(candle.get('volume', 0)))
+        return self.snapshot()
+
+    def _update(self, o, h, l, c, v):
+        first = self.count == 0
+        prev_close = self.prev_close
+
+        delta = c - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        self.rsi_gain.update(gain)
+        self.rsi_loss.update(loss)
+        rs = _div(self.rsi_gain.value, math.inf if self.rsi_loss.value == 0 else self.rsi_loss.value)
+        self.rsi_history.append(100 - (100 / (1 + rs)))
+
+        macd_line = self.ema_fast.update(c) - self.ema_slow.update(c)
+        signal_line = self.macd_signal_ema.update(macd_line)
+        self.macd_history.append((macd_line, signal_line, macd_line - signal_line))
+
+        self.bb_mean.update(c)
+        self.bb_stddev.update(c)
+
+        tr = h - l
+        if not first:
+            tr = max(tr, abs(h - prev_close), abs(l - prev_close))
+        self.atr_mean.update(tr)
+
+        plus_dm = h - self.prev_high
+        minus_dm = abs(l - self.prev_low)
+        plus_dm = plus_dm if (plus_dm > minus_dm and plus_dm > 0) else 0.0
+        minus_dm = minus_dm if (minus_dm > plus_dm and minus_dm > 0) else 0.0
+        adx_atr = self.adx_tr.update(tr)
+        self.adx_plus_di = 100 * _div(self.adx_plus.update(plus_dm), adx_atr)
+        self.adx_minus_di = 100 * _div(self.adx_minus.update(minus_dm), adx_atr)
+        di_sum = self.adx_plus_di + self.adx_minus_di
+        dx = _div(100 * abs(self.adx_plus_di - self.adx_minus_di), math.inf if di_sum == 0 else di_sum)
+        self.adx_dx.update(dx)
+
+        low_min = self.stoch_low.update(l)
+        high_max = self.stoch_high.update(h)
+        self.stoch_k_value = 100 * _div(c - low_min, high_max - low_min)
+        self.stoch_d.update(self.stoch_k_value)
+
+        for ema in self.emas.values():
+            ema.update(c)
+        for sma in self.smas.values():
+            sma.update(c)
+
+        if not first:
+            if c > prev_close:
+                self.obv = self.obv + v
+            elif c < prev_close:
+                self.obv = self.obv - v
+        self.obv_mean.update(self.obv)
+
+        typical_price = (h + l + c) / 3
+        self.vwap_pv += typical_price * v
+        self.vwap_volume += v
+
+        self.williams_high.update(h)
+        self.williams_low.update(l)
+
+        self.cci_mean.update(typical_price)
+        self.cci_window.append(typical_price)
+
+        self.closes.append(c)
+        self.prev_close = c
+        self.prev_high = h
+        self.prev_low = l
+        self.last = (o, h, l, c, v)
+        self.count += 1
+
+    def snapshot(self):
+        if self.count < 20:
+            return {}
+
+        return {
+            'rsi': self._rsi(),
+            'macd': self._macd(),
+            'bollinger': self._bollinger(),
+            'atr': self._atr(),
+            'adx': self._adx(),
+            'stochastic': self._stochastic(),
+            'ema': self._ema_set(),
+            'sma': self._sma_set(),
+            'momentum': self._momentum(),
+            'obv': self._obv(),
+            'vwap': self._vwap(),
+            'williams_r': self._williams_r(),
+            'cci': self._cci(),
+        }
+
+    def _rsi(self):
+        if self.count < self.rsi_period + 1:
+            return {'value': 50, 'signal': 'neutral'}
+
+        current_rsi = _nan_or(self.rsi_history[-1], 50)
+
+        if current_rsi > 70:
+            signal = 'overbought'
+        elif current_rsi < 30:
+            signal = 'oversold'
+        else:
+            signal = 'neutral'
+
+        prev_rsi = _nan_or(self.rsi_history[-2], current_rsi)
+
+        divergence = None
+        if self.count >= 20:
+            if self.closes[-1] > self.closes[-10] and self.rsi_history[-1] < self.rsi_history[-10]:
+                divergence = 'bearish_divergence'
+            elif self.closes[-1] < self.closes[-10] and self.rsi_history[-1] > self.rsi_history[-10]:
+                divergence = 'bullish_divergence'
+
+        return {
+            'value': round(current_rsi, 2),
+            'prev_value': round(prev_rsi, 2),
+            'signal': signal,
+            'divergence': divergence
+        }
+
+    def _macd(self):
+        if self.count < self.macd_slow + self.macd_signal_period:
+            return {'value': 0, 'signal': 'neutral', 'histogram': 0}
+
+        current_macd, current_signal, current_hist = self.macd_history[-1]
+        prev_macd, prev_signal, prev_hist = self.macd_history[-2]
+
+        if current_macd > current_signal and prev_hist < current_hist:
+            macd_signal = 'bullish'
+        elif current_macd < current_signal and prev_hist > current_hist:
+            macd_signal = 'bearish'
+        else:
+            macd_signal = 'neutral'
+
+        crossover = None
+        if prev_macd < prev_signal and current_macd > current_signal:
+            crossover = 'bullish_crossover'
+        elif prev_macd > prev_signal and current_macd < current_signal:
+            crossover = 'bearish_crossover'
+
+        return {
+            'value': round(current_macd, 6),
+            'signal_line': round(current_signal, 6),
+            'histogram': round(current_hist, 6),
+            'signal': macd_signal,
+            'crossover': crossover
+        }
+
+    def _bollinger(self):
+        current_price = self.prev_close
+        if self.count < self.bb_period:
+            return {'upper': current_price, 'middle': current_price, 'lower': current_price, 'signal': 'neutral', 'width': 0}
+
+        middle_val = self.bb_mean.value
+        std = self.bb_stddev.value
+        upper_val = middle_val + (self.bb_std * std)
+        lower_val = middle_val - (self.bb_std * std)
+
+        bandwidth = (upper_val - lower_val) / middle_val * 100 if middle_val > 0 else 0
+
+        if current_price > upper_val:
+            signal = 'overbought'
+        elif current_price < lower_val:
+            signal = 'oversold'
+        else:
+            signal = 'neutral'
+
+        percent_b = (current_price - lower_val) / (upper_val - lower_val) * 100 if (upper_val - lower_val) > 0 else 50
+
+        return {
+            'upper': round(upper_val, 5),
+            'middle': round(middle_val, 5),
+            'lower': round(lower_val, 5),
+            'width': round(bandwidth, 2),
+            'percent_b': round(percent_b, 2),
+            'signal': signal
+        }
+
+    def _atr(self):
+        if self.count < self.atr_period + 1:
+            return {'value': 0, 'percent': 0}
+
+        current_atr = _nan_or(self.atr_mean.value, 0)
+        current_price = self.prev_close
+        atr_percent = (current_atr / current_price * 100) if current_price > 0 else 0
+
+        return {
+            'value': round(current_atr, 6),
+            'percent': round(atr_percent, 4)
+        }
+
+    def _adx(self):
+        if self.count < self.adx_period * 2:
+            return {'value': 25, 'plus_di': 25, 'minus_di': 25, 'trend_strength': 'weak'}
+
+        current_adx = _nan_or(self.adx_dx.value, 25)
+        current_plus_di = _nan_or(self.adx_plus_di, 25)
+        current_minus_di = _nan_or(self.adx_minus_di, 25)
+
+        if current_adx > 50:
+            trend_strength = 'very_strong'
+        elif current_adx > 25:
+            trend_strength = 'strong'
+        elif current_adx > 20:
+            trend_strength = 'moderate'
+        else:
+            trend_strength = 'weak'
+
+        return {
+            'value': round(current_adx, 2),
+            'plus_di': round(current_plus_di, 2),
+            'minus_di': round(current_minus_di, 2),
+            'trend_strength': trend_strength
+        }
+
+    def _stochastic(self):
+        if self.count < self.stoch_k_period:
+            return {'k': 50, 'd': 50, 'signal': 'neutral'}
+
+        current_k = _nan_or(self.stoch_k_value, 50)
+        current_d = _nan_or(self.stoch_d.value, 50)
+
+        if current_k > 80 and current_d > 80:
+            signal = 'overbought'
+        elif current_k < 20 and current_d < 20:
+            signal = 'oversold'
+        elif current_k > current_d:
+            signal = 'bullish'
+        elif current_k < current_d:
+            signal = 'bearish'
+        else:
+            signal = 'neutral'
+
+        return {
+            'k': round(current_k, 2),
+            'd': round(current_d, 2),
+            'signal': signal
+        }
+
+    def _ema_set(self):
+        result = {}
+        for period, ema in self.emas.items():
+            result[f'ema_{period}'] = round(ema.value, 5) if self.count >= period else None
+
+        if result.get('ema_50') and result.get('ema_200'):
+            if result['ema_50'] > result['ema_200']:
+                result['golden_cross'] = True
+                result['death_cross'] = False
+            else:
+                result['golden_cross'] = False
+                result['death_cross'] = True
+
+        return result
+
+    def _sma_set(self):
+        result = {}
+        for period, sma in self.smas.items():
+            result[f'sma_{period}'] = round(sma.value, 5) if self.count >= period else None
+        return result
+
+    def _momentum(self):
+        if self.count < self.momentum_period + 1:
+            return {'value': 0, 'signal': 'neutral'}
+
+        current_mom = _nan_or(self.closes[-1] - self.closes[-1 - self.momentum_period], 0)
+
+        if current_mom > 0:
+            signal = 'bullish'
+        elif current_mom < 0:
+            signal = 'bearish'
+        else:
+            signal = 'neutral'
+
+        return {
+            'value': round(current_mom, 6),
+            'signal': signal
+        }
+
+    def _obv(self):
+        current_obv = float(self.obv)
+
+        if self.count > 10:
+            trend = 'bullish' if current_obv > self.obv_mean.value else 'bearish'
+        else:
+            trend = 'neutral'
+
+        return {
+            'value': current_obv,
+            'trend': trend
+        }
+
+    def _vwap(self):
+        current_price = self.prev_close
+        current_vwap = _nan_or(_div(self.vwap_pv, self.vwap_volume), current_price)
+        signal = 'above_vwap' if current_price > current_vwap else 'below_vwap'
+
+        return {
+            'value': round(current_vwap, 5),
+            'signal': signal
+        }
+
+    def _williams_r(self):
+        if self.count < self.williams_period:
+            return {'value': -50, 'signal': 'neutral'}
+
+        highest_high = self.williams_high.value
+        lowest_low = self.williams_low.value
+        current_wr = _nan_or(_div(-100 * (highest_high - self.prev_close), highest_high - lowest_low), -50)
+
+        if current_wr > -20:
+            signal = 'overbought'
+        elif current_wr < -80:
+            signal = 'oversold'
+        else:
+            signal = 'neutral'
+
+        return {
+            'value': round(current_wr, 2),
+            'signal': signal
+        }
+
+    def _cci(self):
+        if self.count < self.cci_period:
+            return {'value': 0, 'signal': 'neutral'}
+
+        # mean deviation has no O(1) update; the window is fixed at cci_period values
+        window = np.fromiter(self.cci_window, dtype=float, count=len(self.cci_window))
+        mean_dev = np.abs(window - window.mean()).mean()
+        current_cci = _nan_or(_div(self.cci_window[-1] - self.cci_mean.value, 0.015 * mean_dev), 0)
+
+        if current_cci > 100:
+            signal = 'overbought'
+        elif current_cci < -100:
+            signal = 'oversold'
+        else:
+            signal = 'neutral'
+
+        return {
+            'value': round(float(current_cci), 2),
+            'signal': signal
+        }
+
+
+class IndicatorStreams:
+    """Keeps one ``StreamingIndicators`` per (symbol, timeframe) for live analysis.
+
+    Each stream remembers the first and last candle it was fed. ``snapshot``
+    feeds it only the candles after the last one, so a newly closed candle
+    costs O(1) instead of a ``calculate_all`` pass over the window. The result
+    is what ``calculate_all`` returns over every candle since the stream
+    started. The stream is rebuilt from ``candles`` when they no longer contain
+    its last candle unchanged, or reach back further than it does.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.updates = 0
+
+    def snapshot(self, symbol, timeframe, candles):
+        if not len(candles):
+            return {}
+        key = (symbol, timeframe)
+        stamps = candles.timestamp
+
+        with self._lock:
+            entry = self._entries.get(key)
+            stream = None
+            if entry is not None:
+                stream, first_stamp, last_stamp, last_close = entry
+                pos = int(np.searchsorted(stamps, last_stamp))
+                intact = pos < len(candles) and stamps[pos] == last_stamp and candles.close[pos] == last_close
+                if intact and stamps[0] >= first_stamp:
+                    stream.extend(candles[pos + 1:].to_dataframe())
+                    self.updates += 1
+                else:
+                    stream = None
+            if stream is None:
+                stream = StreamingIndicators.from_dataframe(candles.to_dataframe())
+                first_stamp = stamps[0]
+                self.rebuilds += 1
+            self._entries[key] = (stream, first_stamp, stamps[-1], candles.close[-1])
+            return stream.snapshot()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'series': len(self._entries),
+                'rebuilds': self.rebuilds,
+                'updates': self.updates,
+            }
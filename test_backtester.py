@@ -0,0 +1,21 @@
+import pytest
+
+from backtester import Backtester
+from market_data import MarketDataFetcher, REPLAY_EPOCH
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_vectorized_backtest_matches_walk_forward(seed):
+    symbol = 'EUR/USD'
+    fetcher = MarketDataFetcher(seed=seed, replay_at=REPLAY_EPOCH)
+    candles = fetcher.get_historical_data(symbol, '1h', 300)
+    backtester = Backtester(market_fetcher=fetcher)
+
+    vectorized = backtester.run_backtest(symbol, 'smc_ict', data=candles, vectorized=True)
+    walk_forward = backtester.run_backtest(symbol, 'smc_ict', data=candles, vectorized=False)
+
+    # the time each result was produced is the only field allowed to differ
+    vectorized.pop('timestamp')
+    walk_forward.pop('timestamp')
+    assert vectorized['total_trades'] > 0
+    assert vectorized == walk_forward
@@ -0,0 +1,42 @@
+from instrumentation import Metrics
+
+
+def samples(metrics):
+    return {key: stats['allocation_samples'] for key, stats in metrics.snapshot().items()}
+
+
+def test_allocations_are_recorded_for_a_span_running_alone():
+    metrics = Metrics()
+    with metrics.span('analyze') as span:
+        objects = [object() for _ in range(1000)]
+        span.mark('build')
+    stats = metrics.snapshot()
+    assert stats['analyze.build']['allocation_samples'] == 1
+    assert stats['analyze.build']['allocated_blocks'] >= len(objects)
+
+
+def test_allocations_are_skipped_while_spans_overlap():
+    metrics = Metrics()
+    first = metrics.span('first')
+    second = metrics.span('second')
+    first.mark('overlapping')
+    second.finish()
+    first.mark('after_second_finished')
+    first.mark('alone_again')
+    first.finish()
+    assert samples(metrics) == {
+        'first.overlapping': 0,
+        'second.total': 0,
+        'first.after_second_finished': 0,
+        'first.alone_again': 1,
+        'first.total': 0,
+    }
+    assert metrics.snapshot()['first.total']['count'] == 1
+
+
+def test_allocation_tracking_can_be_disabled():
+    metrics = Metrics(track_allocations=False)
+    with metrics.span('analyze') as span:
+        span.mark('build')
+    assert set(samples(metrics).values()) == {0}
+    assert 'allocated_blocks_count{operation="analyze",stage="build"} 0' in metrics.render()
@@ -0,0 +1,44 @@
+import pytest
+
+from market_data import MarketDataFetcher, REPLAY_EPOCH
+from pattern_detector import (PatternDetector, SINGLE_CANDLE_PATTERNS, DOUBLE_CANDLE_PATTERNS,
+                              TRIPLE_CANDLE_PATTERNS)
+
+# the bars each detector looks at, counted back from the last one, and the patterns it reports
+DETECTORS = [
+    ('detect_single_candle_patterns', 5, SINGLE_CANDLE_PATTERNS),
+    ('detect_double_candle_patterns', 4, DOUBLE_CANDLE_PATTERNS),
+    ('detect_triple_candle_patterns', 3, TRIPLE_CANDLE_PATTERNS),
+]
+
+
+def rows(patterns):
+    return sorted((p['index'], p['type'], p['direction'], p['strength'], p['price'], p['timestamp'])
+                  for p in patterns)
+
+
+@pytest.mark.parametrize('seed,symbol,timeframe', [(1, 'EUR/USD', '1h'), (2, 'XAU/USD', '5m'), (3, 'USD/JPY', '1d')])
+def test_scan_history_matches_detectors(seed, symbol, timeframe):
+    fetcher = MarketDataFetcher(seed=seed, replay_at=REPLAY_EPOCH)
+    df = fetcher.get_historical_data(symbol, timeframe, 400).to_dataframe()
+    detector = PatternDetector()
+    events = detector.scan_history(df)
+    assert set(events['type']) & set(TRIPLE_CANDLE_PATTERNS)
+
+    for end in range(10, len(df)):
+        window = df.iloc[:end + 1]
+        for method, bars, names in DETECTORS:
+            hits = events[(events.index > end - bars) & (events.index <= end) & events['type'].isin(names)]
+            expected = rows(getattr(detector, method)(window))
+            scanned = sorted(zip(hits.index.tolist(), hits['type'], hits['direction'], hits['strength'],
+                                 hits['price'].tolist(), [str(t) for t in hits['timestamp']]))
+            assert scanned == expected, (method, end)
+
+
+def test_scan_history_filters_patterns():
+    df = MarketDataFetcher(seed=1, replay_at=REPLAY_EPOCH).get_historical_data('EUR/USD', '1h', 400).to_dataframe()
+    detector = PatternDetector()
+    events = detector.scan_history(df)
+    only = detector.scan_history(df, patterns=['doji', 'bullish_engulfing'])
+    assert len(only)
+    assert only.equals(events[events['type'].isin(['doji', 'bullish_engulfing'])])
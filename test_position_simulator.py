@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from backtester import Backtester
+from market_data import MarketDataFetcher, REPLAY_EPOCH
+from position_simulator import (PositionSimulator, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT,
+                                EXIT_END_OF_BACKTEST)
+
+
+def resolve(highs, lows, entries, directions, stop_loss, take_profit, simulator=None):
+    simulator = simulator or PositionSimulator()
+    return simulator.resolve_exits(np.array(highs, dtype=float), np.array(lows, dtype=float),
+                                   np.array(entries, dtype=np.int64), np.array(directions, dtype=np.int8),
+                                   np.array(stop_loss, dtype=float), np.array(take_profit, dtype=float),
+                                   len(highs) - 1)
+
+
+def test_stop_loss_wins_when_both_levels_touch_the_same_bar():
+    highs = [1.01, 1.02, 1.30, 1.01]
+    lows = [0.99, 0.98, 0.80, 0.99]
+    exit_index, exit_reason = resolve(highs, lows, [0, 0], [1, -1], [0.9, 1.1], [1.2, 0.85])
+    assert exit_index.tolist() == [2, 2]
+    assert exit_reason.tolist() == [EXIT_STOP_LOSS, EXIT_STOP_LOSS]
+
+
+def test_entry_bar_counts_as_first_touch():
+    highs = [1.25, 1.01, 1.01]
+    lows = [0.99, 0.99, 0.99]
+    exit_index, exit_reason = resolve(highs, lows, [0, 1], [1, 1], [0.9, 0.9], [1.2, 1.2])
+    assert exit_index.tolist() == [0, -1]
+    assert exit_reason.tolist() == [EXIT_TAKE_PROFIT, EXIT_END_OF_BACKTEST]
+
+
+def test_exits_past_the_first_block_are_found():
+    highs = np.full(500, 1.01)
+    lows = np.full(500, 0.99)
+    highs[300] = 1.25
+    lows[450] = 0.85
+    simulator = PositionSimulator(initial_block=4, max_block=16, max_cells=32)
+    exit_index, exit_reason = resolve(highs, lows, [0, 301, 10], [1, 1, -1], [0.9, 0.9, 1.3], [1.2, 1.2, 0.7],
+                                      simulator)
+    assert exit_index.tolist() == [300, 450, -1]
+    assert exit_reason.tolist() == [EXIT_TAKE_PROFIT, EXIT_STOP_LOSS, EXIT_END_OF_BACKTEST]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_simulate_matches_per_bar_loop(seed):
+    # random entries, several per bar range and some never closed, through both
+    # the per-bar loop and the vectorized simulator
+    fetcher = MarketDataFetcher(seed=seed, replay_at=REPLAY_EPOCH)
+    df = fetcher.get_historical_data('EUR/USD', '1h', 600).to_dataframe()
+    backtester = Backtester(market_fetcher=fetcher)
+    rng = np.random.default_rng(seed)
+    first_bar, last_bar = backtester.lookback, len(df) - 11
+
+    entries = first_bar + np.flatnonzero(rng.random(last_bar - first_bar + 1) < 0.3)
+    directions = rng.choice(np.array([1, -1], dtype=np.int8), len(entries))
+    grades = rng.choice(np.array(['S', 'A', 'B'], dtype=object), len(entries))
+    atr = np.round(rng.uniform(0.0005, 0.01, len(entries)), 6)
+    signals = {int(i): ('long' if d == 1 else 'short', g, float(a))
+               for i, d, g, a in zip(entries, directions, grades, atr)}
+
+    trades, loop_equity = backtester._simulate(df, signals.get)
+    ledger, equity = backtester.position_simulator.simulate(
+        df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), entries, directions, grades, atr,
+        first_bar, last_bar, backtester.initial_capital, backtester.risk_per_trade, timestamps=df['timestamp'].array
+    )
+
+    reasons = {trade['exit_reason'] for trade in trades}
+    assert reasons == {'stop_loss', 'take_profit', 'end_of_backtest'}
+    assert ledger.to_records() == trades
+    assert equity == loop_equity
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_context import AnalysisContext
+from market_data import MarketDataFetcher, REPLAY_EPOCH
+from smc_analyzer import SMCAnalyzer
+
+
+# The per-bar loops the array kernels replaced, kept as the reference they must match
+
+def reference_order_blocks(df):
+    order_blocks = []
+    for i in range(3, len(df) - 1):
+        curr_open, curr_close = float(df['open'].iloc[i]), float(df['close'].iloc[i])
+        next_open, next_close = float(df['open'].iloc[i + 1]), float(df['close'].iloc[i + 1])
+        prev_open, prev_close = float(df['open'].iloc[i - 1]), float(df['close'].iloc[i - 1])
+        curr_high, curr_low = float(df['high'].iloc[i]), float(df['low'].iloc[i])
+
+        next_body = abs(next_close - next_open)
+        avg_body = (abs(curr_close - curr_open) + abs(prev_close - prev_open)) / 2
+        strength = 'strong' if next_body > 2 * avg_body else 'moderate'
+        timestamp = str(df['timestamp'].iloc[i])
+
+        if next_body > 1.5 * avg_body and next_close > next_open and curr_close < curr_open:
+            order_blocks.append({
+                'type': 'bullish', 'index': i, 'price': curr_low, 'high': curr_high, 'low': curr_low,
+                'timestamp': timestamp, 'strength': strength, 'status': 'fresh',
+                'description': 'Bullish Order Block - institutional buying zone'
+            })
+        if next_body > 1.5 * avg_body and next_close < next_open and curr_close > curr_open:
+            order_blocks.append({
+                'type': 'bearish', 'index': i, 'price': curr_high, 'high': curr_high, 'low': curr_low,
+                'timestamp': timestamp, 'strength': strength, 'status': 'fresh',
+                'description': 'Bearish Order Block - institutional selling zone'
+            })
+    return order_blocks[-10:]
+
+
+def reference_fair_value_gaps(df):
+    fvgs = []
+    for i in range(1, len(df) - 1):
+        prev_high, prev_low = float(df['high'].iloc[i - 1]), float(df['low'].iloc[i - 1])
+        curr_high, curr_low = float(df['high'].iloc[i]), float(df['low'].iloc[i])
+        next_high, next_low = float(df['high'].iloc[i + 1]), float(df['low'].iloc[i + 1])
+        timestamp = str(df['timestamp'].iloc[i])
+
+        if curr_low > prev_high:
+            fvgs.append({
+                'type': 'bullish', 'index': i, 'gap_top': curr_low, 'gap_bottom': prev_high,
+                'gap_size': curr_low - prev_high, 'timestamp': timestamp, 'filled': next_low <= prev_high,
+                'description': f'Bullish FVG - gap zone {prev_high:.5f} to {curr_low:.5f}'
+            })
+        if curr_high < prev_low:
+            fvgs.append({
+                'type': 'bearish', 'index': i, 'gap_top': prev_low, 'gap_bottom': curr_high,
+                'gap_size': prev_low - curr_high, 'timestamp': timestamp, 'filled': next_high >= prev_low,
+                'description': f'Bearish FVG - gap zone {curr_high:.5f} to {prev_low:.5f}'
+            })
+    return fvgs[-10:]
+
+
+def reference_liquidity_zones(df):
+    zones = []
+    highs = df['high'].values
+    lows = df['low'].values
+    lookback = 5
+
+    swing_highs, swing_lows = [], []
+    for i in range(lookback, len(df) - lookback):
+        if highs[i] == max(highs[i - lookback:i + lookback + 1]):
+            swing_highs.append(i)
+        if lows[i] == min(lows[i - lookback:i + lookback + 1]):
+            swing_lows.append(i)
+
+    for i in swing_highs[-5:]:
+        price = float(highs[i])
+        zones.append({
+            'type': 'sell_side_liquidity', 'level': price, 'index': i, 'timestamp': str(df['timestamp'].iloc[i]),
+            'description': f'Sell-side liquidity above {price:.5f} - stops resting above'
+        })
+    for i in swing_lows[-5:]:
+        price = float(lows[i])
+        zones.append({
+            'type': 'buy_side_liquidity', 'level': price, 'index': i, 'timestamp': str(df['timestamp'].iloc[i]),
+            'description': f'Buy-side liquidity below {price:.5f} - stops resting below'
+        })
+
+    closes = df['close'].values
+    base_price = min(closes)
+    increment = (max(closes) - min(closes)) / 10
+    round_levels = []
+    for i in range(11):
+        level = base_price + (i * increment)
+        rounded = round(level, 2 if level > 10 else 4)
+        if rounded not in round_levels:
+            round_levels.append(rounded)
+            zones.append({'type': 'psychological_level', 'level': rounded,
+                          'description': f'Psychological level at {rounded}'})
+    return zones
+
+
+def reference_supply_demand_zones(df):
+    zones = []
+    for i in range(10, len(df) - 3):
+        window = df.iloc[i - 5:i + 1]
+        zone_high = float(window['high'].max())
+        zone_low = float(window['low'].min())
+        consolidation_range = window['high'].max() - window['low'].min()
+        avg_body = abs(window['close'] - window['open']).mean()
+        if consolidation_range >= avg_body * 3:
+            continue
+
+        next_move = float(df['close'].iloc[i + 3]) - float(df['close'].iloc[i])
+        timestamp = str(df['timestamp'].iloc[i])
+        if next_move > consolidation_range * 1.5:
+            zones.append({
+                'type': 'demand', 'zone_high': zone_high, 'zone_low': zone_low, 'index': i, 'timestamp': timestamp,
+                'strength': 'strong' if next_move > consolidation_range * 2 else 'moderate', 'status': 'fresh',
+                'description': 'Demand Zone - accumulation area before rally'
+            })
+        elif next_move < -consolidation_range * 1.5:
+            zones.append({
+                'type': 'supply', 'zone_high': zone_high, 'zone_low': zone_low, 'index': i, 'timestamp': timestamp,
+                'strength': 'strong' if next_move < -consolidation_range * 2 else 'moderate', 'status': 'fresh',
+                'description': 'Supply Zone - distribution area before drop'
+            })
+    return zones[-10:]
+
+
+@pytest.fixture(params=[(1, 'EUR/USD', '1h', 500), (2, 'XAU/USD', '15m', 500), (3, 'USD/JPY', '4h', 300),
+                        (4, 'GBP/USD', '1m', 2000)])
+def df(request):
+    seed, symbol, timeframe, limit = request.param
+    fetcher = MarketDataFetcher(seed=seed, replay_at=REPLAY_EPOCH)
+    return fetcher.get_historical_data(symbol, timeframe, limit).to_dataframe()
+
+
+def test_order_blocks_match_reference(df):
+    smc = SMCAnalyzer()
+    expected = reference_order_blocks(df)
+    assert expected
+    assert smc.detect_order_blocks(df) == expected
+    assert smc.detect_order_blocks(df, AnalysisContext(df)) == expected
+
+
+def test_fair_value_gaps_match_reference(df):
+    expected = reference_fair_value_gaps(df)
+    assert SMCAnalyzer().detect_fair_value_gaps(df) == expected
+
+
+def test_liquidity_zones_match_reference(df):
+    smc = SMCAnalyzer()
+    expected = reference_liquidity_zones(df)
+    assert smc.detect_liquidity_zones(df) == expected
+    assert smc.detect_liquidity_zones(df, AnalysisContext(df)) == expected
+
+
+def test_supply_demand_zones_match_reference(df):
+    expected = reference_supply_demand_zones(df)
+    assert SMCAnalyzer().detect_supply_demand_zones(df) == expected
+
+
+def consolidating_breakouts(seed, n=600):
+    # generated candles almost never consolidate tightly enough to form a zone,
+    # so zig-zag inside a range and break out of it every so often
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([-1.0, 1.0], n) * 0.0005
+    steps[::2] *= -1
+    for start in rng.choice(n - 3, n // 25, replace=False):
+        steps[start:start + 3] = rng.choice([-1, 1]) * rng.uniform(0.0005, 0.002)
+    closes = 1.1 + np.cumsum(steps)
+    opens = np.concatenate([[1.1], closes[:-1]])
+    wicks = rng.uniform(0, 0.0001, (2, n))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+        'open': opens,
+        'high': np.maximum(opens, closes) + wicks[0],
+        'low': np.minimum(opens, closes) - wicks[1],
+        'close': closes,
+        'volume': np.full(n, 1000.0),
+    })
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_supply_demand_zones_match_reference_on_breakouts(seed):
+    df = consolidating_breakouts(seed)
+    expected = reference_supply_demand_zones(df)
+    assert {zone['type'] for zone in expected} == {'supply', 'demand'}
+    assert SMCAnalyzer().detect_supply_demand_zones(df) == expected
+
+
+def test_short_windows_match_reference(df):
+    smc = SMCAnalyzer()
+    for length in (20, 21, 25, 50):
+        window = df.iloc[-length:].reset_index(drop=True)
+        assert smc.detect_order_blocks(window) == reference_order_blocks(window)
+        assert smc.detect_fair_value_gaps(window) == reference_fair_value_gaps(window)
+        assert smc.detect_liquidity_zones(window) == reference_liquidity_zones(window)
+        assert smc.detect_supply_demand_zones(window) == reference_supply_demand_zones(window)
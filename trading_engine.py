@@ -1,37 +1,55 @@
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 from technical_indicators import TechnicalIndicators
 from pattern_detector import PatternDetector
 from smc_analyzer import SMCAnalyzer
+from analysis_context import AnalysisContext
+from candles import CandleSeries
+from instrumentation import metrics as default_metrics
 import json
 
 class TradingEngine:
-    def __init__(self):
+    def __init__(self, metrics=None):
         self.indicators = TechnicalIndicators()
         self.pattern_detector = PatternDetector()
         self.smc_analyzer = SMCAnalyzer()
+        self.metrics = metrics or default_metrics
         
-    def analyze_market(self, symbol, data):
-        if not data or len(data) < 50:
+    def analyze_market(self, symbol, data, technical=None):
+        # ``technical`` lets live callers pass a StreamingIndicators snapshot
+        # instead of recomputing every indicator over the window
+        with self.metrics.span('analyze_market') as span:
+            return self._analyze_market(symbol, data, span, technical)
+    
+    def _analyze_market(self, symbol, data, span, technical=None):
+        candles = CandleSeries.coerce(data)
+        if candles is None or len(candles) < 50:
             return self._empty_analysis(symbol)
         
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp').reset_index(drop=True)
+        df = candles.to_dataframe()
+        
+        context = AnalysisContext(df)
+        span.mark('prepare')
         
-        technical_analysis = self.indicators.calculate_all(df)
-        smc_analysis = self.smc_analyzer.analyze(df)
-        patterns = self.pattern_detector.detect_all(df)
+        technical_analysis = technical if technical is not None else self.indicators.calculate_all(df)
+        span.mark('indicators')
+        smc_analysis = self.smc_analyzer.analyze(df, context)
+        span.mark('smc')
+        patterns = self.pattern_detector.detect_all(df, context)
+        span.mark('patterns')
         
-        market_structure = self._analyze_market_structure(df, smc_analysis)
+        market_structure = self._analyze_market_structure(df, smc_analysis, context)
+        span.mark('market_structure')
         regime = self._detect_regime(df, technical_analysis)
+        span.mark('regime')
         
         signals = self._generate_signals(
             symbol, df, technical_analysis, smc_analysis, patterns, market_structure, regime
         )
+        span.mark('signals')
         
         prediction = self._generate_prediction(df, technical_analysis, smc_analysis, market_structure)
+        span.mark('prediction')
         
         current_price = float(df['close'].iloc[-1])
         price_change = float(df['close'].iloc[-1] - df['close'].iloc[-2]) if len(df) > 1 else 0
@@ -68,20 +86,20 @@ class TradingEngine:
             'timestamp': datetime.utcnow().isoformat()
         }
     
-    def _analyze_market_structure(self, df, smc_analysis):
+    def _analyze_market_structure(self, df, smc_analysis, context=None):
+        context = context or AnalysisContext(df)
         closes = df['close'].values
-        highs = df['high'].values
-        lows = df['low'].values
-        
-        swing_highs = []
-        swing_lows = []
         lookback = 5
         
-        for i in range(lookback, len(df) - lookback):
-            if highs[i] == max(highs[i-lookback:i+lookback+1]):
-                swing_highs.append({'index': i, 'price': float(highs[i]), 'timestamp': str(df['timestamp'].iloc[i])})
-            if lows[i] == min(lows[i-lookback:i+lookback+1]):
-                swing_lows.append({'index': i, 'price': float(lows[i]), 'timestamp': str(df['timestamp'].iloc[i])})
+        # only the last five swings are reported or compared below
+        swing_highs = [
+            {'index': i, 'price': float(context.highs[i]), 'timestamp': str(df['timestamp'].iloc[i])}
+            for i in context.swing_highs(lookback, lookback)[-5:].tolist()
+        ]
+        swing_lows = [
+            {'index': i, 'price': float(context.lows[i]), 'timestamp': str(df['timestamp'].iloc[i])}
+            for i in context.swing_lows(lookback, lookback)[-5:].tolist()
+        ]
         
         trend = 'ranging'
         structure_type = 'uncertain'
@@ -117,8 +135,9 @@ class TradingEngine:
         
         recent_changes = []
         if len(df) > 10:
+            mean_change = df['close'].diff().abs().mean()
             for i in range(-10, -1):
-                if abs(closes[i] - closes[i-1]) > 2 * df['close'].diff().abs().mean():
+                if abs(closes[i] - closes[i-1]) > 2 * mean_change:
                     choch_detected = True
                     recent_changes.append(i)
         
@@ -375,21 +394,31 @@ class TradingEngine:
             'confidence': round(max(bullish_prob, bearish_prob) * 100, 1)
         }
     
-    def generate_live_narration(self, symbol, data):
-        if not data or len(data) < 10:
+    def generate_live_narration(self, symbol, data, technical=None):
+        with self.metrics.span('generate_live_narration') as span:
+            return self._generate_live_narration(symbol, data, span, technical)
+    
+    def _generate_live_narration(self, symbol, data, span, technical=None):
+        candles = CandleSeries.coerce(data)
+        if candles is None or len(candles) < 10:
             return self._empty_narration(symbol)
         
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp').reset_index(drop=True)
+        df = candles.to_dataframe()
         
         current_price = float(df['close'].iloc[-1])
         prev_price = float(df['close'].iloc[-2]) if len(df) > 1 else current_price
         price_change = current_price - prev_price
         
-        technical = self.indicators.calculate_all(df)
-        smc = self.smc_analyzer.analyze(df)
-        structure = self._analyze_market_structure(df, smc)
+        context = AnalysisContext(df)
+        span.mark('prepare')
+        
+        if technical is None:
+            technical = self.indicators.calculate_all(df)
+        span.mark('indicators')
+        smc = self.smc_analyzer.analyze(df, context)
+        span.mark('smc')
+        structure = self._analyze_market_structure(df, smc, context)
+        span.mark('market_structure')
         
         rsi = technical.get('rsi', {}).get('value', 50)
         macd_hist = technical.get('macd', {}).get('histogram', 0)
@@ -437,7 +466,9 @@ class TradingEngine:
             nearest_low = structure['swing_lows'][-1]['price']
             narration += f"- Support at {nearest_low:.5f}\n"
         
+        span.mark('narration')
         prediction = self._generate_prediction(df, technical, smc, structure)
+        span.mark('prediction')
         
         narration += f"\n**Prediction (Next 4-8 hours):**\n"
         for scenario, details in prediction.get('scenarios', {}).items():
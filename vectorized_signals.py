@@ -0,0 +1,346 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis_context import swing_flags
+from pattern_detector import PatternDetector, SINGLE_CANDLE_PATTERNS, DOUBLE_CANDLE_PATTERNS, TRIPLE_CANDLE_PATTERNS
+from smc_analyzer import SMCAnalyzer
+
+GRADE_CODES = ['E', 'D', 'C', 'B', 'A', 'S']
+
+BULLISH_PATTERNS = ['hammer', 'bullish_engulfing', 'morning_star', 'three_white_soldiers']
+BEARISH_PATTERNS = ['hanging_man', 'bearish_engulfing', 'evening_star', 'three_black_crows']
+
+
+def _rolling_mean_last(columns, window):
+    """Last value of ``Series.rolling(window).mean()`` evaluated inside every window.
+
+    ``columns[t]`` holds the t-th value of every window, so the compensated
+    add/remove updates pandas performs are replayed column by column for all
+    windows at once.
+    """
+    m = columns[0].shape[0]
+    sum_x = np.zeros(m)
+    comp_add = np.zeros(m)
+    comp_remove = np.zeros(m)
+    neg_ct = np.zeros(m, dtype=np.int64)
+    same_count = np.zeros(m, dtype=np.int64)
+    prev_value = np.full(m, np.nan)
+    nobs = 0
+
+    for t in range(len(columns)):
+        if t >= window:
+            old = columns[t - window]
+            nobs -= 1
+            y = -old - comp_remove
+            total = sum_x + y
+            comp_remove = total - sum_x - y
+            sum_x = total
+            neg_ct -= np.signbit(old)
+
+        val = columns[t]
+        nobs += 1
+        y = val - comp_add
+        total = sum_x + y
+        comp_add = total - sum_x - y
+        sum_x = total
+        neg_ct += np.signbit(val)
+        same_count = np.where(val == prev_value, same_count + 1, 1)
+        prev_value = val
+
+    if nobs < window:
+        return np.full(m, np.nan)
+
+    result = sum_x / nobs
+    result = np.where((neg_ct == 0) & (result < 0), 0.0, result)
+    result = np.where((neg_ct == nobs) & (result > 0), 0.0, result)
+    return np.where(same_count >= nobs, prev_value, result)
+
+
+def _ema_columns(columns, span):
+    """``Series.ewm(span=span, adjust=False).mean()`` evaluated inside every window."""
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    old_wt = 1.0 - alpha
+    weighted = columns[0]
+    out = [weighted]
+    for cur in columns[1:]:
+        updated = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+        weighted = np.where(weighted != cur, updated, weighted)
+        out.append(weighted)
+    return out
+
+
+def _py_round_near(values, rounded, digits, thresholds, tolerance):
+    # np.round and round() can disagree on halfway cases; only matters next to a threshold
+    near = np.zeros(len(values), dtype=bool)
+    for threshold in thresholds:
+        near |= np.abs(values - threshold) < tolerance
+    if near.any():
+        rounded = rounded.copy()
+        rounded[near] = [round(float(v), digits) for v in values[near]]
+    return rounded
+
+
+def round_like_python(values, digits):
+    """``np.round`` with the halfway cases re-rounded by ``round()`` so values match scalar code."""
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, digits)
+    scaled = np.abs(values) * 10.0 ** digits
+    ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ambiguous.any():
+        rounded[ambiguous] = [round(float(v), digits) for v in values[ambiguous]]
+    return rounded
+
+
+def _last_events(event_idx, lo, hi, n):
+    """For each query, the positions (into ``event_idx``) of the last ``n`` events in [lo, hi]."""
+    end = np.searchsorted(event_idx, hi, side='right')
+    start = np.searchsorted(event_idx, lo, side='left')
+    count = np.clip(end - start, 0, None)
+    return end, np.minimum(count, n), count
+
+
+class VectorizedSignalGenerator:
+    """Per-bar confluence signals for a whole history in one pass.
+
+    Reproduces what ``TradingEngine.analyze_market`` returns for the walk-forward
+    window ``df.iloc[i - lookback:i + 1]`` at every bar ``i`` without slicing or
+    re-running the analysis. Detectors that only look at a bar and its neighbours
+    (order blocks, FVGs, swing points, candlestick patterns) are evaluated once
+    over the full series and then windowed with ``searchsorted``; indicators whose
+    value depends on where the window starts (EMA seeds, rolling sums) are replayed
+    column-wise across all windows at once.
+    """
+
+    def __init__(self, lookback=50):
+        self.lookback = lookback
+
+    def generate(self, df):
+        n = len(df)
+        length = self.lookback + 1
+        result = {
+            'direction': np.zeros(n, dtype=np.int8),
+            'grade': np.zeros(n, dtype=np.int8),
+            'score': np.zeros(n, dtype=np.int64),
+            'factor_count': np.zeros(n, dtype=np.int64),
+            'atr': np.zeros(n),
+        }
+        if n < length or length < 50:
+            return result
+
+        opens = df['open'].to_numpy(dtype=float)
+        highs = df['high'].to_numpy(dtype=float)
+        lows = df['low'].to_numpy(dtype=float)
+        closes = df['close'].to_numpy(dtype=float)
+
+        ends = np.arange(self.lookback, n)
+        starts = ends - self.lookback
+
+        bullish = np.zeros(len(ends), dtype=np.int64)
+        bearish = np.zeros(len(ends), dtype=np.int64)
+        factors = np.zeros(len(ends), dtype=np.int64)
+
+        def add_factor(mask, direction, weight, count=None):
+            nonlocal bullish, bearish, factors
+            hits = mask.astype(np.int64) if count is None else count
+            if direction == 'bullish':
+                bullish += hits * weight
+            else:
+                bearish += hits * weight
+            factors += hits
+
+        rsi, macd_hist, macd_signal, atr = self._window_indicators(opens, highs, lows, closes, length)
+
+        add_factor(rsi < 30, 'bullish', 15)
+        add_factor(rsi > 70, 'bearish', 15)
+        add_factor((macd_hist > 0) & (macd_signal == 1), 'bullish', 20)
+        add_factor((macd_hist < 0) & (macd_signal == -1), 'bearish', 20)
+
+        trend = self._window_trend(highs, lows, starts, ends)
+        add_factor(trend == 1, 'bullish', 25)
+        add_factor(trend == -1, 'bearish', 25)
+
+        ob_bull, ob_bear, _ = SMCAnalyzer.order_block_flags(opens, closes)
+        bull_ob, bear_ob = self._last_event_counts(ob_bull, ob_bear, starts + 3, ends - 1, 3)
+        add_factor(None, 'bullish', 20, bull_ob)
+        add_factor(None, 'bearish', 20, bear_ob)
+
+        fvg_bull, fvg_bear = SMCAnalyzer.fair_value_gap_flags(highs, lows)
+        bull_fvg, bear_fvg = self._last_event_counts(fvg_bull, fvg_bear, starts + 1, ends - 1, 3)
+        add_factor(None, 'bullish', 15, bull_fvg)
+        add_factor(None, 'bearish', 15, bear_fvg)
+
+        sweep = self._window_liquidity_sweep(opens, highs, lows, closes, length)
+        add_factor(sweep == 1, 'bullish', 25)
+        add_factor(sweep == -1, 'bearish', 25)
+
+        bull_pat, bear_pat = self._window_pattern_factors(opens, highs, lows, closes, starts, ends, length)
+        add_factor(None, 'bullish', 15, bull_pat)
+        add_factor(None, 'bearish', 15, bear_pat)
+
+        long_mask = (bullish > bearish) & (bullish >= 30)
+        short_mask = (bearish > bullish) & (bearish >= 30)
+        score = np.where(long_mask, bullish, np.where(short_mask, bearish, 0))
+
+        result['direction'][ends] = np.where(long_mask, 1, np.where(short_mask, -1, 0))
+        result['grade'][ends] = np.where(long_mask | short_mask, self._grade_codes(score, factors), 0)
+        result['score'][ends] = score
+        result['factor_count'][ends] = factors
+        result['atr'][ends] = atr
+        return result
+
+    @staticmethod
+    def _grade_codes(score, factor_count):
+        grade = np.zeros(len(score), dtype=np.int8)
+        grade = np.where(score >= 20, 1, grade)
+        grade = np.where((score >= 35) & (factor_count >= 3), 2, grade)
+        grade = np.where((score >= 50) & (factor_count >= 4), 3, grade)
+        grade = np.where((score >= 65) & (factor_count >= 5), 4, grade)
+        grade = np.where((score >= 80) & (factor_count >= 6), 5, grade)
+        return grade
+
+    def _window_indicators(self, opens, highs, lows, closes, length):
+        close_w = sliding_window_view(closes, length)
+        high_w = sliding_window_view(highs, length)
+        low_w = sliding_window_view(lows, length)
+        close_cols = [close_w[:, t] for t in range(length)]
+        m = close_w.shape[0]
+
+        gains, losses, trs = [], [], []
+        for t in range(length):
+            if t == 0:
+                gains.append(np.zeros(m))
+                losses.append(np.full(m, -0.0))
+                trs.append(high_w[:, 0] - low_w[:, 0])
+                continue
+            delta = close_cols[t] - close_cols[t - 1]
+            gains.append(np.where(delta > 0, delta, 0.0))
+            losses.append(-np.where(delta < 0, delta, 0.0))
+            trs.append(np.maximum(np.maximum(high_w[:, t] - low_w[:, t],
+                                             np.abs(high_w[:, t] - close_cols[t - 1])),
+                                  np.abs(low_w[:, t] - close_cols[t - 1])))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain = _rolling_mean_last(gains, 14)
+            loss = _rolling_mean_last(losses, 14)
+            rs = gain / np.where(loss == 0, np.inf, loss)
+            rsi = 100 - (100 / (1 + rs))
+        rsi = np.where(np.isnan(rsi), 50.0, rsi)
+        rsi = _py_round_near(rsi, np.round(rsi, 2), 2, (30, 70), 0.01)
+
+        fast = _ema_columns(close_cols, 12)
+        slow = _ema_columns(close_cols, 26)
+        macd_cols = [f - s for f, s in zip(fast, slow)]
+        signal_cols = _ema_columns(macd_cols, 9)
+        macd_line, signal_line = macd_cols[-1], signal_cols[-1]
+        hist = macd_line - signal_line
+        prev_hist = macd_cols[-2] - signal_cols[-2]
+        macd_signal = np.where((macd_line > signal_line) & (prev_hist < hist), 1,
+                               np.where((macd_line < signal_line) & (prev_hist > hist), -1, 0))
+        hist_rounded = _py_round_near(hist, np.round(hist, 6), 6, (0,), 1e-6)
+
+        atr = _rolling_mean_last(trs, 14)
+        atr = np.where(np.isnan(atr), 0.0, atr)
+        return rsi, hist_rounded, macd_signal, atr
+
+    def _window_trend(self, highs, lows, starts, ends):
+        swing_high_idx = np.flatnonzero(swing_flags(highs, 5, 5, 'max'))
+        swing_low_idx = np.flatnonzero(swing_flags(lows, 5, 5, 'min'))
+
+        def last_two(event_idx, values):
+            end, _, count = _last_events(event_idx, starts + 5, ends - 5, 2)
+            enough = count >= 2
+            last = np.where(enough, values[event_idx[np.clip(end - 1, 0, None)]] if len(event_idx) else 0, 0)
+            prev = np.where(enough, values[event_idx[np.clip(end - 2, 0, None)]] if len(event_idx) else 0, 0)
+            return enough, last, prev
+
+        highs_ok, last_high, prev_high = last_two(swing_high_idx, highs)
+        lows_ok, last_low, prev_low = last_two(swing_low_idx, lows)
+        both = highs_ok & lows_ok
+
+        bullish = both & (last_high > prev_high) & (last_low > prev_low)
+        bearish = both & ~bullish & (last_high < prev_high) & (last_low < prev_low)
+        return np.where(bullish, 1, np.where(bearish, -1, 0))
+
+    @staticmethod
+    def _last_event_counts(bull_flags, bear_flags, lo, hi, n):
+        event_idx = np.flatnonzero(bull_flags | bear_flags)
+        bull_cum = np.concatenate([[0], np.cumsum(bull_flags[event_idx])])
+        end, take, _ = _last_events(event_idx, lo, hi, n)
+        bull = bull_cum[end] - bull_cum[end - take]
+        return bull, take - bull
+
+    @staticmethod
+    def _window_liquidity_sweep(opens, highs, lows, closes, length):
+        candle_range = highs - lows
+        avg_range = sliding_window_view(candle_range, length).sum(axis=1) / length
+        wick_up = highs - np.maximum(opens, closes)
+        wick_down = np.minimum(opens, closes) - lows
+        body = np.abs(closes - opens)
+
+        m = len(avg_range)
+        sweep = np.zeros(m, dtype=np.int8)
+        found = np.zeros(m, dtype=bool)
+        for offset in range(4):
+            bar = slice(length - 5 + offset, length - 5 + offset + m)
+            up = (wick_up[bar] > 2 * body[bar]) & (wick_up[bar] > avg_range * 0.5)
+            down = (wick_down[bar] > 2 * body[bar]) & (wick_down[bar] > avg_range * 0.5)
+            sweep = np.where(~found & up, -1, np.where(~found & down, 1, sweep))
+            found |= up | down
+        return sweep
+
+    def _window_pattern_factors(self, opens, highs, lows, closes, starts, ends, length):
+        flags = PatternDetector.pattern_flags(opens, highs, lows, closes)
+        single, double, triple = SINGLE_CANDLE_PATTERNS, DOUBLE_CANDLE_PATTERNS, TRIPLE_CANDLE_PATTERNS
+
+        # PatternDetector.detect_all lists single-candle hits for the last 5 bars,
+        # then double for the last 4, triple for the last 3 and finally chart
+        # patterns; the signal only looks at the last three entries of that list.
+        slots, weights = [], []
+        for names, bars in ((single, 5), (double, 4), (triple, 3)):
+            for back in range(bars - 1, -1, -1):
+                for name in names:
+                    slots.append(flags[name][ends - back])
+                    weights.append(1 if name in BULLISH_PATTERNS else (-1 if name in BEARISH_PATTERNS else 0))
+
+        range_flag, triangle_flag = self._window_chart_patterns(highs, lows, starts, ends)
+        slots.extend([range_flag, triangle_flag])
+        weights.extend([0, 0])
+
+        matrix = np.column_stack(slots)
+        weights = np.array(weights)
+        from_end = np.cumsum(matrix[:, ::-1], axis=1)[:, ::-1]
+        last_three = matrix & (from_end <= 3)
+        bull = (last_three & (weights == 1)).sum(axis=1)
+        bear = (last_three & (weights == -1)).sum(axis=1)
+        return bull, bear
+
+    def _window_chart_patterns(self, highs, lows, starts, ends):
+        high_w = sliding_window_view(highs, 30)[ends - 29]
+        low_w = sliding_window_view(lows, 30)[ends - 29]
+        resistance = high_w.max(axis=1)
+        support = low_w.min(axis=1)
+        resistance_touches = (high_w >= (resistance * 0.998)[:, None]).sum(axis=1)
+        support_touches = (low_w <= (support * 1.002)[:, None]).sum(axis=1)
+        range_flag = (resistance_touches >= 2) & (support_touches >= 2)
+
+        swing_high_idx = np.flatnonzero(swing_flags(highs, 5, 4, 'max'))
+        swing_low_idx = np.flatnonzero(swing_flags(lows, 5, 4, 'min'))
+
+        def first_last(event_idx, values):
+            end, _, count = _last_events(event_idx, starts + 5, ends - 5, 2)
+            start = end - count
+            enough = count >= 2
+            if not len(event_idx):
+                return enough, np.zeros(len(ends))
+            last = values[event_idx[np.clip(end - 1, 0, None)]]
+            first = values[event_idx[np.clip(start, 0, len(event_idx) - 1)]]
+            return enough, np.where(enough, last - first, 0.0)
+
+        highs_ok, high_trend = first_last(swing_high_idx, highs)
+        lows_ok, low_trend = first_last(swing_low_idx, lows)
+        both = highs_ok & lows_ok
+        symmetric = (high_trend < 0) & (low_trend > 0)
+        descending = (high_trend < 0) & (np.abs(low_trend) < np.abs(high_trend) * 0.3)
+        ascending = (low_trend > 0) & (np.abs(high_trend) < np.abs(low_trend) * 0.3)
+        triangle_flag = both & (symmetric | descending | ascending)
+        return range_flag, triangle_flag
@@ -0,0 +1,82 @@
+import eventlet
+from eventlet import tpool
+from eventlet.semaphore import Semaphore
+
+
+class PoolBusy(Exception):
+    """Raised when a job cannot get a worker slot: the wait queue is full or the wait timed out."""
+
+
+class JobTimeout(Exception):
+    """Raised when a job runs longer than its timeout."""
+
+
+class WorkerPool:
+    """Runs CPU-bound calls in eventlet's native thread pool (``tpool``).
+
+    Under ``monkey_patch`` every request and socket handler shares one OS
+    thread, so a long analysis or backtest stalls all of them. ``run`` hands the
+    call to a real thread and waits green, letting the hub keep serving.
+
+    At most ``max_workers`` jobs run at once. Up to ``max_waiting`` more may wait
+    for a slot for at most ``wait_timeout`` seconds; beyond that ``run`` raises
+    ``PoolBusy`` rather than queueing without bound. A caller waiting longer
+    than ``timeout`` gets ``JobTimeout``. A thread cannot be interrupted, so the
+    job's slot stays taken until it actually finishes.
+
+    Jobs must not touch green primitives (caches, locks created after
+    ``monkey_patch``): load inputs in the handler and pass them in.
+    """
+
+    def __init__(self, max_workers=4, max_waiting=16, wait_timeout=5.0, timeout=30.0):
+        self.max_workers = max_workers
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.timeout = timeout
+        self._slots = Semaphore(max_workers)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def run(self, function, *args, timeout=None, **kwargs):
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PoolBusy(f"{self.waiting} jobs already waiting")
+
+        self.waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.wait_timeout)
+        finally:
+            self.waiting -= 1
+        if not acquired:
+            self.rejected += 1
+            raise PoolBusy(f"no worker free within {self.wait_timeout}s")
+
+        self.running += 1
+        job = eventlet.spawn(tpool.execute, function, *args, **kwargs)
+        job.link(self._finished)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            with eventlet.Timeout(timeout, JobTimeout(f"job exceeded {timeout}s")):
+                return job.wait()
+        except JobTimeout:
+            self.timeouts += 1
+            raise
+
+    def _finished(self, job):
+        self.running -= 1
+        self.completed += 1
+        self._slots.release()
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'running': self.running,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+        }